@@ -0,0 +1,305 @@
+"""
+Batch document upload: many files or ZIP archives in one request.
+
+Extraction and analysis run sequentially by default, or in a bounded process
+pool when BATCH_UPLOAD_WORKERS > 1 (PyMuPDF must not be shared between
+threads); the ResearchPaper rows are then written in bulk and, optionally, all
+new papers are scored with one Ridge call.
+"""
+import os
+import hashlib
+import logging
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.utils import timezone
+
+from user.models import ResearchPaper, ResearchPaperRidgePrediction
+from user.ml_utils import predict_many, MLModelError
+from . import extraction
+
+logger = logging.getLogger(__name__)
+
+# Sequential by default, like PDF_PARALLEL_WORKERS: the pool is started inside
+# the web worker handling the request, so N gunicorn workers could each start
+# BATCH_UPLOAD_WORKERS children. Size it against the web workers before raising it.
+BATCH_WORKERS = getattr(settings, "BATCH_UPLOAD_WORKERS", 1)
+BATCH_MAX_FILES = getattr(settings, "BATCH_UPLOAD_MAX_FILES", 200)
+BATCH_MAX_TOTAL_SIZE = getattr(settings, "BATCH_UPLOAD_MAX_TOTAL_SIZE", 200 * 1024 * 1024)
+MAX_FILE_SIZE = 10 * 1024 * 1024  # Same limit as single uploads
+ZIP_MAX_RATIO = 100  # Reject members that expand more than this (zip bombs)
+
+ALLOWED_EXTENSIONS = ('.pdf', '.docx', '.txt')
+
+
+class BatchEntry:
+    """One document of a batch and its outcome, rendered as a row of the report."""
+
+    def __init__(self, name, data=None, status='pending', message=''):
+        self.name = name
+        self.data = data
+        self.status = status  # created, updated, reused, unchanged, failed, skipped
+        self.message = message
+        self.content_hash = hashlib.sha256(data).hexdigest() if data is not None else ''
+        self.processed_data = None
+        self.research_paper = None
+        self.prediction = None
+
+    def fail(self, message, status='failed'):
+        self.status = status
+        self.message = message
+        self.data = None
+
+
+# ----------------- Collecting files -----------------
+def _read_zip(upload, entries, budget):
+    """Appends the allowed members of a ZIP upload; returns the remaining byte budget."""
+    try:
+        archive = zipfile.ZipFile(upload)
+    except zipfile.BadZipFile:
+        entries.append(BatchEntry(upload.name, status='failed', message='Not a valid ZIP archive'))
+        return budget
+
+    with archive:
+        for info in archive.infolist():
+            name = os.path.basename(info.filename)
+            if info.is_dir() or not name or name.startswith('.') or info.filename.startswith('__MACOSX/'):
+                continue
+            label = f"{upload.name}/{info.filename}"
+            if os.path.splitext(name)[1].lower() not in ALLOWED_EXTENSIONS:
+                entries.append(BatchEntry(label, status='skipped', message='Unsupported file type'))
+                continue
+            if info.file_size > MAX_FILE_SIZE:
+                entries.append(BatchEntry(label, status='skipped', message='File size exceeds 10MB limit'))
+                continue
+            if info.compress_size and info.file_size / info.compress_size > ZIP_MAX_RATIO:
+                entries.append(BatchEntry(label, status='skipped', message='Suspicious compression ratio'))
+                continue
+            if info.file_size > budget:
+                entries.append(BatchEntry(label, status='skipped', message='Batch size limit reached'))
+                continue
+
+            # Never trust the header sizes: read at most the limit plus one byte
+            with archive.open(info) as member:
+                data = member.read(MAX_FILE_SIZE + 1)
+            if len(data) > MAX_FILE_SIZE:
+                entries.append(BatchEntry(label, status='skipped', message='File size exceeds 10MB limit'))
+                continue
+            budget -= len(data)
+            entries.append(BatchEntry(name, data))
+    return budget
+
+
+def collect_batch(uploads):
+    """Expands uploaded files and ZIP archives into BatchEntry objects, enforcing the batch limits."""
+    entries = []
+    budget = BATCH_MAX_TOTAL_SIZE
+    for upload in uploads:
+        extension = os.path.splitext(upload.name)[1].lower()
+        if extension == '.zip':
+            budget = _read_zip(upload, entries, budget)
+        elif extension not in ALLOWED_EXTENSIONS:
+            entries.append(BatchEntry(upload.name, status='skipped', message='Unsupported file type'))
+        elif upload.size > MAX_FILE_SIZE:
+            entries.append(BatchEntry(upload.name, status='skipped', message='File size exceeds 10MB limit'))
+        elif upload.size > budget:
+            entries.append(BatchEntry(upload.name, status='skipped', message='Batch size limit reached'))
+        else:
+            budget -= upload.size
+            entries.append(BatchEntry(upload.name, extraction.read_upload(upload)))
+
+    documents = [entry for entry in entries if entry.data is not None]
+    for entry in documents[BATCH_MAX_FILES:]:
+        entry.fail(f'Batch is limited to {BATCH_MAX_FILES} documents', status='skipped')
+    return entries
+
+
+# ----------------- Processing -----------------
+def _init_worker():
+    # Each worker already runs in parallel; no nested page-parallel pools.
+    extraction.PARALLEL_WORKERS = 1
+
+
+def _process_document(name, data):
+    """Runs in a worker process: extract + analyse one document, no DB access."""
+    from .views import DocumentProcessorView
+
+    upload = ContentFile(data, name=name)
+    return DocumentProcessorView()._process_document_content(upload, user=f"batch:{name}")
+
+
+def _run_extraction(pending, workers):
+    if workers < 2 or len(pending) < 2:
+        return [_process_document(entry.name, entry.data) for entry in pending]
+    with ProcessPoolExecutor(max_workers=min(workers, len(pending)), initializer=_init_worker) as pool:
+        futures = [pool.submit(_process_document, entry.name, entry.data) for entry in pending]
+        results = []
+        for future in futures:
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append({'success': False, 'error': str(e)})
+        return results
+
+
+def _cached_data(paper):
+    return {
+        'title': paper.title,
+        'abstract': paper.abstract,
+        'keywords': paper.keywords,
+        'authors': paper.authors,
+        'publication_year': paper.publication_year,
+    }
+
+
+def process_batch(entries, user, workers=None):
+    """
+    Extracts every new document of the batch (in parallel when
+    BATCH_UPLOAD_WORKERS > 1) and writes the ResearchPaper rows with one
+    bulk_create and one bulk_update. Content already known for this user (same
+    SHA-256) is reused instead of being re-parsed.
+    """
+    documents = [entry for entry in entries if entry.data is not None]
+    if not documents:
+        return entries
+
+    known = {}
+    for paper in ResearchPaper.objects.filter(user=user, content_hash__in={e.content_hash for e in documents}):
+        known.setdefault(paper.content_hash, paper)
+    existing_by_name = {
+        paper.filename: paper
+        for paper in ResearchPaper.objects.filter(user=user, filename__in={e.name for e in documents})
+    }
+
+    seen_names = set()
+    pending, first_by_hash = [], {}
+    for entry in documents:
+        if entry.name in seen_names:
+            entry.fail('Duplicate filename in batch', status='skipped')
+            continue
+        seen_names.add(entry.name)
+        if entry.content_hash in known:
+            entry.processed_data = _cached_data(known[entry.content_hash])
+            entry.status = 'reused'
+        elif entry.content_hash in first_by_hash:
+            entry.status = 'reused'  # filled from the first copy once it is processed
+        else:
+            first_by_hash[entry.content_hash] = entry
+            pending.append(entry)
+
+    results = _run_extraction(pending, BATCH_WORKERS if workers is None else workers)
+    for entry, result in zip(pending, results):
+        if result['success']:
+            entry.processed_data = result['data']
+        else:
+            entry.fail(result['error'])
+
+    to_create, to_update = [], []
+    for entry in documents:
+        if entry.status in ('failed', 'skipped'):
+            continue
+        if entry.processed_data is None:
+            source = first_by_hash[entry.content_hash]
+            if source.processed_data is None:
+                entry.fail(source.message)
+                continue
+            entry.processed_data = source.processed_data
+
+        existing = existing_by_name.get(entry.name)
+        if existing is not None and existing.content_hash == entry.content_hash:
+            entry.research_paper = existing
+            entry.status = 'unchanged'
+            continue
+
+        data = entry.processed_data
+        paper = existing or ResearchPaper(user=user, filename=entry.name)
+        paper.title = data['title']
+        paper.abstract = data['abstract']
+        paper.keywords = data['keywords']
+        paper.authors = data['authors']
+        paper.publication_year = data['publication_year']
+        paper.file_size = len(entry.data)
+        paper.file_type = os.path.splitext(entry.name)[1].lower().replace('.', '')
+        paper.content_hash = entry.content_hash
+        entry.research_paper = paper
+        if existing is not None:
+            paper.updated_at = timezone.now()
+            to_update.append(paper)
+            entry.status = 'updated'
+        else:
+            to_create.append(paper)
+            if entry.status != 'reused':
+                entry.status = 'created'
+
+    with transaction.atomic():
+        ResearchPaper.objects.bulk_create(to_create)
+        ResearchPaper.objects.bulk_update(to_update, [
+            'title', 'abstract', 'keywords', 'authors', 'publication_year',
+            'file_size', 'file_type', 'content_hash', 'updated_at',
+        ])
+
+    logger.info(f"User {user} - Batch upload: {len(to_create)} created, {len(to_update)} updated, "
+                f"{len(documents) - len(to_create) - len(to_update)} not written")
+    for entry in documents:
+        entry.data = None  # release file contents before rendering the report
+    return entries
+
+
+def score_batch(entries):
+    """
+    Ridge-scores every paper written by the batch with a single predict_many
+    call. Papers with neither a title nor an abstract cannot be scored and are
+    left out, so they do not fail the whole call.
+    """
+    scored = []
+    for entry in entries:
+        if entry.research_paper is None or entry.status not in ('created', 'updated', 'reused'):
+            continue
+        if entry.research_paper.title or entry.research_paper.abstract:
+            scored.append(entry)
+        else:
+            entry.message = "Not scored: no title or abstract"
+    if not scored:
+        return entries
+    try:
+        predictions = predict_many([
+            {'title': e.research_paper.title, 'abstract': e.research_paper.abstract,
+             'keywords': e.research_paper.keywords_as_string}
+            for e in scored
+        ])
+    except (ValueError, MLModelError) as e:
+        logger.error(f"Batch Ridge scoring failed: {e}")
+        for entry in scored:
+            entry.message = f"Not scored: {e}"
+        return entries
+
+    now = timezone.now()
+    papers, versions = [], []
+    for entry, prediction in zip(scored, predictions):
+        paper = entry.research_paper
+        paper.predicted_citations = prediction['predicted']
+        paper.prediction_confidence_low = prediction['ci_low']
+        paper.prediction_confidence_high = prediction['ci_high']
+        paper.predicted_at = now
+        papers.append(paper)
+        versions.append(prediction['model_version'])
+        entry.prediction = prediction
+
+    with transaction.atomic():
+        ResearchPaperRidgePrediction.objects.bulk_create([
+            ResearchPaperRidgePrediction(
+                research_paper=paper,
+                predicted_citations=paper.predicted_citations,
+                ci_low=paper.prediction_confidence_low,
+                ci_high=paper.prediction_confidence_high,
+                model_version=version,
+            )
+            for paper, version in zip(papers, versions)
+        ])
+        ResearchPaper.objects.bulk_update(papers, [
+            'predicted_citations', 'prediction_confidence_low', 'prediction_confidence_high', 'predicted_at',
+        ])
+    return entries
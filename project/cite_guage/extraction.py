@@ -0,0 +1,218 @@
+"""
+Text extraction used by DocumentProcessorView.
+
+PyMuPDF (fitz) opens PDF uploads straight from memory and, for long documents,
+can extract page ranges in parallel worker processes (PDF_PARALLEL_WORKERS).
+PyPDF2 is the pure-Python fallback when fitz is missing or cannot open the
+file. TXT uploads are decoded chunk by chunk with an incremental codec, DOCX
+uploads are read from memory.
+"""
+import io
+import os
+import codecs
+import hashlib
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import docx
+import PyPDF2
+from docx.table import Table
+from django.conf import settings
+
+# PyMuPDF is optional at import time; without it every PDF goes through PyPDF2.
+try:
+    import fitz
+except ImportError:
+    fitz = None
+
+logger = logging.getLogger(__name__)
+
+PDF_ENGINE = getattr(settings, "PDF_EXTRACTION_ENGINE", "pymupdf")  # "pymupdf" or "pypdf2"
+PARALLEL_MIN_PAGES = getattr(settings, "PDF_PARALLEL_MIN_PAGES", 64)
+# Page-parallel extraction is off by default: the pool lives in every web worker
+# process, so N gunicorn workers would start N x PDF_PARALLEL_WORKERS children.
+# Size it against the number of web workers before raising it above 1.
+PARALLEL_WORKERS = getattr(settings, "PDF_PARALLEL_WORKERS", 1)
+
+_process_pool = None
+
+
+class PDFExtractionError(Exception):
+    """Raised when no engine could extract text from a PDF."""
+    pass
+
+
+def read_upload(file):
+    """Returns the bytes of an uploaded file (UploadedFile or django File)."""
+    if hasattr(file, "seek"):
+        file.seek(0)
+    return b"".join(file.chunks())
+
+
+def content_hash(file):
+    """Hex SHA-256 of an uploaded file, computed chunk by chunk."""
+    if hasattr(file, "seek"):
+        file.seek(0)
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ----------------- PyMuPDF -----------------
+def _pymupdf_page_range(data, start, stop):
+    """Page texts for pages [start, stop); top-level so worker processes can run it."""
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        return [doc[i].get_text() for i in range(start, stop)]
+
+
+def _get_process_pool(workers):
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=workers)
+    return _process_pool
+
+
+def _discard_process_pool():
+    """Drops a broken pool so the next parallel extraction starts a fresh one."""
+    global _process_pool
+    pool, _process_pool = _process_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class PyMuPDFEngine:
+    name = "pymupdf"
+
+    def __init__(self, parallel_min_pages=None, workers=None):
+        self.parallel_min_pages = PARALLEL_MIN_PAGES if parallel_min_pages is None else parallel_min_pages
+        self.workers = PARALLEL_WORKERS if workers is None else workers
+
+    def extract_pages(self, data, max_pages=None):
+        """Returns (texts of the first `max_pages` pages, or all; total page count)."""
+        if fitz is None:
+            raise PDFExtractionError("PyMuPDF is not installed.")
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            page_count = doc.page_count
+            stop = page_count if max_pages is None else min(max_pages, page_count)
+            if stop < max(self.parallel_min_pages, 2) or self.workers < 2:
+                return [doc[i].get_text() for i in range(stop)], page_count
+
+        # One contiguous page range per worker; each worker opens its own document.
+        step = -(-stop // self.workers)
+        ranges = [(start, min(start + step, stop)) for start in range(0, stop, step)]
+        try:
+            pool = _get_process_pool(self.workers)
+            futures = [pool.submit(_pymupdf_page_range, data, start, end) for start, end in ranges]
+            return [text for future in futures for text in future.result()], page_count
+        except BrokenProcessPool:
+            # A child died (possibly on this very file, so no in-process retry);
+            # the caller falls back to PyPDF2 and the next PDF gets a new pool.
+            logger.error("PDF extraction worker process died; restarting the process pool")
+            _discard_process_pool()
+            raise
+
+
+# ----------------- PyPDF2 -----------------
+class PyPDF2Engine:
+    name = "pypdf2"
+
+    def extract_pages(self, data, max_pages=None):
+        reader = PyPDF2.PdfReader(io.BytesIO(data))
+        page_count = len(reader.pages)
+        stop = page_count if max_pages is None else min(max_pages, page_count)
+        return [reader.pages[i].extract_text() or "" for i in range(stop)], page_count
+
+
+ENGINES = {
+    PyMuPDFEngine.name: PyMuPDFEngine,
+    PyPDF2Engine.name: PyPDF2Engine,
+}
+
+
+def _engine_chain(engine):
+    name = engine or PDF_ENGINE
+    if name not in ENGINES:
+        raise ValueError(f"Unknown PDF extraction engine: {name}")
+    chain = [ENGINES[name]()]
+    if name != PyPDF2Engine.name:
+        chain.append(PyPDF2Engine())
+    return chain
+
+
+def extract_pdf_pages(data, engine=None, max_pages=None):
+    """
+    Returns (page_texts, engine_name, page_count), trying the configured engine
+    first and falling back to PyPDF2 if it is unavailable or fails on this file.
+    With `max_pages` only the leading pages are extracted; page_count is still
+    the length of the whole document.
+    """
+    errors = []
+    for candidate in _engine_chain(engine):
+        try:
+            pages, page_count = candidate.extract_pages(data, max_pages=max_pages)
+            return pages, candidate.name, page_count
+        except Exception as e:
+            logger.warning(f"PDF engine {candidate.name} failed: {e}")
+            errors.append(f"{candidate.name}: {e}")
+    raise PDFExtractionError("; ".join(errors))
+
+
+def extract_pdf_text(data, engine=None, max_pages=None):
+    """Returns (text, engine_name, page_count); non-empty pages joined once, newline-terminated."""
+    pages, engine_name, page_count = extract_pdf_pages(data, engine, max_pages)
+    text = "".join(page + "\n" for page in pages if page)
+    return text, engine_name, page_count
+
+
+# ----------------- TXT / DOCX -----------------
+def decode_text_upload(file, chunk_size=None):
+    """
+    Decodes a text upload as UTF-8 (a leading BOM is dropped) with one
+    incremental decoder, so multi-byte characters split across chunks survive,
+    and joins the pieces once. Files that are not valid UTF-8 are re-read as
+    Latin-1, which accepts every byte.
+    """
+    if hasattr(file, "seek"):
+        file.seek(0)
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    try:
+        parts = [decoder.decode(chunk) for chunk in file.chunks(chunk_size)]
+        parts.append(decoder.decode(b"", final=True))
+        return "".join(parts)
+    except UnicodeDecodeError as e:
+        logger.debug(f"Text upload is not UTF-8 ({e}), decoding as Latin-1")
+    file.seek(0)
+    return "".join([chunk.decode("latin-1") for chunk in file.chunks(chunk_size)])
+
+
+def _docx_blocks(container):
+    """Paragraph texts of a document body, header or cell in order; tables give one line per row."""
+    for block in container.iter_inner_content():
+        if isinstance(block, Table):
+            for row in block.rows:
+                cells, seen = [], set()
+                for cell in row.cells:
+                    if id(cell._tc) not in seen:  # merged cells repeat the same element
+                        seen.add(id(cell._tc))
+                        cells.append(cell.text)
+                yield "\t".join(cells)
+        else:
+            yield block.text
+
+
+def extract_docx_text(data):
+    """
+    Text of a DOCX file given as bytes: body paragraphs and tables in document
+    order, then the headers and footers of each section. Headers go last so a
+    running header is never taken for the title.
+    """
+    document = docx.Document(io.BytesIO(data))
+    parts = list(_docx_blocks(document))
+    for section in document.sections:
+        for part in (section.first_page_header, section.header, section.even_page_header,
+                     section.first_page_footer, section.footer, section.even_page_footer):
+            if not part.is_linked_to_previous:
+                parts.extend(_docx_blocks(part))
+    return "".join(part + "\n" for part in parts)
@@ -0,0 +1,89 @@
+import os
+import random
+import tempfile
+import time
+
+import PyPDF2
+from django.core.management.base import BaseCommand, CommandError
+
+from cite_guage import extraction
+
+WORDS = (
+    "citation network model paper analysis regression learning feature journal impact "
+    "dataset corpus abstract method result baseline evaluation science research author"
+).split()
+
+
+def synthetic_pdf(pages, seed=0):
+    """A text-only PDF with `pages` pages of pseudo-random prose, built with PyMuPDF."""
+    rng = random.Random(seed)
+    doc = extraction.fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        body = "\n".join(
+            " ".join(rng.choice(WORDS) for _ in range(14)) for _ in range(45)
+        )
+        page.insert_textbox(page.rect + (50, 50, -50, -50), f"Page {i + 1}\n{body}", fontsize=9)
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+# Verbatim copy of the extraction DocumentProcessorView used before the engines, kept as the baseline.
+def legacy_extract(data):
+    text = ""
+    with tempfile.NamedTemporaryFile(suffix='.pdf') as tmp_file:
+        tmp_file.write(data)
+        tmp_file.seek(0)
+        pdf_reader = PyPDF2.PdfReader(tmp_file)
+        page_count = len(pdf_reader.pages)
+        for page_num in range(page_count):
+            page = pdf_reader.pages[page_num]
+            page_text = page.extract_text()
+            if page_text:
+                text += page_text + "\n"
+    return text
+
+
+class Command(BaseCommand):
+    help = "Benchmark PDF text extraction: legacy PyPDF2 path vs. the PyMuPDF engine (sequential and page-parallel)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=300)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--workers", type=int, default=max(extraction.PARALLEL_WORKERS, os.cpu_count() or 1))
+        parser.add_argument("--seed", type=int, default=0)
+
+    def _best_of(self, func, data, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func(data)
+            best = min(best, time.perf_counter() - start)
+        return best, result
+
+    def handle(self, *args, **options):
+        if extraction.fitz is None:
+            raise CommandError("PyMuPDF is required to generate the benchmark PDF.")
+
+        data = synthetic_pdf(options["pages"], options["seed"])
+        pages = options["pages"]
+        self.stdout.write(f"pages:    {pages}  ({len(data) / 1024:,.0f} KiB)")
+
+        sequential = extraction.PyMuPDFEngine(parallel_min_pages=pages + 1)
+        parallel = extraction.PyMuPDFEngine(parallel_min_pages=0, workers=options["workers"])
+        runs = [
+            ("legacy", legacy_extract),
+            ("pypdf2", lambda d: extraction.extract_pdf_text(d, engine="pypdf2")[0]),
+            ("pymupdf", lambda d: "".join(p + "\n" for p in sequential.extract_pages(d)[0] if p)),
+            (f"pymupdf x{options['workers']}", lambda d: "".join(p + "\n" for p in parallel.extract_pages(d)[0] if p)),
+        ]
+
+        baseline = None
+        for label, func in runs:
+            elapsed, text = self._best_of(func, data, options["repeat"])
+            baseline = baseline or elapsed
+            self.stdout.write(
+                f"{label:<12} {elapsed * 1000:9.1f} ms  ({pages / elapsed:,.0f} pages/s, "
+                f"{len(text.split()):,} words)  {baseline / elapsed:5.2f}x"
+            )
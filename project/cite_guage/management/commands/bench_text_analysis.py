@@ -0,0 +1,315 @@
+import os
+import re
+import random
+import time
+import logging
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cite_guage import text_analysis
+
+logger = logging.getLogger(__name__)
+
+WORDS = (
+    "citation network model paper analysis regression learning feature journal impact "
+    "dataset corpus method result baseline evaluation science research the of and in "
+    "to with for this that from over under we our their"
+).split()
+NAMES = "Ada Grace Alan Edsger Barbara Donald Frances John Margaret Ken".split()
+SURNAMES = "Lovelace Hopper Turing Dijkstra Liskov Knuth Allen Backus Hamilton Thompson".split()
+
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize()
+
+
+def synthetic_document(i, rng, paragraphs=40):
+    """A paper-shaped text: title, author line, abstract, body with years and punctuation."""
+    title = _sentence(rng, rng.randint(4, 10))
+    if i % 4 == 0:
+        title = f"Title: {title}"
+    authors = ", ".join(f"{rng.choice(NAMES)} {rng.choice(SURNAMES)}" for _ in range(rng.randint(2, 5)))
+    head = [title, authors]
+    if i % 3:
+        head.append("Abstract: " + ". ".join(_sentence(rng, rng.randint(8, 20)) for _ in range(4)) + ".")
+    body = [
+        ". ".join(
+            f"{_sentence(rng, rng.randint(6, 18))} ({rng.randint(1950, 2040)})" if rng.random() < 0.2
+            else _sentence(rng, rng.randint(6, 18))
+            for _ in range(rng.randint(3, 8))
+        ) + "."
+        for _ in range(paragraphs)
+    ]
+    return "\n".join(head) + "\n\n" + "\n\n".join(body), f"synthetic_paper-{i}.txt"
+
+
+# Verbatim copy of the DocumentProcessorView analysis methods that text_analysis replaced, kept as the baseline.
+class LegacyAnalyzer:
+    def _analyze_document_content(self, text, filename):
+        """Analyze the document content to extract title, abstract, and keywords"""
+        try:
+            logger.debug(f"Starting content analysis for file: {filename}")
+            
+            # Clean the text
+            lines = [line.strip() for line in text.split('\n') if line.strip()]
+            logger.debug(f"Document has {len(lines)} non-empty lines")
+            
+            # Extract components
+            title_result = self._extract_title(lines, filename)
+            abstract_result = self._extract_abstract(text, lines)
+            keywords_result = self._extract_keywords(text)
+            authors_result = self._extract_authors(text, lines)
+            year_result = self._extract_publication_year(text)
+            
+            # Check if all extractions were successful
+            if not all([title_result['success'], abstract_result['success'], keywords_result['success']]):
+                failed_components = []
+                if not title_result['success']: failed_components.append('title')
+                if not abstract_result['success']: failed_components.append('abstract')
+                if not keywords_result['success']: failed_components.append('keywords')
+                
+                error_msg = f"Failed to extract: {', '.join(failed_components)}"
+                logger.error(f"Content analysis failed: {error_msg}")
+                return {'success': False, 'error': error_msg}
+            
+            processed_data = {
+                'title': title_result['data'],
+                'abstract': abstract_result['data'],
+                'keywords': keywords_result['data'],
+                'authors': authors_result['data'],
+                'publication_year': year_result['data']
+            }
+            
+            logger.info(f"Content analysis completed successfully for: {filename}")
+            logger.debug(f"Extracted - Title: {processed_data['title'][:50]}...")
+            logger.debug(f"Extracted - Abstract length: {len(processed_data['abstract'])}")
+            logger.debug(f"Extracted - Keywords count: {len(processed_data['keywords'])}")
+            
+            return {'success': True, 'data': processed_data}
+            
+        except Exception as e:
+            logger.exception(f"Error analyzing document content: {str(e)}")
+            return {'success': False, 'error': f'Failed to analyze document content: {str(e)}'}
+    
+    def _extract_title(self, lines, filename):
+        """Extract or generate document title"""
+        try:
+            logger.debug("Starting title extraction")
+            
+            # Look for patterns that might indicate a title
+            title_patterns = [
+                r'^(title|TITLE):\s*(.+)$',
+                r'^(.{10,100})$',  # Lines with reasonable title length
+            ]
+            
+            # First, look for explicit title markers
+            for i, line in enumerate(lines[:10]):  # Check first 10 lines
+                for pattern in title_patterns[:1]:  # Only explicit markers
+                    match = re.search(pattern, line, re.IGNORECASE)
+                    if match:
+                        title = match.group(2).strip()
+                        logger.debug(f"Found explicit title marker in line {i}: {title}")
+                        return {'success': True, 'data': title}
+            
+            # If no explicit title, use the first substantial line
+            for i, line in enumerate(lines[:5]):
+                if 10 <= len(line) <= 100 and not line.lower().startswith(('abstract', 'introduction')):
+                    logger.debug(f"Using line {i} as title: {line}")
+                    return {'success': True, 'data': line}
+            
+            # Fallback to filename without extension
+            fallback_title = os.path.splitext(filename)[0].replace('_', ' ').replace('-', ' ').title()
+            logger.debug(f"Using fallback title from filename: {fallback_title}")
+            return {'success': True, 'data': fallback_title}
+            
+        except Exception as e:
+            logger.error(f"Error extracting title: {str(e)}")
+            return {'success': False, 'data': "Document Title"}
+    
+    def _extract_abstract(self, text, lines):
+        """Extract abstract or create a summary"""
+        try:
+            logger.debug("Starting abstract extraction")
+            
+            # Look for explicit abstract section
+            abstract_patterns = [
+                r'abstract[:\-\s]*([^\.]*(?:\.[^\.]*){0,3})',
+                r'summary[:\-\s]*([^\.]*(?:\.[^\.]*){0,3})',
+                r'overview[:\-\s]*([^\.]*(?:\.[^\.]*){0,3})'
+            ]
+            
+            text_lower = text.lower()
+            
+            for pattern in abstract_patterns:
+                match = re.search(pattern, text_lower, re.DOTALL | re.IGNORECASE)
+                if match:
+                    abstract = match.group(1).strip()
+                    if len(abstract) > 50:
+                        final_abstract = abstract[:500] + "..." if len(abstract) > 500 else abstract
+                        logger.debug(f"Found explicit abstract section, length: {len(final_abstract)}")
+                        return {'success': True, 'data': final_abstract}
+            
+            # If no explicit abstract, create a summary from the first few sentences
+            sentences = re.split(r'[.!?]+', text)
+            summary_sentences = []
+            total_length = 0
+            
+            for sentence in sentences:
+                sentence = sentence.strip()
+                if sentence and len(sentence) > 20:
+                    summary_sentences.append(sentence)
+                    total_length += len(sentence)
+                    if total_length > 300 or len(summary_sentences) >= 3:
+                        break
+            
+            if summary_sentences:
+                summary = '. '.join(summary_sentences) + '.'
+                logger.debug(f"Created summary from first sentences, length: {len(summary)}")
+                return {'success': True, 'data': summary}
+            
+            logger.warning("No abstract content could be extracted")
+            return {'success': True, 'data': "No abstract available."}
+            
+        except Exception as e:
+            logger.error(f"Error extracting abstract: {str(e)}")
+            return {'success': False, 'data': "Error extracting abstract."}
+    
+    def _extract_authors(self, text, lines):
+        """Extract authors from the document."""
+        try:
+            logger.debug("Starting author extraction")
+            authors = []
+            # Simple pattern: look for lines with multiple names, often below the title
+            # and before the abstract.
+            for line in lines[:20]: # Check top 20 lines
+                # Avoid lines that are clearly part of the title or abstract
+                if line.lower().startswith(('abstract', 'introduction', 'keywords')) or len(line) > 150:
+                    continue
+                # A line with multiple commas or 'and' is a good candidate
+                if (line.count(',') > 1 or ' and ' in line) and len(line.split()) < 20:
+                    # Very basic cleaning
+                    found_authors = re.split(r',\s*|\s+and\s+', line)
+                    # Filter out empty strings and check if they look like names
+                    authors.extend([
+                        author.strip() for author in found_authors 
+                        if author.strip() and len(author.strip().split()) < 4
+                    ])
+                    if authors:
+                        logger.debug(f"Found potential authors: {authors}")
+                        return {'success': True, 'data': authors[:10]} # Limit to 10 authors
+            
+            if not authors:
+                logger.warning("No authors could be extracted.")
+            
+            return {'success': True, 'data': []}
+        except Exception as e:
+            logger.error(f"Error extracting authors: {str(e)}")
+            return {'success': False, 'data': []}
+
+    def _extract_publication_year(self, text):
+        """Extract publication year from the document."""
+        try:
+            logger.debug("Starting publication year extraction")
+            # Look for 4-digit numbers that look like years (e.g., 1990-2024)
+            current_year = timezone.now().year
+            matches = re.findall(r'\b(19\d{2}|20\d{2})\b', text)
+            if matches:
+                years = sorted([int(y) for y in set(matches) if int(y) <= current_year], reverse=True)
+                if years:
+                    year = years[0]
+                    logger.debug(f"Found publication year: {year}")
+                    return {'success': True, 'data': year}
+            logger.warning("No publication year could be extracted.")
+            return {'success': True, 'data': None}
+        except Exception as e:
+            logger.error(f"Error extracting publication year: {str(e)}")
+            return {'success': False, 'data': None}
+
+    def _extract_keywords(self, text, max_keywords=10):
+        """Extract keywords from the document"""
+        try:
+            logger.debug(f"Starting keyword extraction (max: {max_keywords})")
+            
+            # Common stop words to exclude
+            stop_words = {
+                'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+                'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have',
+                'has', 'had', 'do', 'does', 'did', 'will', 'would', 'should', 'could',
+                'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we',
+                'they', 'me', 'him', 'her', 'us', 'them', 'my', 'your', 'his', 'its',
+                'our', 'their', 'can', 'may', 'might', 'must', 'shall', 'from', 'as',
+                'not', 'no', 'yes', 'about', 'into', 'through', 'during', 'before',
+                'after', 'above', 'below', 'up', 'down', 'out', 'off', 'over', 'under',
+                'again', 'further', 'then', 'once'
+            }
+            
+            # Clean and tokenize text
+            cleaned_text = re.sub(r'[^\w\s]', ' ', text.lower())
+            words = cleaned_text.split()
+            logger.debug(f"Total words before filtering: {len(words)}")
+            
+            # Filter words
+            filtered_words = [
+                word for word in words 
+                if len(word) > 3 and word not in stop_words and word.isalpha()
+            ]
+            logger.debug(f"Words after filtering: {len(filtered_words)}")
+            
+            # Count word frequency
+            word_freq = Counter(filtered_words)
+            
+            # Get most common words as keywords
+            keywords = [word for word, count in word_freq.most_common(max_keywords)]
+            
+            if not keywords:
+                logger.warning("No keywords extracted, using fallback")
+                keywords = ['document', 'text', 'content']
+            
+            final_keywords = keywords[:max_keywords]
+            logger.debug(f"Final keywords: {final_keywords}")
+            return {'success': True, 'data': final_keywords}
+            
+        except Exception as e:
+            logger.error(f"Error extracting keywords: {str(e)}")
+            return {'success': False, 'data': ['error', 'processing', 'keywords']}
+
+
+class Command(BaseCommand):
+    help = "Benchmark document text analysis: legacy per-field extractors vs. the single-pass text_analysis module."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--documents", type=int, default=200)
+        parser.add_argument("--paragraphs", type=int, default=40)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def _best_of(self, fn, corpus, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            for text, filename in corpus:
+                fn(text, filename)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        corpus = [synthetic_document(i, rng, options["paragraphs"]) for i in range(options["documents"])]
+        legacy = LegacyAnalyzer()
+        logging.disable(logging.WARNING)  # keep the per-document log lines out of the report
+
+        for text, filename in corpus:
+            if legacy._analyze_document_content(text, filename)['data'] != text_analysis.analyze_text(text, filename):
+                self.stderr.write(self.style.ERROR(f"Analyzers disagree on {filename}."))
+                return
+
+        old = self._best_of(legacy._analyze_document_content, corpus, options["repeat"])
+        new = self._best_of(text_analysis.analyze_text, corpus, options["repeat"])
+        n = len(corpus)
+        size = sum(len(text) for text, _ in corpus) / n
+        self.stdout.write(f"documents: {n}  (avg {size / 1024:,.1f} KiB)")
+        self.stdout.write(f"legacy:    {old * 1000:8.1f} ms  ({n / old:,.0f} docs/s)")
+        self.stdout.write(f"compiled:  {new * 1000:8.1f} ms  ({n / new:,.0f} docs/s)")
+        self.stdout.write(self.style.SUCCESS(f"speedup:   {old / new:.2f}x"))
@@ -0,0 +1,125 @@
+"""
+Stage timing for the document processing pipeline.
+
+DocumentProcessorView keeps a StageTimer on the instance while it handles an
+upload (or a background job runs it); methods decorated with @timed_stage add
+their wall time to it, and record() writes one DocumentProcessingRun row.
+Without a timer on the instance the decorated methods run untimed, which is
+the case in batch worker processes.
+"""
+import os
+import time
+import logging
+import functools
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.conf import settings
+
+from user.models import DocumentProcessingRun
+
+logger = logging.getLogger(__name__)
+
+TOTAL_STAGE = 'total'
+
+
+class StageTimer:
+    """Accumulates milliseconds per stage plus size counters for one document."""
+
+    def __init__(self):
+        self.stages = {}
+        self.page_count = None
+        self.char_count = None
+        self.filename = ''
+        self.file_size = 0
+        self.outcome = DocumentProcessingRun.OUTCOME_FAILED
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + (time.perf_counter() - start) * 1000
+
+    def describe(self, filename, file_size):
+        self.filename = filename
+        self.file_size = file_size or 0
+
+    @property
+    def file_type(self):
+        return os.path.splitext(self.filename)[1].lower().replace('.', '')
+
+    def record(self, user=None, source=DocumentProcessingRun.SOURCE_UPLOAD):
+        """Saves the run; never raises, timing must not break an upload."""
+        if not self.filename or not getattr(settings, 'DOCUMENT_TIMING_ENABLED', True):
+            return None
+        total_ms = (time.perf_counter() - self._started) * 1000
+        try:
+            return DocumentProcessingRun.objects.create(
+                user=user if getattr(user, 'pk', None) else None,
+                filename=self.filename[:255],
+                file_type=self.file_type,
+                file_size=self.file_size,
+                source=source,
+                outcome=self.outcome,
+                page_count=self.page_count,
+                char_count=self.char_count,
+                stages={name: round(ms, 2) for name, ms in self.stages.items()},
+                total_ms=round(total_ms, 2),
+            )
+        except Exception as e:
+            logger.error(f"Could not record processing run for {self.filename}: {e}")
+            return None
+
+
+def timed_stage(name):
+    """Times a DocumentProcessorView method on the instance's stage_timer, if it has one."""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            timer = getattr(self, 'stage_timer', None)
+            if timer is None:
+                return method(self, *args, **kwargs)
+            with timer.stage(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# ----------------- Reporting -----------------
+def percentile(sorted_values, q):
+    """Linear-interpolated percentile (0-100) of an already sorted list."""
+    if not sorted_values:
+        return None
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize_runs(runs):
+    """
+    Rows of {file_type, stage, count, p50, p95, max} (milliseconds) for the
+    given DocumentProcessingRun values, sorted by file type then slowest p95.
+    """
+    samples = defaultdict(list)
+    for file_type, stages, total_ms in runs:
+        for stage, ms in stages.items():
+            samples[(file_type, stage)].append(ms)
+        samples[(file_type, TOTAL_STAGE)].append(total_ms)
+
+    rows = []
+    for (file_type, stage), values in samples.items():
+        values.sort()
+        rows.append({
+            'file_type': file_type or '-',
+            'stage': stage,
+            'count': len(values),
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'max': values[-1],
+        })
+    rows.sort(key=lambda row: (row['file_type'], row['stage'] != TOTAL_STAGE, -row['p95']))
+    return rows
@@ -0,0 +1,154 @@
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from celery import shared_task
+from django.conf import settings
+from django.core.files import File
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from user.models import DocumentProcessingJob, DocumentProcessingRun, ResearchPaper
+from .extraction import content_hash
+from . import text_analysis
+from .metrics import StageTimer
+
+logger = logging.getLogger(__name__)
+
+# "celery" (needs a broker), "thread" (in-process pool) or "eager" (run inline)
+EXECUTOR = getattr(settings, "DOCUMENT_PROCESSING_EXECUTOR", "celery")
+THREAD_WORKERS = getattr(settings, "DOCUMENT_PROCESSING_THREADS", 2)
+
+_thread_pool = None
+
+
+def _open_upload(job):
+    """The job's stored upload as a django File named like the original."""
+    upload = File(job.file.open('rb'), name=job.filename)
+    upload.size = job.file_size
+    return upload
+
+
+def _run_full_job(job, processor):
+    """Extract + analyse + save; returns the save step's result dict."""
+    upload = _open_upload(job)
+    try:
+        file_hash = content_hash(upload)
+        processing_result = processor._process_document_content(upload, job.user)
+    finally:
+        upload.close()
+    if not processing_result['success']:
+        return {'success': False, 'error': f"Processing failed: {processing_result['error']}"}
+
+    save_result = processor._save_research_paper_data(
+        user=job.user,
+        filename=job.filename,
+        file_size=job.file_size,
+        processed_data=processing_result['data'],
+        content_hash=file_hash
+    )
+    if save_result['success']:
+        job.result = processing_result['data']
+        job.research_paper = save_result['research_paper']
+        job.is_updated = save_result['is_updated']
+        processor._log_processing_success(job.user, upload, job.research_paper)
+    return save_result
+
+
+def _run_keywords_job(job, processor):
+    """Full-text keywords for a paper that was saved from its front matter only."""
+    upload = _open_upload(job)
+    try:
+        extension = os.path.splitext(job.filename)[1].lower()
+        text_result = processor._extract_text_by_type(upload, extension)
+    finally:
+        upload.close()
+    if not text_result['success']:
+        return text_result
+
+    keywords = text_analysis.extract_keywords(text_result['text'])
+    ResearchPaper.objects.filter(pk=job.research_paper_id).update(keywords=keywords, updated_at=timezone.now())
+    job.result = {'keywords': keywords}
+    logger.info(f"Document job {job.pk} - Full-text keywords saved for research paper {job.research_paper_id}")
+    return {'success': True}
+
+
+def run_document_job(job_id):
+    """Runs one DocumentProcessingJob on its stored upload (full processing or keywords only)."""
+    from .views import DocumentProcessorView
+
+    job = DocumentProcessingJob.objects.select_related('user').get(pk=job_id)
+    if job.is_finished:
+        logger.info(f"Document job {job_id} already {job.status}, skipping")
+        return job.status
+
+    job.status = DocumentProcessingJob.STATUS_PROCESSING
+    job.started_at = timezone.now()
+    job.save(update_fields=['status', 'started_at'])
+
+    processor = DocumentProcessorView()
+    processor.stage_timer = StageTimer()
+    processor.stage_timer.describe(job.filename, job.file_size)
+    try:
+        if job.mode == DocumentProcessingJob.MODE_KEYWORDS:
+            outcome = _run_keywords_job(job, processor)
+        else:
+            outcome = _run_full_job(job, processor)
+    except Exception as e:
+        logger.exception(f"Document job {job_id} crashed")
+        outcome = {'success': False, 'error': str(e)}
+
+    job.finished_at = timezone.now()
+    if outcome['success']:
+        processor.stage_timer.outcome = DocumentProcessingRun.OUTCOME_PROCESSED
+        job.status = DocumentProcessingJob.STATUS_DONE
+        job.file.delete(save=False)
+    else:
+        job.status = DocumentProcessingJob.STATUS_FAILED
+        job.error = outcome['error']
+        logger.error(f"Document job {job_id} failed: {job.error}")
+    job.save()
+    processor.stage_timer.record(job.user, source=DocumentProcessingRun.SOURCE_JOB)
+    return job.status
+
+
+@shared_task
+def process_document_job(job_id):
+    return run_document_job(job_id)
+
+
+def _run_in_thread(job_id):
+    close_old_connections()
+    try:
+        run_document_job(job_id)
+    except Exception:
+        logger.exception(f"Document job {job_id} failed in worker thread")
+    finally:
+        close_old_connections()
+
+
+def _dispatch(job_id, executor):
+    global _thread_pool
+    if executor == "eager":
+        run_document_job(job_id)
+    elif executor == "thread":
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(max_workers=THREAD_WORKERS, thread_name_prefix="document-job")
+        _thread_pool.submit(_run_in_thread, job_id)
+    else:
+        try:
+            task = process_document_job.delay(job_id)
+        except Exception as e:
+            # Broker unreachable: fail the job instead of the request that queued it
+            logger.exception(f"Could not queue document job {job_id}")
+            DocumentProcessingJob.objects.filter(pk=job_id).update(
+                status=DocumentProcessingJob.STATUS_FAILED, error=f"Could not queue job: {e}", finished_at=timezone.now()
+            )
+            return
+        DocumentProcessingJob.objects.filter(pk=job_id).update(task_id=task.id)
+
+
+def enqueue_document_job(job, executor=None):
+    """Runs the job on the configured executor once the current transaction commits."""
+    executor = executor or EXECUTOR
+    transaction.on_commit(lambda: _dispatch(job.pk, executor))
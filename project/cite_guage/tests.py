@@ -1,3 +1,309 @@
-from django.test import TestCase
+import io
+import random
+import tempfile
+import zipfile
+from unittest import mock
 
-# Create your tests here.
+import docx
+from django.core.files.base import File
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from user.models import CustomUser, DocumentProcessingJob, DocumentProcessingRun, ResearchPaper, ResearchPaperRidgePrediction
+from . import batch, extraction, metrics, tasks, text_analysis, views
+from .management.commands.bench_pdf_extraction import synthetic_pdf
+from .management.commands.bench_text_analysis import LegacyAnalyzer, synthetic_document
+
+
+@override_settings(DOCUMENT_PROCESSING_ASYNC=True, MEDIA_ROOT=tempfile.mkdtemp())
+class AsyncDocumentProcessingTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="upload@example.com", password="x")
+        self.client.force_login(self.user)
+
+    def _upload(self, name, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('upload_document'), {'document': SimpleUploadedFile(name, content)})
+
+    def _executor(self, name):
+        return mock.patch.object(tasks, "EXECUTOR", name)
+
+    def test_upload_is_queued_then_processed_by_eager_executor(self):
+        text = b"Title: Streaming parsers for citation data\nAbstract: " + b"We study parsing of large records. " * 5
+        with self._executor("eager"):
+            response = self._upload("paper.txt", text)
+
+        job = DocumentProcessingJob.objects.get()
+        self.assertRedirects(response, reverse('document_job_status', args=[job.pk]), fetch_redirect_response=False)
+        self.assertEqual(job.status, DocumentProcessingJob.STATUS_DONE)
+        self.assertEqual(job.research_paper, ResearchPaper.objects.get(user=self.user, filename="paper.txt"))
+        self.assertEqual(job.result['title'], "Streaming parsers for citation data")
+        self.assertFalse(job.file)
+        self.assertEqual(
+            sorted(DocumentProcessingRun.objects.values_list('source', 'outcome')),
+            [('job', 'processed'), ('upload', 'queued')],
+        )
+
+        status = self.client.get(reverse('document_job_status', args=[job.pk]), {'format': 'json'}).json()
+        self.assertEqual((status['status'], status['finished']), ('done', True))
+
+    def test_failed_job_reports_error(self):
+        with self._executor("eager"):
+            self._upload("empty.txt", b"   \n")
+
+        job = DocumentProcessingJob.objects.get()
+        self.assertEqual(job.status, DocumentProcessingJob.STATUS_FAILED)
+        self.assertIn("No text content", job.error)
+        self.assertContains(self.client.get(reverse('document_job_status', args=[job.pk])), "Processing failed")
+
+
+class ProcessingTimingTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="timing@example.com", password="x")
+        self.client.force_login(self.user)
+
+    def test_upload_records_stage_timings_for_staff_report(self):
+        text = b"Title: Timing the pipeline\nAbstract: " + b"We measure every stage of processing. " * 5
+        self.client.post(reverse('upload_document'), {'document': SimpleUploadedFile("paper.txt", text)})
+
+        run = DocumentProcessingRun.objects.get()
+        self.assertEqual((run.file_type, run.outcome, run.source), ("txt", "processed", "upload"))
+        self.assertEqual(run.char_count, len(text))
+        self.assertEqual(set(run.stages), {'validate', 'dedupe', 'extract_txt', 'analyze', 'save', 'log'})
+        self.assertGreaterEqual(run.total_ms, sum(run.stages.values()))
+
+        url = reverse('processing_timings')
+        with self.assertLogs('django.request', level='WARNING'):
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        report = self.client.get(url, {'format': 'json'}).json()
+        stages = {row['stage']: row for row in report['stages']}
+        self.assertEqual(report['runs'], 1)
+        self.assertEqual(stages['total']['p95'], run.total_ms)
+        self.assertContains(self.client.get(url), "extract_txt")
+
+    def test_percentiles_interpolate(self):
+        self.assertEqual(metrics.percentile([10, 20, 30, 40], 50), 25)
+        self.assertEqual(metrics.percentile([10, 20, 30, 40], 95), 38.5)
+        self.assertIsNone(metrics.percentile([], 50))
+
+
+class PDFExtractionTests(SimpleTestCase):
+
+    def setUp(self):
+        if extraction.fitz is None:
+            self.skipTest("PyMuPDF not available")
+        self.data = synthetic_pdf(6)
+
+    def test_parallel_pages_match_sequential_order(self):
+        sequential, page_count = extraction.PyMuPDFEngine(parallel_min_pages=100).extract_pages(self.data)
+        parallel, _ = extraction.PyMuPDFEngine(parallel_min_pages=0, workers=2).extract_pages(self.data)
+
+        self.assertEqual(parallel, sequential)
+        self.assertEqual(page_count, 6)
+        self.assertTrue(sequential[5].startswith("Page 6"))
+
+    def test_broken_pool_falls_back_and_is_rebuilt(self):
+        from concurrent.futures.process import BrokenProcessPool
+
+        broken = mock.Mock()
+        broken.submit.return_value.result.side_effect = BrokenProcessPool("child died")
+        engine = extraction.PyMuPDFEngine(parallel_min_pages=0, workers=2)
+        with mock.patch.object(extraction, "_process_pool", broken), \
+                mock.patch.object(extraction, "_engine_chain", lambda name: [engine, extraction.PyPDF2Engine()]), \
+                self.assertLogs("cite_guage.extraction", "WARNING"):
+            pages, engine_name, _ = extraction.extract_pdf_pages(self.data)
+            self.assertIsNone(extraction._process_pool)
+
+        broken.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+        self.assertEqual((engine_name, len(pages)), ("pypdf2", 6))
+
+    def test_falls_back_to_pypdf2_without_pymupdf(self):
+        with mock.patch.object(extraction, "fitz", None):
+            text, engine, page_count = extraction.extract_pdf_text(self.data)
+
+        self.assertEqual((engine, page_count), ("pypdf2", 6))
+        self.assertIn("Page 6", text)
+
+
+class TextAnalysisTests(SimpleTestCase):
+
+    def test_matches_legacy_extractors(self):
+        rng = random.Random(7)
+        legacy = LegacyAnalyzer()
+        documents = [synthetic_document(i, rng, paragraphs=5) for i in range(12)]
+        documents.append(("Short note, 1999.\n\nNo real content here", "empty-note.txt"))
+        documents.append(("", "blank_file.txt"))
+
+        with self.assertLogs("cite_guage", level="WARNING"):
+            for text, filename in documents:
+                self.assertEqual(
+                    text_analysis.analyze_text(text, filename),
+                    legacy._analyze_document_content(text, filename)['data'],
+                )
+
+    def test_year_ignores_future_and_embedded_numbers(self):
+        text = "Published 2015; revised 2019, see x2021 and 20230 and the 2999 roadmap"
+        self.assertEqual(text_analysis.extract_publication_year(text, current_year=2020), 2019)
+        self.assertIsNone(text_analysis.extract_publication_year("no years here"))
+
+
+class TextAndDocxDecodingTests(SimpleTestCase):
+
+    def test_utf8_characters_split_across_chunks(self):
+        text = "Résumé of naïve café ✓ " * 20
+        upload = File(io.BytesIO(b"\xef\xbb\xbf" + text.encode("utf-8")), name="notes.txt")
+
+        self.assertEqual(extraction.decode_text_upload(upload, chunk_size=7), text)
+
+    def test_non_utf8_text_falls_back_to_latin1(self):
+        upload = File(io.BytesIO("naïve café crème".encode("utf-8") + "crème".encode("latin-1")), name="notes.txt")
+        self.assertEqual(extraction.decode_text_upload(upload, chunk_size=3), "naÃ¯ve cafÃ© crÃ¨mecrème")
+
+    def test_docx_body_tables_then_headers(self):
+        document = docx.Document()
+        document.sections[0].header.paragraphs[0].text = "Running header"
+        document.add_paragraph("A Study of Citation Counts")
+        table = document.add_table(rows=2, cols=2)
+        table.cell(0, 0).text, table.cell(0, 1).text = "Model", "RMSE"
+        table.cell(1, 0).merge(table.cell(1, 1)).text = "Ridge 4.2"
+        document.add_paragraph("Conclusion")
+        buffer = io.BytesIO()
+        document.save(buffer)
+
+        upload = SimpleUploadedFile("paper.docx", buffer.getvalue())
+        result = views.DocumentProcessorView()._extract_text_from_docx(upload)
+
+        self.assertEqual(
+            result['text'], "A Study of Citation Counts\nModel\tRMSE\nRidge 4.2\nConclusion\nRunning header\n",
+        )
+
+
+@override_settings(DOCUMENT_METADATA_FIRST=True, DOCUMENT_METADATA_PAGES=2, MEDIA_ROOT=tempfile.mkdtemp())
+class MetadataFirstProcessingTests(TestCase):
+
+    def setUp(self):
+        if extraction.fitz is None:
+            self.skipTest("PyMuPDF not available")
+        self.user = CustomUser.objects.create_user(email="front@example.com", password="x")
+        self.client.force_login(self.user)
+
+    def test_reads_front_matter_then_refreshes_keywords_in_background(self):
+        data = synthetic_pdf(40)
+        pages_read = []
+        real_extract = extraction.extract_pdf_text
+
+        def spy(data, engine=None, max_pages=None):
+            pages_read.append(max_pages)
+            return real_extract(data, engine, max_pages)
+
+        with mock.patch("cite_guage.views.extract_pdf_text", spy), mock.patch.object(tasks, "EXECUTOR", "eager"), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('upload_document'), {'document': SimpleUploadedFile("thesis.pdf", data)})
+
+        self.assertTrue(response.context['result']['keywords_pending'])
+        self.assertEqual(pages_read, [2, None])  # request: front matter only; job: full text
+        job = DocumentProcessingJob.objects.get(mode=DocumentProcessingJob.MODE_KEYWORDS)
+        self.assertEqual(job.status, DocumentProcessingJob.STATUS_DONE)
+        self.assertEqual(ResearchPaper.objects.get(filename="thesis.pdf").keywords, job.result['keywords'])
+
+
+class ContentHashDeduplicationTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="dedupe@example.com", password="x")
+        self.client.force_login(self.user)
+        self.text = b"Title: Hashing uploads\nAbstract: " + b"Identical bytes need no second parse. " * 4
+
+    def _upload(self, name):
+        return self.client.post(reverse('upload_document'), {'document': SimpleUploadedFile(name, self.text)})
+
+    def test_identical_content_is_extracted_once(self):
+        real = views.DocumentProcessorView._process_document_content
+        with mock.patch.object(views.DocumentProcessorView, "_process_document_content", autospec=True,
+                               side_effect=real) as process:
+            self._upload("paper.txt")
+            self._upload("paper-renamed.txt")
+            self._upload("paper.txt")
+
+        self.assertEqual(process.call_count, 1)
+        papers = ResearchPaper.objects.filter(user=self.user).order_by("filename")
+        self.assertEqual([p.filename for p in papers], ["paper-renamed.txt", "paper.txt"])
+        self.assertEqual(len({p.content_hash for p in papers}), 1)
+        self.assertEqual(papers[0].title, "Hashing uploads")
+
+
+class BatchUploadTests(TestCase):
+
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(email="batch@example.com", password="x")
+        self.client.force_login(self.user)
+
+    def _doc(self, title):
+        return f"Title: {title}\nAbstract: ".encode() + f"{title} is studied at length here. ".encode() * 4
+
+    def _zip(self, members):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for name, data in members.items():
+                archive.writestr(name, data)
+        return SimpleUploadedFile("catalogue.zip", buffer.getvalue())
+
+    def test_processes_zip_and_files_in_bulk_with_report_and_scores(self):
+        archive = self._zip({
+            "papers/a.txt": self._doc("First paper"),
+            "papers/copy-of-a.txt": self._doc("First paper"),
+            "papers/notes.md": b"ignored",
+            "papers/bomb.txt": b"0" * (2 * 1024 * 1024),
+        })
+        fake_predictions = lambda records: [{"raw_prediction": 1.0, "predicted": 7, "ci_low": 2.0, "ci_high": 15.0,
+                                             "model_version": "v3"} for _ in records]
+
+        with mock.patch.object(batch, "BATCH_WORKERS", 2), mock.patch.object(batch, "predict_many", fake_predictions):
+            response = self.client.post(reverse("batch_upload_documents"), {
+                "documents": [archive, SimpleUploadedFile("b.txt", self._doc("Second paper"))],
+                "score": "1",
+            })
+
+        report = {entry.name: entry.status for entry in response.context["entries"]}
+        self.assertEqual(report, {
+            "a.txt": "created", "copy-of-a.txt": "reused", "catalogue.zip/papers/notes.md": "skipped",
+            "catalogue.zip/papers/bomb.txt": "skipped", "b.txt": "created",
+        })
+        papers = ResearchPaper.objects.filter(user=self.user)
+        self.assertEqual(sorted(p.title for p in papers), ["First paper", "First paper", "Second paper"])
+        self.assertEqual({p.predicted_citations for p in papers}, {7})
+        self.assertEqual(list(ResearchPaperRidgePrediction.objects.values_list("model_version", flat=True)), ["v3"] * 3)
+
+        # Same batch again: nothing is re-parsed or rewritten
+        with mock.patch.object(batch, "_run_extraction") as run_extraction:
+            response = self.client.post(reverse("batch_upload_documents"),
+                                        {"documents": [SimpleUploadedFile("b.txt", self._doc("Second paper"))]})
+        run_extraction.assert_called_once_with([], batch.BATCH_WORKERS)
+        self.assertEqual(response.context["entries"][0].status, "unchanged")
+
+    def test_paper_without_title_or_abstract_does_not_block_scoring(self):
+        entries = []
+        for i, (title, abstract) in enumerate([("Scored", ""), ("", ""), ("", "Only an abstract")]):
+            entry = batch.BatchEntry(f"{i}.txt", status="created")
+            entry.research_paper = ResearchPaper.objects.create(
+                user=self.user, title=title, abstract=abstract, filename=f"{i}.txt", file_size=1, file_type="txt")
+            entries.append(entry)
+
+        def fake_predictions(records):
+            if any(not (r["title"] or r["abstract"]) for r in records):
+                raise ValueError("At least one of title or abstract must be provided")
+            return [{"raw_prediction": 1.0, "predicted": 7, "ci_low": 2.0, "ci_high": 15.0, "model_version": "v3"}
+                    for _ in records]
+
+        with mock.patch.object(batch, "predict_many", fake_predictions):
+            batch.score_batch(entries)
+
+        self.assertEqual([e.prediction is not None for e in entries], [True, False, True])
+        self.assertEqual([e.message for e in entries], ["", "Not scored: no title or abstract", ""])
+        self.assertEqual(ResearchPaperRidgePrediction.objects.count(), 2)
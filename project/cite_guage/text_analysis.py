@@ -0,0 +1,155 @@
+"""
+Title / abstract / keyword / author / year extraction for uploaded documents.
+
+The text is lowercased once and tokenized once (`\\w+`); keywords and the
+publication year both come from the counts of those tokens. Title and authors
+only look at the first lines, and the fallback summary at the first sentences,
+so those are read lazily instead of splitting the whole document.
+"""
+import os
+import re
+from collections import Counter
+from itertools import islice
+
+from django.utils import timezone
+
+MAX_KEYWORDS = 10
+FALLBACK_KEYWORDS = ['document', 'text', 'content']
+NO_ABSTRACT = "No abstract available."
+
+# Common stop words to exclude from keywords
+STOP_WORDS = frozenset({
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
+    'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have',
+    'has', 'had', 'do', 'does', 'did', 'will', 'would', 'should', 'could',
+    'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we',
+    'they', 'me', 'him', 'her', 'us', 'them', 'my', 'your', 'his', 'its',
+    'our', 'their', 'can', 'may', 'might', 'must', 'shall', 'from', 'as',
+    'not', 'no', 'yes', 'about', 'into', 'through', 'during', 'before',
+    'after', 'above', 'below', 'up', 'down', 'out', 'off', 'over', 'under',
+    'again', 'further', 'then', 'once'
+})
+
+_TOKEN = re.compile(r'\w+')
+_YEAR = re.compile(r'(?:19|20)\d\d')
+_LINE = re.compile(r'[^\n]+')
+_SENTENCE = re.compile(r'[^.!?]+')
+_TITLE_MARKER = re.compile(r'^(title|TITLE):\s*(.+)$', re.IGNORECASE)
+_AUTHOR_SPLIT = re.compile(r',\s*|\s+and\s+')
+_ABSTRACT_PATTERNS = [
+    re.compile(r'abstract[:\-\s]*([^\.]*(?:\.[^\.]*){0,3})', re.DOTALL | re.IGNORECASE),
+    re.compile(r'summary[:\-\s]*([^\.]*(?:\.[^\.]*){0,3})', re.DOTALL | re.IGNORECASE),
+    re.compile(r'overview[:\-\s]*([^\.]*(?:\.[^\.]*){0,3})', re.DOTALL | re.IGNORECASE),
+]
+
+
+def leading_lines(text, limit):
+    """First `limit` non-empty, stripped lines without splitting the whole text."""
+    lines = (match.group().strip() for match in _LINE.finditer(text))
+    return list(islice((line for line in lines if line), limit))
+
+
+def token_counts(text):
+    """
+    Counts of the lowercased `\\w+` tokens, in first-seen order; the same tokens
+    the old punctuation-stripping split produced.
+    """
+    return Counter(_TOKEN.findall(text.lower()))
+
+
+def extract_title(lines, filename):
+    # First, look for explicit title markers
+    for line in lines[:10]:
+        match = _TITLE_MARKER.search(line)
+        if match:
+            return match.group(2).strip()
+
+    # If no explicit title, use the first substantial line
+    for line in lines[:5]:
+        if 10 <= len(line) <= 100 and not line.lower().startswith(('abstract', 'introduction')):
+            return line
+
+    # Fallback to filename without extension
+    return os.path.splitext(filename)[0].replace('_', ' ').replace('-', ' ').title()
+
+
+def extract_abstract(text, lowered=None):
+    lowered = text.lower() if lowered is None else lowered
+    for pattern in _ABSTRACT_PATTERNS:
+        match = pattern.search(lowered)
+        if match:
+            abstract = match.group(1).strip()
+            if len(abstract) > 50:
+                return abstract[:500] + "..." if len(abstract) > 500 else abstract
+
+    # If no explicit abstract, create a summary from the first few sentences
+    summary_sentences = []
+    total_length = 0
+    for match in _SENTENCE.finditer(text):
+        sentence = match.group().strip()
+        if len(sentence) > 20:
+            summary_sentences.append(sentence)
+            total_length += len(sentence)
+            if total_length > 300 or len(summary_sentences) >= 3:
+                break
+
+    if summary_sentences:
+        return '. '.join(summary_sentences) + '.'
+    return NO_ABSTRACT
+
+
+def extract_authors(lines):
+    # Lines with multiple names, often below the title and before the abstract
+    for line in lines[:20]:
+        if line.lower().startswith(('abstract', 'introduction', 'keywords')) or len(line) > 150:
+            continue
+        if (line.count(',') > 1 or ' and ' in line) and len(line.split()) < 20:
+            authors = [
+                author.strip() for author in _AUTHOR_SPLIT.split(line)
+                if author.strip() and len(author.strip().split()) < 4
+            ]
+            if authors:
+                return authors[:10]
+    return []
+
+
+def keywords_from_counts(counts, max_keywords=MAX_KEYWORDS):
+    # Filtering the distinct tokens keeps Counter's first-seen order, so ties rank as before
+    candidates = Counter({
+        token: count for token, count in counts.items()
+        if len(token) > 3 and token not in STOP_WORDS and token.isalpha()
+    })
+    keywords = [word for word, _ in candidates.most_common(max_keywords)]
+    return keywords or FALLBACK_KEYWORDS[:max_keywords]
+
+
+def year_from_counts(counts, current_year=None):
+    """Latest 19xx/20xx token that is not in the future, or None."""
+    current_year = current_year or timezone.now().year
+    years = [
+        int(token) for token in counts
+        if len(token) == 4 and _YEAR.fullmatch(token) and int(token) <= current_year
+    ]
+    return max(years) if years else None
+
+
+def extract_keywords(text, max_keywords=MAX_KEYWORDS):
+    return keywords_from_counts(token_counts(text), max_keywords)
+
+
+def extract_publication_year(text, current_year=None):
+    return year_from_counts(token_counts(text), current_year)
+
+
+def analyze_text(text, filename, max_keywords=MAX_KEYWORDS, current_year=None):
+    """All fields of one document from a single lowercase copy and a single tokenization."""
+    lowered = text.lower()
+    counts = Counter(_TOKEN.findall(lowered))
+    lines = leading_lines(text, 20)
+    return {
+        'title': extract_title(lines, filename),
+        'abstract': extract_abstract(text, lowered),
+        'keywords': keywords_from_counts(counts, max_keywords),
+        'authors': extract_authors(lines),
+        'publication_year': year_from_counts(counts, current_year),
+    }
@@ -3,6 +3,9 @@ from django.urls import path
 from .views import (
     DashboardView,
     DocumentProcessorView,
+    DocumentJobStatusView,
+    BatchDocumentUploadView,
+    ProcessingTimingsView,
     ResearchPaperDetail
 
 )
@@ -10,5 +13,8 @@ from .views import (
 urlpatterns = [
     path('', DashboardView.as_view(), name='dashboard'),
     path('upload-document/', DocumentProcessorView.as_view(), name='upload_document'),
+    path('upload-document/batch/', BatchDocumentUploadView.as_view(), name='batch_upload_documents'),
+    path('upload-document/jobs/<int:pk>/', DocumentJobStatusView.as_view(), name='document_job_status'),
+    path('upload-document/timings/', ProcessingTimingsView.as_view(), name='processing_timings'),
     path('research-paper/<int:pk>/', ResearchPaperDetail.as_view(), name='Research_paper_detail')
 ]
\ No newline at end of file
@@ -1,14 +1,12 @@
 import os
 import logging
-import tempfile
-import PyPDF2
-import docx
-import re
 import random
 
-from django.shortcuts import render, redirect
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import render, redirect, get_object_or_404
 from django.views.generic import DetailView
-from django.contrib.auth.mixins import LoginRequiredMixin
+from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.views import View
 from django.contrib import messages
 from django.db import transaction
@@ -18,8 +16,13 @@ from django.db.models import Count
 from django.db.models.functions import TruncMonth, ExtractYear
 from datetime import timedelta
 from collections import Counter
-from user.models import ResearchPaper, WOSSearchHistory, WOSLightGBMPrediction, WOSRidgePrediction, ResearchPaperRidgePrediction, ResearchPaperLightGBMPrediction, ResearchPaperRidgePrediction, ResearchPaperLightGBMPrediction
+from user.models import DocumentProcessingJob, DocumentProcessingRun, ResearchPaper, WOSSearchHistory, WOSLightGBMPrediction, WOSRidgePrediction, ResearchPaperRidgePrediction, ResearchPaperLightGBMPrediction, ResearchPaperRidgePrediction, ResearchPaperLightGBMPrediction
 from user.ml_utils import predict_from_text, MLModelError
+from .tasks import enqueue_document_job
+from . import batch
+from .extraction import content_hash, decode_text_upload, extract_docx_text, extract_pdf_text, read_upload
+from . import text_analysis
+from .metrics import StageTimer, summarize_runs, timed_stage
 
 
 # Set up logging for debugging
@@ -39,7 +42,14 @@ class DocumentProcessorView(LoginRequiredMixin, View):
         return render(request, 'cite_guage/upload_document.html')
     
     def post(self, request):
-        """Handle document upload and processing"""
+        """Handle document upload and processing, recording how long each stage took"""
+        self.stage_timer = StageTimer()
+        try:
+            return self._handle_upload(request)
+        finally:
+            self.stage_timer.record(request.user, source=DocumentProcessingRun.SOURCE_UPLOAD)
+
+    def _handle_upload(self, request):
         try:
             logger.info(f"User {request.user.email} initiated document upload")
             
@@ -53,9 +63,28 @@ class DocumentProcessorView(LoginRequiredMixin, View):
                 )
             
             uploaded_file = file_validation_result['file']
-            
-            # Step 2: Process the document
-            processing_result = self._process_document_content(uploaded_file, request.user)
+            self.stage_timer.describe(uploaded_file.name, uploaded_file.size)
+
+            # Identical bytes uploaded before: reuse that extraction instead of re-parsing
+            with self.stage_timer.stage('dedupe'):
+                file_hash = content_hash(uploaded_file)
+                cached_result = self._find_cached_extraction(request.user, file_hash, uploaded_file.name)
+
+            # Async mode: store the upload and let a background job do steps 2-3
+            if cached_result is None and getattr(settings, 'DOCUMENT_PROCESSING_ASYNC', False):
+                job = self._queue_processing_job(request.user, uploaded_file)
+                self.stage_timer.outcome = DocumentProcessingRun.OUTCOME_QUEUED
+                messages.info(request, f'Document "{uploaded_file.name}" uploaded and queued for processing.')
+                return redirect('document_job_status', pk=job.pk)
+            
+            # Step 2: Process the document (only the leading pages of a PDF in metadata-first mode)
+            if cached_result is not None:
+                logger.info(f"User {request.user} - Reusing extraction of research paper {cached_result['source'].id} (same content)")
+                processing_result = cached_result
+            else:
+                processing_result = self._process_document_content(
+                    uploaded_file, request.user, max_pages=self._metadata_page_limit(uploaded_file)
+                )
             if not processing_result['success']:
                 return self._handle_error(
                     request,
@@ -63,13 +92,17 @@ class DocumentProcessorView(LoginRequiredMixin, View):
                     'cite_guage/upload_document.html'
                 )
             
-            # Step 3: Save or update in database
-            save_result = self._save_research_paper_data(
-                user=request.user,
-                filename=uploaded_file.name,
-                file_size=uploaded_file.size,
-                processed_data=processing_result['data']
-            )
+            # Step 3: Save or update in database (nothing to write for the same name and content)
+            if cached_result is not None and cached_result['source'].filename == uploaded_file.name:
+                save_result = {'success': True, 'research_paper': cached_result['source'], 'is_updated': False}
+            else:
+                save_result = self._save_research_paper_data(
+                    user=request.user,
+                    filename=uploaded_file.name,
+                    file_size=uploaded_file.size,
+                    processed_data=processing_result['data'],
+                    content_hash=file_hash
+                )
             
             if not save_result['success']:
                 return self._handle_error(
@@ -81,11 +114,28 @@ class DocumentProcessorView(LoginRequiredMixin, View):
             # Step 4: Log success and prepare response
             research_paper = save_result['research_paper']
             self._log_processing_success(request.user, uploaded_file, research_paper)
+
+            # Keywords so far come from the front matter; refresh them from the full text off-request
+            if processing_result['data'].get('keywords_pending'):
+                self._queue_processing_job(
+                    request.user, uploaded_file,
+                    mode=DocumentProcessingJob.MODE_KEYWORDS, research_paper=research_paper
+                )
             
-            messages.success(
-                request, 
-                f'Document "{uploaded_file.name}" processed and saved successfully!'
+            self.stage_timer.outcome = (
+                DocumentProcessingRun.OUTCOME_REUSED if cached_result is not None
+                else DocumentProcessingRun.OUTCOME_PROCESSED
             )
+            if cached_result is not None:
+                messages.success(
+                    request,
+                    f'Document "{uploaded_file.name}" matches an earlier upload; its extracted content was reused.'
+                )
+            else:
+                messages.success(
+                    request, 
+                    f'Document "{uploaded_file.name}" processed and saved successfully!'
+                )
             
             context = {
                 'result': processing_result['data'],
@@ -104,6 +154,7 @@ class DocumentProcessorView(LoginRequiredMixin, View):
                 'cite_guage/upload_document.html'
             )
     
+    @timed_stage('validate')
     def _validate_uploaded_file(self, request):
         """Step 1: Validate the uploaded file"""
         try:
@@ -158,7 +209,36 @@ class DocumentProcessorView(LoginRequiredMixin, View):
             logger.error(f"Error validating file: {str(e)}")
             return {'success': False, 'error': 'File validation error'}
     
-    def _process_document_content(self, uploaded_file, user):
+    def _find_cached_extraction(self, user, file_hash, filename):
+        """Extraction data of the user's paper with identical content (same filename preferred), or None"""
+        if not file_hash:
+            return None
+        candidates = ResearchPaper.objects.filter(user=user, content_hash=file_hash)
+        source = candidates.filter(filename=filename).first() or candidates.first()
+        if source is None:
+            return None
+        return {
+            'success': True,
+            'source': source,
+            'data': {
+                'title': source.title,
+                'abstract': source.abstract,
+                'keywords': source.keywords,
+                'authors': source.authors,
+                'publication_year': source.publication_year,
+                'keywords_pending': False,
+            },
+        }
+    
+    def _metadata_page_limit(self, uploaded_file):
+        """Pages to read up front in metadata-first mode (PDF only), or None for the whole file"""
+        if not getattr(settings, 'DOCUMENT_METADATA_FIRST', False):
+            return None
+        if os.path.splitext(uploaded_file.name)[1].lower() != '.pdf':
+            return None
+        return getattr(settings, 'DOCUMENT_METADATA_PAGES', 2)
+    
+    def _process_document_content(self, uploaded_file, user, max_pages=None):
         """Step 2: Process the uploaded document and extract content"""
         try:
             logger.info(f"User {user} - Starting document content processing")
@@ -168,7 +248,7 @@ class DocumentProcessorView(LoginRequiredMixin, View):
             logger.debug(f"Processing file type: {file_extension}")
             
             # Extract text based on file type
-            text_extraction_result = self._extract_text_by_type(uploaded_file, file_extension)
+            text_extraction_result = self._extract_text_by_type(uploaded_file, file_extension, max_pages=max_pages)
             if not text_extraction_result['success']:
                 return text_extraction_result
             
@@ -179,11 +259,18 @@ class DocumentProcessorView(LoginRequiredMixin, View):
                 return {'success': False, 'error': 'No text content found in document'}
             
             logger.debug(f"User {user} - Text extracted successfully, length: {len(text)}")
+            timer = getattr(self, 'stage_timer', None)
+            if timer is not None:
+                timer.char_count = len(text)
+                timer.page_count = text_extraction_result.get('page_count')
             
             # Process the extracted text
             analysis_result = self._analyze_document_content(text, uploaded_file.name)
             if not analysis_result['success']:
                 return analysis_result
+
+            # Only part of the document was read: keywords are provisional
+            analysis_result['data']['keywords_pending'] = text_extraction_result.get('truncated', False)
             
             logger.info(f"User {user} - Document content processing completed successfully")
             return {'success': True, 'data': analysis_result['data']}
@@ -192,13 +279,13 @@ class DocumentProcessorView(LoginRequiredMixin, View):
             logger.exception(f"User {user} - Error processing document content: {str(e)}")
             return {'success': False, 'error': str(e)}
     
-    def _extract_text_by_type(self, file, file_extension):
+    def _extract_text_by_type(self, file, file_extension, max_pages=None):
         """Extract text based on file type with error handling"""
         try:
             logger.debug(f"Starting text extraction for type: {file_extension}")
             
             if file_extension == '.pdf':
-                result = self._extract_text_from_pdf(file)
+                result = self._extract_text_from_pdf(file, max_pages=max_pages)
             elif file_extension == '.docx':
                 result = self._extract_text_from_docx(file)
             elif file_extension == '.txt':
@@ -214,62 +301,32 @@ class DocumentProcessorView(LoginRequiredMixin, View):
             logger.error(f"Error in text extraction by type: {str(e)}")
             return {'success': False, 'error': f'Text extraction failed: {str(e)}'}
     
-    def _extract_text_from_pdf(self, file):
-        """Extract text from PDF file"""
+    @timed_stage('extract_pdf')
+    def _extract_text_from_pdf(self, file, max_pages=None):
+        """Extract text from PDF file (only the first `max_pages` pages if given)"""
         try:
             logger.debug("Starting PDF text extraction")
-            text = ""
-            
-            # Use a temporary file that is deleted on close
-            with tempfile.NamedTemporaryFile(suffix='.pdf') as tmp_file:
-                for chunk in file.chunks():
-                    tmp_file.write(chunk)
-                tmp_file.seek(0) # Go to the beginning of the file for reading
-                
-                logger.debug(f"Processing temporary PDF file")
-                
-                # Read PDF directly from the file-like object
-                pdf_reader = PyPDF2.PdfReader(tmp_file)
-                page_count = len(pdf_reader.pages)
-                logger.debug(f"PDF has {page_count} pages")
-                
-                for page_num in range(page_count):
-                    page = pdf_reader.pages[page_num]
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-                    logger.debug(f"Extracted text from page {page_num + 1}")
-            
-            logger.debug(f"PDF text extraction completed, total length: {len(text)}")
-            return {'success': True, 'text': text}
+
+            # Opened from memory; PyMuPDF with page-parallel mode, PyPDF2 as fallback
+            text, engine, page_count = extract_pdf_text(read_upload(file), max_pages=max_pages)
+            truncated = max_pages is not None and page_count > max_pages
+
+            logger.debug(
+                f"PDF text extraction completed with {engine}: "
+                f"{min(page_count, max_pages or page_count)}/{page_count} pages, total length: {len(text)}"
+            )
+            return {'success': True, 'text': text, 'truncated': truncated, 'page_count': page_count}
             
         except Exception as e:
             logger.error(f"Error extracting text from PDF: {str(e)}")
             return {'success': False, 'error': f'Failed to extract text from PDF: {e}'}
     
+    @timed_stage('extract_docx')
     def _extract_text_from_docx(self, file):
         """Extract text from DOCX file"""
         try:
             logger.debug("Starting DOCX text extraction")
-            
-            with tempfile.NamedTemporaryFile(suffix='.docx') as tmp_file:
-                for chunk in file.chunks():
-                    tmp_file.write(chunk)
-                tmp_file.seek(0)
-                
-                logger.debug(f"Processing temporary DOCX file")
-                
-                # Read DOCX from file-like object
-                doc = docx.Document(tmp_file)
-                text = ""
-                paragraph_count = 0
-                
-                for paragraph in doc.paragraphs:
-                    text += paragraph.text + "\n"
-                    paragraph_count += 1
-                
-                logger.debug(f"Processed {paragraph_count} paragraphs from DOCX")
-            
+            text = extract_docx_text(read_upload(file))
             logger.debug(f"DOCX text extraction completed, total length: {len(text)}")
             return {'success': True, 'text': text}
             
@@ -277,25 +334,12 @@ class DocumentProcessorView(LoginRequiredMixin, View):
             logger.error(f"Error extracting text from DOCX: {str(e)}")
             return {'success': False, 'error': f'Failed to extract text from DOCX: {e}'}
     
+    @timed_stage('extract_txt')
     def _extract_text_from_txt(self, file):
         """Extract text from TXT file"""
         try:
             logger.debug("Starting TXT text extraction")
-            text = ""
-            
-            for chunk in file.chunks():
-                # Try different encodings
-                try:
-                    text += chunk.decode('utf-8')
-                    logger.debug("Successfully decoded chunk as UTF-8")
-                except UnicodeDecodeError:
-                    try:
-                        text += chunk.decode('latin-1')
-                        logger.debug("Successfully decoded chunk as Latin-1")
-                    except UnicodeDecodeError:
-                        text += chunk.decode('ascii', errors='ignore')
-                        logger.debug("Decoded chunk as ASCII with error ignoring")
-            
+            text = decode_text_upload(file)
             logger.debug(f"TXT text extraction completed, total length: {len(text)}")
             return {'success': True, 'text': text}
             
@@ -303,235 +347,31 @@ class DocumentProcessorView(LoginRequiredMixin, View):
             logger.error(f"Error extracting text from TXT: {str(e)}")
             return {'success': False, 'error': f'Failed to extract text from TXT: {str(e)}'}
     
+    @timed_stage('analyze')
     def _analyze_document_content(self, text, filename):
-        """Analyze the document content to extract title, abstract, and keywords"""
+        """Analyze the document content to extract title, abstract, keywords, authors and year"""
         try:
             logger.debug(f"Starting content analysis for file: {filename}")
-            
-            # Clean the text
-            lines = [line.strip() for line in text.split('\n') if line.strip()]
-            logger.debug(f"Document has {len(lines)} non-empty lines")
-            
-            # Extract components
-            title_result = self._extract_title(lines, filename)
-            abstract_result = self._extract_abstract(text, lines)
-            keywords_result = self._extract_keywords(text)
-            authors_result = self._extract_authors(text, lines)
-            year_result = self._extract_publication_year(text)
-            
-            # Check if all extractions were successful
-            if not all([title_result['success'], abstract_result['success'], keywords_result['success']]):
-                failed_components = []
-                if not title_result['success']: failed_components.append('title')
-                if not abstract_result['success']: failed_components.append('abstract')
-                if not keywords_result['success']: failed_components.append('keywords')
-                
-                error_msg = f"Failed to extract: {', '.join(failed_components)}"
-                logger.error(f"Content analysis failed: {error_msg}")
-                return {'success': False, 'error': error_msg}
-            
-            processed_data = {
-                'title': title_result['data'],
-                'abstract': abstract_result['data'],
-                'keywords': keywords_result['data'],
-                'authors': authors_result['data'],
-                'publication_year': year_result['data']
-            }
-            
+            processed_data = text_analysis.analyze_text(text, filename)
+
+            if not processed_data['authors']:
+                logger.warning("No authors could be extracted.")
+            if processed_data['publication_year'] is None:
+                logger.warning("No publication year could be extracted.")
+
             logger.info(f"Content analysis completed successfully for: {filename}")
             logger.debug(f"Extracted - Title: {processed_data['title'][:50]}...")
             logger.debug(f"Extracted - Abstract length: {len(processed_data['abstract'])}")
             logger.debug(f"Extracted - Keywords count: {len(processed_data['keywords'])}")
-            
+
             return {'success': True, 'data': processed_data}
-            
+
         except Exception as e:
             logger.exception(f"Error analyzing document content: {str(e)}")
             return {'success': False, 'error': f'Failed to analyze document content: {str(e)}'}
-    
-    def _extract_title(self, lines, filename):
-        """Extract or generate document title"""
-        try:
-            logger.debug("Starting title extraction")
-            
-            # Look for patterns that might indicate a title
-            title_patterns = [
-                r'^(title|TITLE):\s*(.+)$',
-                r'^(.{10,100})$',  # Lines with reasonable title length
-            ]
-            
-            # First, look for explicit title markers
-            for i, line in enumerate(lines[:10]):  # Check first 10 lines
-                for pattern in title_patterns[:1]:  # Only explicit markers
-                    match = re.search(pattern, line, re.IGNORECASE)
-                    if match:
-                        title = match.group(2).strip()
-                        logger.debug(f"Found explicit title marker in line {i}: {title}")
-                        return {'success': True, 'data': title}
-            
-            # If no explicit title, use the first substantial line
-            for i, line in enumerate(lines[:5]):
-                if 10 <= len(line) <= 100 and not line.lower().startswith(('abstract', 'introduction')):
-                    logger.debug(f"Using line {i} as title: {line}")
-                    return {'success': True, 'data': line}
-            
-            # Fallback to filename without extension
-            fallback_title = os.path.splitext(filename)[0].replace('_', ' ').replace('-', ' ').title()
-            logger.debug(f"Using fallback title from filename: {fallback_title}")
-            return {'success': True, 'data': fallback_title}
-            
-        except Exception as e:
-            logger.error(f"Error extracting title: {str(e)}")
-            return {'success': False, 'data': "Document Title"}
-    
-    def _extract_abstract(self, text, lines):
-        """Extract abstract or create a summary"""
-        try:
-            logger.debug("Starting abstract extraction")
-            
-            # Look for explicit abstract section
-            abstract_patterns = [
-                r'abstract[:\-\s]*([^\.]*(?:\.[^\.]*){0,3})',
-                r'summary[:\-\s]*([^\.]*(?:\.[^\.]*){0,3})',
-                r'overview[:\-\s]*([^\.]*(?:\.[^\.]*){0,3})'
-            ]
-            
-            text_lower = text.lower()
-            
-            for pattern in abstract_patterns:
-                match = re.search(pattern, text_lower, re.DOTALL | re.IGNORECASE)
-                if match:
-                    abstract = match.group(1).strip()
-                    if len(abstract) > 50:
-                        final_abstract = abstract[:500] + "..." if len(abstract) > 500 else abstract
-                        logger.debug(f"Found explicit abstract section, length: {len(final_abstract)}")
-                        return {'success': True, 'data': final_abstract}
-            
-            # If no explicit abstract, create a summary from the first few sentences
-            sentences = re.split(r'[.!?]+', text)
-            summary_sentences = []
-            total_length = 0
-            
-            for sentence in sentences:
-                sentence = sentence.strip()
-                if sentence and len(sentence) > 20:
-                    summary_sentences.append(sentence)
-                    total_length += len(sentence)
-                    if total_length > 300 or len(summary_sentences) >= 3:
-                        break
-            
-            if summary_sentences:
-                summary = '. '.join(summary_sentences) + '.'
-                logger.debug(f"Created summary from first sentences, length: {len(summary)}")
-                return {'success': True, 'data': summary}
-            
-            logger.warning("No abstract content could be extracted")
-            return {'success': True, 'data': "No abstract available."}
-            
-        except Exception as e:
-            logger.error(f"Error extracting abstract: {str(e)}")
-            return {'success': False, 'data': "Error extracting abstract."}
-    
-    def _extract_authors(self, text, lines):
-        """Extract authors from the document."""
-        try:
-            logger.debug("Starting author extraction")
-            authors = []
-            # Simple pattern: look for lines with multiple names, often below the title
-            # and before the abstract.
-            for line in lines[:20]: # Check top 20 lines
-                # Avoid lines that are clearly part of the title or abstract
-                if line.lower().startswith(('abstract', 'introduction', 'keywords')) or len(line) > 150:
-                    continue
-                # A line with multiple commas or 'and' is a good candidate
-                if (line.count(',') > 1 or ' and ' in line) and len(line.split()) < 20:
-                    # Very basic cleaning
-                    found_authors = re.split(r',\s*|\s+and\s+', line)
-                    # Filter out empty strings and check if they look like names
-                    authors.extend([
-                        author.strip() for author in found_authors 
-                        if author.strip() and len(author.strip().split()) < 4
-                    ])
-                    if authors:
-                        logger.debug(f"Found potential authors: {authors}")
-                        return {'success': True, 'data': authors[:10]} # Limit to 10 authors
-            
-            if not authors:
-                logger.warning("No authors could be extracted.")
-            
-            return {'success': True, 'data': []}
-        except Exception as e:
-            logger.error(f"Error extracting authors: {str(e)}")
-            return {'success': False, 'data': []}
-
-    def _extract_publication_year(self, text):
-        """Extract publication year from the document."""
-        try:
-            logger.debug("Starting publication year extraction")
-            # Look for 4-digit numbers that look like years (e.g., 1990-2024)
-            current_year = timezone.now().year
-            matches = re.findall(r'\b(19\d{2}|20\d{2})\b', text)
-            if matches:
-                years = sorted([int(y) for y in set(matches) if int(y) <= current_year], reverse=True)
-                if years:
-                    year = years[0]
-                    logger.debug(f"Found publication year: {year}")
-                    return {'success': True, 'data': year}
-            logger.warning("No publication year could be extracted.")
-            return {'success': True, 'data': None}
-        except Exception as e:
-            logger.error(f"Error extracting publication year: {str(e)}")
-            return {'success': False, 'data': None}
 
-    def _extract_keywords(self, text, max_keywords=10):
-        """Extract keywords from the document"""
-        try:
-            logger.debug(f"Starting keyword extraction (max: {max_keywords})")
-            
-            # Common stop words to exclude
-            stop_words = {
-                'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for',
-                'of', 'with', 'by', 'is', 'are', 'was', 'were', 'be', 'been', 'have',
-                'has', 'had', 'do', 'does', 'did', 'will', 'would', 'should', 'could',
-                'this', 'that', 'these', 'those', 'i', 'you', 'he', 'she', 'it', 'we',
-                'they', 'me', 'him', 'her', 'us', 'them', 'my', 'your', 'his', 'its',
-                'our', 'their', 'can', 'may', 'might', 'must', 'shall', 'from', 'as',
-                'not', 'no', 'yes', 'about', 'into', 'through', 'during', 'before',
-                'after', 'above', 'below', 'up', 'down', 'out', 'off', 'over', 'under',
-                'again', 'further', 'then', 'once'
-            }
-            
-            # Clean and tokenize text
-            cleaned_text = re.sub(r'[^\w\s]', ' ', text.lower())
-            words = cleaned_text.split()
-            logger.debug(f"Total words before filtering: {len(words)}")
-            
-            # Filter words
-            filtered_words = [
-                word for word in words 
-                if len(word) > 3 and word not in stop_words and word.isalpha()
-            ]
-            logger.debug(f"Words after filtering: {len(filtered_words)}")
-            
-            # Count word frequency
-            word_freq = Counter(filtered_words)
-            
-            # Get most common words as keywords
-            keywords = [word for word, count in word_freq.most_common(max_keywords)]
-            
-            if not keywords:
-                logger.warning("No keywords extracted, using fallback")
-                keywords = ['document', 'text', 'content']
-            
-            final_keywords = keywords[:max_keywords]
-            logger.debug(f"Final keywords: {final_keywords}")
-            return {'success': True, 'data': final_keywords}
-            
-        except Exception as e:
-            logger.error(f"Error extracting keywords: {str(e)}")
-            return {'success': False, 'data': ['error', 'processing', 'keywords']}
-    
-    def _save_research_paper_data(self, user, filename, file_size, processed_data):
+    @timed_stage('save')
+    def _save_research_paper_data(self, user, filename, file_size, processed_data, content_hash=''):
         """Step 3: Save or update research paper data in database"""
         try:
             logger.info(f"User {user} - Starting database save for file: {filename}")
@@ -556,6 +396,7 @@ class DocumentProcessorView(LoginRequiredMixin, View):
                     existing_paper.publication_year = processed_data['publication_year']
                     existing_paper.file_size = file_size
                     existing_paper.file_type = file_extension
+                    existing_paper.content_hash = content_hash
                     existing_paper.save()
                     
                     logger.info(f"User {user} - Successfully updated research paper ID: {existing_paper.id}")
@@ -579,7 +420,8 @@ class DocumentProcessorView(LoginRequiredMixin, View):
                         authors=processed_data['authors'],
                         publication_year=processed_data['publication_year'],
                         file_size=file_size,
-                        file_type=file_extension
+                        file_type=file_extension,
+                        content_hash=content_hash
                     )
                     
                     logger.info(f"User {user} - Successfully created research paper ID: {new_paper.id}")
@@ -598,6 +440,24 @@ class DocumentProcessorView(LoginRequiredMixin, View):
             logger.exception(f"User {user} - Error saving research paper data: {str(e)}")
             return {'success': False, 'error': f'Database save failed: {str(e)}'}
     
+    @timed_stage('queue')
+    def _queue_processing_job(self, user, uploaded_file, mode=DocumentProcessingJob.MODE_FULL, research_paper=None):
+        """Store the upload on a DocumentProcessingJob and hand it to the background executor"""
+        uploaded_file.seek(0)
+        with transaction.atomic():
+            job = DocumentProcessingJob.objects.create(
+                user=user,
+                file=uploaded_file,
+                filename=uploaded_file.name,
+                file_size=uploaded_file.size,
+                mode=mode,
+                research_paper=research_paper,
+            )
+            enqueue_document_job(job)
+        logger.info(f"User {user} - Queued {mode} document job {job.pk} for: {uploaded_file.name}")
+        return job
+    
+    @timed_stage('log')
     def _log_processing_success(self, user, uploaded_file, research_paper):
         """Log successful processing with detailed information"""
         try:
@@ -635,6 +495,121 @@ class DocumentProcessorView(LoginRequiredMixin, View):
             return render(request, template_name)
 
 
+class BatchDocumentUploadView(LoginRequiredMixin, View):
+    """
+    Upload many documents (or ZIP archives of them) at once. Returns a per-file
+    report; new papers can optionally be Ridge-scored in one batched call.
+    """
+
+    login_url = '/user/login/'
+    template_name = 'cite_guage/batch_upload.html'
+
+    def get(self, request):
+        return render(request, self.template_name, {'max_files': batch.BATCH_MAX_FILES})
+
+    def post(self, request):
+        uploads = request.FILES.getlist('documents')
+        if not uploads:
+            messages.error(request, 'No files were uploaded.')
+            return render(request, self.template_name, {'max_files': batch.BATCH_MAX_FILES})
+
+        logger.info(f"User {request.user.email} started a batch upload of {len(uploads)} file(s)")
+        try:
+            entries = batch.collect_batch(uploads)
+            batch.process_batch(entries, request.user)
+            if request.POST.get('score'):
+                batch.score_batch(entries)
+        except Exception:
+            logger.exception(f"User {request.user} - Critical error in batch upload")
+            messages.error(request, 'An unexpected error occurred while processing the batch.')
+            return render(request, self.template_name, {'max_files': batch.BATCH_MAX_FILES})
+
+        counts = Counter(entry.status for entry in entries)
+        saved = counts['created'] + counts['updated'] + counts['reused']
+        if saved:
+            messages.success(request, f'{saved} of {len(entries)} documents saved.')
+        if counts['failed'] or counts['skipped']:
+            messages.warning(request, f"{counts['failed']} failed, {counts['skipped']} skipped. See the report below.")
+
+        return render(request, self.template_name, {
+            'max_files': batch.BATCH_MAX_FILES,
+            'entries': entries,
+            'counts': dict(counts),
+        })
+
+
+class DocumentJobStatusView(LoginRequiredMixin, View):
+    """
+    Status page for a queued document. Shows the analysis results once the job
+    is done; `?format=json` returns the status for polling.
+    """
+
+    login_url = '/user/login/'
+
+    def get(self, request, pk):
+        job = get_object_or_404(
+            DocumentProcessingJob.objects.select_related('research_paper'), pk=pk, user=request.user
+        )
+
+        if request.GET.get('format') == 'json':
+            return JsonResponse({
+                'id': job.pk,
+                'status': job.status,
+                'error': job.error,
+                'research_paper_id': job.research_paper_id,
+                'finished': job.is_finished,
+            })
+
+        if job.status == DocumentProcessingJob.STATUS_DONE and job.research_paper:
+            return render(request, 'cite_guage/document_results.html', {
+                'result': job.result,
+                'filename': job.filename,
+                'research_paper': job.research_paper,
+                'is_updated': job.is_updated
+            })
+
+        return render(request, 'cite_guage/document_job_status.html', {'job': job})
+
+
+class ProcessingTimingsView(LoginRequiredMixin, UserPassesTestMixin, View):
+    """
+    Staff report of the document pipeline: p50/p95 milliseconds per stage and
+    file type over recent DocumentProcessingRun rows. `?days=` sets the window,
+    `?source=upload|job` narrows it, `?format=json` returns the rows.
+    """
+
+    login_url = '/user/login/'
+    template_name = 'cite_guage/processing_timings.html'
+    max_runs = 5000  # newest runs considered, keeps the report cheap
+
+    def test_func(self):
+        return self.request.user.is_staff
+
+    def get(self, request):
+        try:
+            days = max(1, int(request.GET.get('days', 30)))
+        except ValueError:
+            days = 30
+        source = request.GET.get('source', '')
+
+        runs = DocumentProcessingRun.objects.filter(created_at__gte=timezone.now() - timedelta(days=days))
+        if source in dict(DocumentProcessingRun.SOURCE_CHOICES):
+            runs = runs.filter(source=source)
+        runs = list(runs.order_by('-created_at').values_list('file_type', 'stages', 'total_ms')[:self.max_runs])
+        rows = summarize_runs(runs)
+
+        if request.GET.get('format') == 'json':
+            return JsonResponse({'days': days, 'source': source, 'runs': len(runs), 'stages': rows})
+
+        return render(request, self.template_name, {
+            'rows': rows,
+            'run_count': len(runs),
+            'days': days,
+            'source': source,
+            'source_choices': DocumentProcessingRun.SOURCE_CHOICES,
+        })
+
+
 class DashboardView(LoginRequiredMixin, View):
     """
     Dashboard view to display research paper statistics and recent uploads
@@ -861,7 +836,8 @@ class ResearchPaperDetail(LoginRequiredMixin, DetailView):
                 paper.ridge_predictions.create(
                     predicted_citations=prediction_result.get('predicted'),
                     ci_low=prediction_result.get('ci_low'),
-                    ci_high=prediction_result.get('ci_high')
+                    ci_high=prediction_result.get('ci_high'),
+                    model_version=prediction_result.get('model_version', '')
                 )
 
                 # Save prediction to the model instance
@@ -14,3 +14,9 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
+
+# Opt-in (ML_WARMUP_ON_STARTUP): load the ML artifacts now, so a worker without
+# them fails at boot and the first prediction request is not the slow one.
+from user.ml_utils import warm_up_if_enabled  # noqa: E402
+
+warm_up_if_enabled()
@@ -0,0 +1,14 @@
+import os
+
+from celery import Celery
+
+# Default Django settings module for the 'celery' program.
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+
+app = Celery('core')
+
+# Read the CELERY_* options from Django settings.
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+# Load tasks.py modules from all installed apps.
+app.autodiscover_tasks()
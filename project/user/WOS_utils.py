@@ -2,13 +2,58 @@
 import requests
 import json
 import os
+import re
+import time
+import codecs
+import hashlib
 import logging
 import datetime
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import MaxRetryError
+from urllib3.util.retry import Retry
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to a per-process limiter
+    fcntl = None
+
+from .models import WOSAPIUsage
 
 # API Config
 API_KEY = getattr(settings, "WOS_API_KEY", None)
-BASE_URL = "https://api.clarivate.com/api/wos"
+BASE_URL = getattr(settings, "WOS_API_URL", "https://api.clarivate.com/api/wos")
+
+# HTTP client config
+CONNECT_TIMEOUT = getattr(settings, "WOS_CONNECT_TIMEOUT", 5)  # seconds
+READ_TIMEOUT = getattr(settings, "WOS_READ_TIMEOUT", 60)  # seconds
+MAX_RETRIES = getattr(settings, "WOS_MAX_RETRIES", 3)
+BACKOFF_FACTOR = getattr(settings, "WOS_BACKOFF_FACTOR", 0.5)  # sleeps 0.5s, 1s, 2s, ...
+BACKOFF_JITTER = getattr(settings, "WOS_BACKOFF_JITTER", 0.5)  # up to this many extra random seconds
+POOL_MAXSIZE = getattr(settings, "WOS_POOL_MAXSIZE", 10)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Rate limiting config: one API key is shared by every user and worker.
+# Backend: "memory" (per process), "file" (shared by workers on one host via a lock file) or "none".
+RATE_LIMIT_BACKEND = getattr(settings, "WOS_RATE_LIMIT_BACKEND", "memory")
+RATE_LIMIT_PER_SECOND = getattr(settings, "WOS_RATE_LIMIT_PER_SECOND", 2)
+RATE_LIMIT_BURST = getattr(settings, "WOS_RATE_LIMIT_BURST", 2)
+RATE_LIMIT_FILE = getattr(settings, "WOS_RATE_LIMIT_FILE", os.path.join(settings.BASE_DIR, ".wos_ratelimit"))
+RATE_LIMIT_MAX_WAIT = getattr(settings, "WOS_RATE_LIMIT_MAX_WAIT", None)  # seconds; None waits indefinitely
+
+# Streaming config: parse REC entries incrementally instead of response.json()
+STREAM_RESPONSES = getattr(settings, "WOS_STREAM_RESPONSES", True)
+STREAM_CHUNK_SIZE = getattr(settings, "WOS_STREAM_CHUNK_SIZE", 64 * 1024)  # bytes
+
+# Harvesting config
+HARVEST_PAGE_SIZE = getattr(settings, "WOS_HARVEST_PAGE_SIZE", 100)  # API maximum per request
+HARVEST_CONCURRENCY = getattr(settings, "WOS_HARVEST_CONCURRENCY", 4)
 
 # Logging setup
 logging.basicConfig(format="%(message)s", level=logging.INFO)
@@ -23,28 +68,267 @@ def build_usr_query(field, query):
     return f'{field}=("{query}")'
 
 
-def build_params(field, query, count):
+def build_params(field, query, count, sort_field="TC+D", first_record=1):
     """Builds API request parameters."""
     return {
         "databaseId": "WOS",
         "lang": "en",
         "usrQuery": build_usr_query(field, query),
         "count": count,
-        "firstRecord": 1,
-        "sortField": "TC+D",  # Latest date descending
+        "firstRecord": first_record,
+        "sortField": sort_field,  # Times cited descending by default
         "optionView": "FR"
     }
 
 
-def call_wos_api(params):
-    """Performs GET request to the WOS API and returns parsed JSON."""
+class RateLimitedRetry(Retry):
+    """
+    Retry that takes a token from the WOS rate limiter after each backoff, so
+    a resend draws on the shared per-key budget just like a first attempt.
+    """
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        limiter = get_rate_limiter()
+        if limiter is not None and not limiter.acquire():
+            url = self.history[-1].url if self.history else None
+            raise MaxRetryError(None, url, reason=TimeoutError("rate limiter queue wait exceeded before a retry"))
+
+
+def build_session(max_retries=MAX_RETRIES, backoff_factor=BACKOFF_FACTOR,
+                  backoff_jitter=BACKOFF_JITTER, pool_maxsize=POOL_MAXSIZE):
+    """
+    Builds a keep-alive session whose adapter retries connection errors and
+    429/5xx responses with jittered exponential backoff (honouring Retry-After),
+    each retry waiting for a rate limiter token.
+    """
+    retry = RateLimitedRetry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        backoff_jitter=backoff_jitter,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,  # hand the last response back so raise_for_status() reports it
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """Returns the module-level pooled session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = build_session()
+    return _session
+
+
+def reset_session(session=None):
+    """Closes the current session and installs `session` (or a fresh default one lazily)."""
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+        _session = session
+
+
+# --------------------------
+# Rate Limiting & Quota Accounting
+# --------------------------
+
+class TokenBucket:
+    """
+    Process-wide token bucket: `rate` tokens per second, at most `capacity` banked.
+    acquire() blocks (queues the caller) until a token is free instead of failing.
+    """
+
+    def __init__(self, rate=RATE_LIMIT_PER_SECOND, capacity=RATE_LIMIT_BURST):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._lock = threading.Lock()
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, tokens, updated, now):
+        return min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+
+    def _take(self):
+        """Takes a token if one is available; otherwise returns seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = self._refill(self._tokens, self._updated, now)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout=RATE_LIMIT_MAX_WAIT):
+        """Waits for a token. Returns False only if `timeout` seconds pass first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            delay = self._take()
+            if delay <= 0:
+                return True
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                delay = min(delay, remaining)
+            time.sleep(delay)
+
+
+class FileTokenBucket(TokenBucket):
+    """
+    Token bucket whose state lives in a small file guarded by an exclusive
+    flock, so every worker process on the host draws from the same bucket.
+    """
+
+    def __init__(self, path=RATE_LIMIT_FILE, rate=RATE_LIMIT_PER_SECOND, capacity=RATE_LIMIT_BURST):
+        super().__init__(rate, capacity)
+        self.path = path
+
+    def _take(self):
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, "a+", encoding="utf-8") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    try:
+                        state = json.loads(f.read() or "{}")
+                    except ValueError:
+                        state = {}
+                    now = time.time()  # wall clock: comparable across processes
+                    tokens = self._refill(
+                        float(state.get("tokens", self.capacity)), float(state.get("updated", now)), now
+                    )
+                    delay = 0.0
+                    if tokens >= 1:
+                        tokens -= 1
+                    else:
+                        delay = (1 - tokens) / self.rate
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps({"tokens": tokens, "updated": now}))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            return delay
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """Returns the configured limiter, or None when rate limiting is disabled."""
+    global _rate_limiter
+    if not RATE_LIMIT_BACKEND or RATE_LIMIT_BACKEND == "none":
+        return None
+    if _rate_limiter is None:
+        with _rate_limiter_lock:
+            if _rate_limiter is None:
+                if RATE_LIMIT_BACKEND == "file" and fcntl is not None:
+                    _rate_limiter = FileTokenBucket()
+                elif RATE_LIMIT_BACKEND in ("file", "memory"):
+                    if RATE_LIMIT_BACKEND == "file":
+                        logging.warning("fcntl unavailable; WOS rate limiting falls back to per-process.")
+                    _rate_limiter = TokenBucket()
+                else:
+                    raise ValueError(f"Unknown WOS_RATE_LIMIT_BACKEND: {RATE_LIMIT_BACKEND!r}")
+    return _rate_limiter
+
+
+def record_api_usage(user=None, requests_made=1):
+    """Adds `requests_made` to today's WOSAPIUsage row for `user` (None for system calls)."""
+    if requests_made <= 0:
+        return
+    user_id = user.pk if user is not None and getattr(user, "is_authenticated", False) else None
+    today = timezone.localdate()
+    try:
+        usage = WOSAPIUsage.objects.filter(user_id=user_id, date=today)
+        if usage.update(request_count=F("request_count") + requests_made):
+            return
+        try:
+            # Savepoint, so a lost race does not break a surrounding transaction
+            with transaction.atomic():
+                WOSAPIUsage.objects.create(user_id=user_id, date=today, request_count=requests_made)
+        except IntegrityError:
+            # Another worker created today's row first.
+            usage.update(request_count=F("request_count") + requests_made)
+    except Exception as e:
+        # Accounting must never break a search.
+        logging.error(f"Could not record WOS API usage: {e}")
+
+
+def _answered_attempts(response):
+    """Requests behind `response` that reached the API: the final one plus each retried 429/5xx."""
+    retries = getattr(response.raw, "retries", None)
+    history = retries.history if retries is not None else ()
+    return 1 + sum(1 for attempt in history if attempt.status is not None)
+
+
+def _send_request(params, base_url=None, timeout=None, user=None, track_usage=True, stream=False):
+    """
+    Rate-limits and sends one GET, then accounts every attempt that got a
+    response (retries included); returns the response or None on failure.
+    """
     if not API_KEY or API_KEY == "YOUR_WOS_API_KEY":
         raise ValueError("WOS_API_KEY not set or is a placeholder.")
 
+    limiter = get_rate_limiter()
+    if limiter is not None and not limiter.acquire():
+        logging.error("WOS API request dropped: rate limiter queue wait exceeded.")
+        return None
+
     headers = {"X-ApiKey": API_KEY}
     try:
-        response = requests.get(BASE_URL, headers=headers, params=params)
+        response = get_session().get(
+            base_url or BASE_URL,
+            headers=headers,
+            params=params,
+            timeout=timeout or (CONNECT_TIMEOUT, READ_TIMEOUT),
+            stream=stream,
+        )
+    except requests.exceptions.RequestException as e:
+        logging.error(f"WOS API request failed: {e}")
+        return None
+
+    if track_usage:
+        record_api_usage(user, requests_made=_answered_attempts(response))
+    try:
         response.raise_for_status()
+        return response
+    except requests.exceptions.RequestException as e:
+        logging.error(f"WOS API request failed: {e}")
+        return None
+
+
+def call_wos_api(params, base_url=None, timeout=None, user=None, track_usage=True):
+    """Performs GET request to the WOS API and returns parsed JSON."""
+    response = _send_request(params, base_url, timeout, user, track_usage)
+    if response is None:
+        return {}
+    return _response_json(response)
+
+
+def _response_json(response):
+    try:
         return response.json()
     except requests.exceptions.RequestException as e:
         logging.error(f"WOS API request failed: {e}")
@@ -54,6 +338,176 @@ def call_wos_api(params):
         return {}
 
 
+# --------------------------
+# Streaming Response Parsing
+# --------------------------
+
+class JSONArrayStream:
+    """
+    Yields the elements of one JSON array incrementally from an iterable of
+    byte (or str) chunks, holding only the pending element plus one chunk.
+
+    With `key`, the array is the value of the first "<key>" member found in the
+    document; without it, the document itself must be an array. If the array
+    is never found, `found` is False and `header` holds the whole document so
+    the caller can fall back to json.loads; otherwise `header` is the text that
+    preceded the array and, once the array is consumed, `trailer` the text
+    that followed it.
+    """
+
+    _decoder = json.JSONDecoder()
+    _separators = re.compile(r"[\s,]*")
+
+    def __init__(self, chunks, key=None):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._exhausted = False
+        self._key = key
+        if key is not None:
+            self._start = re.compile(r'(?<!\\)"' + re.escape(key) + r'"\s*:\s*\[')
+        self.found = False
+        self.header = ""
+        self.trailer = ""
+
+    def _read(self):
+        """Returns the next decoded piece of text, or None once the input is exhausted."""
+        if self._exhausted:
+            return None
+        for chunk in self._chunks:
+            text = chunk if isinstance(chunk, str) else self._utf8.decode(chunk)
+            if text:
+                return text
+        self._exhausted = True
+        tail = self._utf8.decode(b"", final=True)
+        return tail or None
+
+    def _read_all(self, pieces):
+        while True:
+            text = self._read()
+            if text is None:
+                return "".join(pieces)
+            pieces.append(text)
+
+    def _find_array(self):
+        """Consumes input up to the opening bracket and returns the text after it (or None)."""
+        pieces = []
+        tail = ""
+        while True:
+            text = self._read()
+            if text is None:
+                self.header = "".join(pieces)
+                return None
+            pieces.append(text)
+
+            if self._key is None:
+                # The document itself must be an array: decide on the first non-blank char.
+                stripped = "".join(pieces).lstrip()
+                if not stripped:
+                    continue
+                if stripped[0] == "[":
+                    self.found = True
+                    return stripped[1:]
+                self.header = self._read_all([stripped])
+                return None
+
+            # Search only the new text plus a short overlap with the previous piece.
+            window = tail + text
+            match = self._start.search(window)
+            if match:
+                joined = "".join(pieces)
+                offset = len(joined) - len(window)
+                self.found = True
+                self.header = joined[:offset + match.start()]
+                return joined[offset + match.end():]
+            tail = window[-(len(self._key) + 64):]
+
+    def __iter__(self):
+        buffer = self._find_array()
+        if buffer is None:
+            return
+        pos = 0
+        while True:
+            pos = self._separators.match(buffer, pos).end()
+            if pos >= len(buffer):
+                text = self._read()
+                if text is None:
+                    raise ValueError("Truncated JSON: array is not closed")
+                buffer = buffer[pos:] + text
+                pos = 0
+                continue
+            if buffer[pos] == "]":
+                self.trailer = self._read_all([buffer[pos + 1:]])
+                return
+            try:
+                item, end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                item, end = None, None
+            # An element that runs to the end of the buffer may continue in the
+            # next chunk (e.g. a number split in two), so only trust it if more
+            # text follows or the input is done.
+            if end is None or (end == len(buffer) and not self._exhausted):
+                # Grow the pending element geometrically so re-parsing stays linear.
+                pending = buffer[pos:]
+                wanted = max(len(pending), 1)
+                pieces = [pending]
+                added = 0
+                while added < wanted:
+                    text = self._read()
+                    if text is None:
+                        break
+                    pieces.append(text)
+                    added += len(text)
+                if not added:
+                    if end is None:
+                        raise ValueError("Truncated or invalid JSON array element")
+                    buffer, pos = pending, 0
+                    continue
+                buffer, pos = "".join(pieces), 0
+                continue
+            yield item
+            buffer, pos = buffer[end:], 0
+
+
+_RECORDS_FOUND = re.compile(r'"RecordsFound"\s*:\s*(\d+)')
+
+
+class WOSRecordStream:
+    """
+    Iterates the REC entries of a streamed WOS response without materializing
+    the body. Falls back to a full parse when the records are not a plain JSON
+    array (e.g. embedded as a JSON string). `records_found` is set once the
+    stream has been consumed.
+    """
+
+    def __init__(self, response, chunk_size=STREAM_CHUNK_SIZE):
+        self.response = response
+        self.chunk_size = chunk_size
+        self.records_found = None
+
+    def __iter__(self):
+        try:
+            array = JSONArrayStream(self.response.iter_content(chunk_size=self.chunk_size), key="REC")
+            yield from array
+            if array.found:
+                # QueryResult may come before or after Data
+                match = _RECORDS_FOUND.search(array.header) or _RECORDS_FOUND.search(array.trailer)
+                self.records_found = int(match.group(1)) if match else 0
+            else:
+                data = json.loads(array.header) if array.header.strip() else {}
+                self.records_found = records_found(data)
+                yield from normalize_records(data)
+        finally:
+            self.response.close()
+
+
+def open_wos_stream(params, base_url=None, timeout=None, user=None, track_usage=True):
+    """Like call_wos_api, but returns a WOSRecordStream over the REC entries (or None)."""
+    response = _send_request(params, base_url, timeout, user, track_usage, stream=True)
+    if response is None:
+        return None
+    return WOSRecordStream(response)
+
+
 def normalize_records(data):
     """
     Extracts and normalizes records into a list from WOS API response.
@@ -83,6 +537,14 @@ def normalize_records(data):
     return records
 
 
+def records_found(data):
+    """Total number of records matching the query, as reported by the API."""
+    try:
+        return int(data.get("QueryResult", {}).get("RecordsFound", 0))
+    except (TypeError, ValueError, AttributeError):
+        return 0
+
+
 def save_records(records):
     """Saves raw records to a timestamped JSON file in json_data/<date>/."""
     date_dir = datetime.datetime.now().strftime("%Y%m%d")
@@ -98,146 +560,559 @@ def save_records(records):
         logging.error(f"Error saving records to JSON: {e}")
 
 
-def extract_title(rec):
-    """Safely extract the main title from a WOS record."""
-    if not isinstance(rec, dict):
-        return "Untitled"
+# --------------------------
+# Record Field Extraction
+# --------------------------
+# parse_papers resolves the shared subtrees (static_data.summary, .item,
+# .fullrecord_metadata) once per record and walks only the short path below
+# each. Output matches the old per-field parser for every record that parser
+# accepted; records it raised on (e.g. a bare object where it indexed a list)
+# now parse instead of failing the whole page.
 
-    titles = (
-        rec.get("static_data", {})
-        .get("summary", {})
-        .get("titles", {})
-        .get("title", [])
-    )
+NO_ABSTRACT = "No abstract available."
+_EMPTY = {}
+
+
+def _subtree(node, key):
+    value = node.get(key)
+    return value if type(value) is dict else _EMPTY
+
+
+def _path(node, *keys):
+    """node[k1][k2]..., or None as soon as a step is missing or not a dict."""
+    for key in keys:
+        if type(node) is not dict:
+            return None
+        node = node.get(key)
+    return node
 
-    if isinstance(titles, list):
+
+# One helper per output field, taking the raw value _extract_paper found
+# (None when the path was missing). Called once per field per record: keep
+# them flat.
+
+def _item_title(titles):
+    if type(titles) is list:
         for t in titles:
-            if isinstance(t, dict) and t.get("type") == "item":
+            if type(t) is dict and t.get("type") == "item":
                 return t.get("content", "Untitled")
     return "Untitled"
 
 
+def _local_count(silo_tc):
+    if silo_tc is None:
+        return 0
+    if type(silo_tc) is list:
+        silo_tc = silo_tc[0] if silo_tc else None
+    return silo_tc.get("local_count", 0) if type(silo_tc) is dict else 0
+
+
+def _abstract_text(abstracts):
+    """
+    Paragraphs of the first abstract; "" when there is none and NO_ABSTRACT
+    when the abstract is there but malformed, as the old parser returned.
+    """
+    if type(abstracts) is not dict:
+        return NO_ABSTRACT
+    if "abstract" not in abstracts:
+        return ""
+    abstract = abstracts["abstract"]
+    if type(abstract) is list:
+        abstract = abstract[0] if abstract else None
+    if type(abstract) is not dict:
+        return NO_ABSTRACT
+    text = abstract.get("abstract_text", _EMPTY)
+    if type(text) is not dict:
+        return NO_ABSTRACT
+    paras = text.get("p")
+    if type(paras) is list:
+        try:
+            return " ".join(paras)
+        except TypeError:
+            return NO_ABSTRACT
+    return paras if type(paras) is str else ""
+
+
+def _keyword_list(keywords):
+    if type(keywords) is list:
+        return keywords
+    return [keywords] if type(keywords) is str else []
+
+
+def _doi(other_ids):
+    if type(other_ids) is list:
+        for item in other_ids:
+            if type(item) is dict and item.get("type") == "doi":
+                return item.get("value")
+    return None
+
+
+def _first_url(source_urls):
+    if type(source_urls) is list and source_urls and type(source_urls[0]) is dict:
+        return source_urls[0].get("url")
+    return None
+
+
+def _reference_count(references):
+    return len(references) if type(references) is list else 0
+
+
+def _paper(rec, summary, titles, silo_tc, keywords, other_ids, source_urls, references):
+    pub_info = _subtree(summary, "pub_info")
+    return {
+        "title": _item_title(titles),
+        "uid": rec.get("UID"),
+        "citations": _local_count(silo_tc),
+        "abstract": _abstract_text(summary.get("abstracts", _EMPTY)),
+        "keywords": _keyword_list(keywords),
+        # New fields for feature engineering
+        "publication_year": pub_info.get("pubyear"),
+        "pubtype": pub_info.get("pubtype"),
+        "doi": _doi(other_ids),
+        "url": _first_url(source_urls),
+        "num_references": _reference_count(references),
+    }
+
+
+def _extract_paper(rec):
+    try:
+        # Fast path: plain .get chains, assuming every node on the way is a dict
+        static = rec.get("static_data", _EMPTY)
+        summary = static.get("summary", _EMPTY)
+        item = static.get("item", _EMPTY)
+        fullrecord = static.get("fullrecord_metadata", _EMPTY)
+        return _paper(
+            rec, summary,
+            titles=summary.get("titles", _EMPTY).get("title"),
+            silo_tc=rec.get("dynamic_data", _EMPTY).get("citation_related", _EMPTY).get("tc_list", _EMPTY).get("silo_tc"),
+            keywords=item.get("keywords", _EMPTY).get("keyword"),
+            other_ids=item.get("bib_id", _EMPTY).get("other"),
+            source_urls=fullrecord.get("reprint_requests", _EMPTY).get("source_url"),
+            references=fullrecord.get("references", _EMPTY).get("reference"),
+        )
+    except AttributeError:
+        # Some node is not a dict: walk again, checking every step
+        static = _subtree(rec, "static_data")
+        summary = _subtree(static, "summary")
+        item = _subtree(static, "item")
+        fullrecord = _subtree(static, "fullrecord_metadata")
+        return _paper(
+            rec, summary,
+            titles=_path(summary, "titles", "title"),
+            silo_tc=_path(rec, "dynamic_data", "citation_related", "tc_list", "silo_tc"),
+            keywords=_path(item, "keywords", "keyword"),
+            other_ids=_path(item, "bib_id", "other"),
+            source_urls=_path(fullrecord, "reprint_requests", "source_url"),
+            references=_path(fullrecord, "references", "reference"),
+        )
+
+
+def extract_title(rec):
+    """Safely extract the main title from a WOS record."""
+    if not isinstance(rec, dict):
+        return "Untitled"
+    return _item_title(_path(rec, "static_data", "summary", "titles", "title"))
+
+
 def extract_publication_year(rec):
     """Safely extract the publication year."""
-    try:
-        return rec.get("static_data", {}).get("summary", {}).get("pub_info", {}).get("pubyear")
-    except Exception:
-        return None
+    return _path(rec, "static_data", "summary", "pub_info", "pubyear")
+
 
 def extract_pubtype(rec):
     """Safely extract the publication type."""
-    try:
-        # The 'pubtype' attribute is nested under 'pub_info'
-        return rec.get("static_data", {}).get("summary", {}).get("pub_info", {}).get("pubtype")
-    except Exception:
-        return None
+    return _path(rec, "static_data", "summary", "pub_info", "pubtype")
 
 
 def extract_doi(rec):
     """Safely extract the DOI."""
-    try:
-        other_ids = rec.get("static_data", {}).get("item", {}).get("bib_id", {}).get("other", [])
-        if isinstance(other_ids, list):
-            for item in other_ids:
-                if isinstance(item, dict) and item.get("type") == "doi":
-                    return item.get("value")
-    except Exception:
-        return None
-    return None
+    return _doi(_path(rec, "static_data", "item", "bib_id", "other"))
 
 
 def extract_url(rec):
     """Safely extract a source URL."""
-    try:
-        source_urls = rec.get("static_data", {}).get("fullrecord_metadata", {}).get("reprint_requests", {}).get("source_url", [])
-        if isinstance(source_urls, list) and source_urls:
-            return source_urls[0].get("url")
-    except Exception:
-        return None
-    return None
+    return _first_url(_path(rec, "static_data", "fullrecord_metadata", "reprint_requests", "source_url"))
 
 
 def count_references(rec):
     """Safely count the number of references."""
-    try:
-        references = rec.get("static_data", {}).get("fullrecord_metadata", {}).get("references", {}).get("reference", [])
-        return len(references) if isinstance(references, list) else 0
-    except Exception:
-        return 0
+    return _reference_count(_path(rec, "static_data", "fullrecord_metadata", "references", "reference"))
+
+
+def iter_papers(records):
+    """Generator form of parse_papers: parses each record as it is produced."""
+    for rec in records:
+        if isinstance(rec, dict):
+            yield _extract_paper(rec)
 
 
 def parse_papers(records):
     """Parses list of WOS records into structured paper dictionaries."""
-    papers = []
-    for rec in records:
-        if not isinstance(rec, dict):
-            continue
-        title = extract_title(rec)
-        citations = (
-            rec.get("dynamic_data", {})
-               .get("citation_related", {})
-               .get("tc_list", {})
-               .get("silo_tc", [{}])[0]
-               .get("local_count", 0)
-        )
+    return [_extract_paper(rec) for rec in records if isinstance(rec, dict)]
+
+
+# --------------------------
+# Search Result Cache
+# --------------------------
+
+# Backend: "memory" (per process), "file" (shared by workers on one host),
+# "django" (any configured Django cache) or "none" to disable caching.
+CACHE_BACKEND = getattr(settings, "WOS_CACHE_BACKEND", "memory")
+CACHE_TTL = getattr(settings, "WOS_CACHE_TTL", 15 * 60)  # seconds
+CACHE_MAX_ENTRIES = getattr(settings, "WOS_CACHE_MAX_ENTRIES", 128)
+CACHE_DIR = getattr(settings, "WOS_CACHE_DIR", os.path.join(settings.BASE_DIR, ".wos_cache"))
+CACHE_ALIAS = getattr(settings, "WOS_CACHE_ALIAS", "default")
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry expiry."""
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class FileCacheBackend:
+    """
+    One JSON file per entry under `directory`, shared by every worker on the host.
+    File mtime doubles as the LRU clock: reads touch the file, writes evict the oldest.
+    """
 
-        # Safely extract abstract
-        abstract_text = ""
+    def __init__(self, directory=CACHE_DIR, max_entries=CACHE_MAX_ENTRIES):
+        self.directory = directory
+        self.max_entries = max_entries
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, key):
+        path = self._path(key)
         try:
-            abstract_paras = rec.get("static_data", {}).get("summary", {}).get("abstracts", {}).get("abstract", [{}])[0].get("abstract_text", {}).get("p", [])
-            if isinstance(abstract_paras, list):
-                abstract_text = " ".join(abstract_paras)
-            elif isinstance(abstract_paras, str):
-                abstract_text = abstract_paras
-        except (IndexError, TypeError, AttributeError):
-            abstract_text = "No abstract available."
-
-        # Safely extract keywords
-        keywords_list = []
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("expires_at", 0) <= time.time():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
         try:
-            keywords_data = rec.get("static_data", {}).get("item", {}).get("keywords", {}).get("keyword", [])
-            if isinstance(keywords_data, list):
-                keywords_list = keywords_data
-            elif isinstance(keywords_data, str):
-                keywords_list = [keywords_data]
-        except (TypeError, AttributeError):
-            keywords_list = []
-
-        papers.append({
-            "title": title,
-            "uid": rec.get("UID"),
-            "citations": citations,
-            "abstract": abstract_text,
-            "keywords": keywords_list,
-            # New fields for feature engineering
-            "publication_year": extract_publication_year(rec),
-            "pubtype": extract_pubtype(rec),
-            "doi": extract_doi(rec),
-            "url": extract_url(rec),
-            "num_references": count_references(rec),
-        })
-    return papers
+            os.utime(path)
+        except OSError:
+            pass
+        return entry.get("value")
+
+    def set(self, key, value, ttl):
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": time.time() + ttl, "value": value}, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.error(f"Could not write WOS cache entry: {e}")
+            return
+        self._evict()
+
+    def _evict(self):
+        try:
+            entries = [
+                entry for entry in os.scandir(self.directory)
+                if entry.is_file() and entry.name.endswith(".json")
+            ]
+        except OSError:
+            return
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_entries]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+    def clear(self):
+        if not os.path.isdir(self.directory):
+            return
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(".json"):
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+
+
+class DjangoCacheBackend:
+    """Delegates storage, expiry and eviction to a configured Django cache."""
+
+    def __init__(self, alias=CACHE_ALIAS):
+        from django.core.cache import caches
+        self.cache = caches[alias]
+
+    @staticmethod
+    def _key(key):
+        # Hash to stay within memcached key length/charset limits.
+        return "wos_search:" + hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        return self.cache.get(self._key(key))
+
+    def set(self, key, value, ttl):
+        self.cache.set(self._key(key), value, ttl)
+
+    def clear(self):
+        # Other entries may share the cache; only drop ours on expiry.
+        pass
+
+
+class WOSSearchCache:
+    """Caches parsed papers per (field, query, count, sortField) and counts hits/misses."""
+
+    def __init__(self, backend, ttl=CACHE_TTL):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(field, query, count, sort_field):
+        return json.dumps([field, query, int(count), sort_field], ensure_ascii=False)
+
+    def get(self, field, query, count, sort_field):
+        try:
+            papers = self.backend.get(self.make_key(field, query, count, sort_field))
+        except Exception as e:
+            logging.error(f"WOS cache lookup failed: {e}")
+            papers = None
+        with self._lock:
+            if papers is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return papers
+
+    def set(self, field, query, count, sort_field, papers):
+        try:
+            self.backend.set(self.make_key(field, query, count, sort_field), papers, self.ttl)
+        except Exception as e:
+            logging.error(f"WOS cache store failed: {e}")
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        total = hits + misses
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+        }
+
+
+_search_cache = None
+_search_cache_lock = threading.Lock()
+
+
+def _build_cache_backend(name):
+    if name == "memory":
+        return MemoryCacheBackend()
+    if name == "file":
+        return FileCacheBackend()
+    if name == "django":
+        return DjangoCacheBackend()
+    raise ValueError(f"Unknown WOS_CACHE_BACKEND: {name!r}")
+
+
+def get_search_cache():
+    """Returns the process-wide search cache, or None when caching is disabled."""
+    global _search_cache
+    if not CACHE_BACKEND or CACHE_BACKEND == "none":
+        return None
+    if _search_cache is None:
+        with _search_cache_lock:
+            if _search_cache is None:
+                _search_cache = WOSSearchCache(_build_cache_backend(CACHE_BACKEND))
+    return _search_cache
+
+
+def get_cache_stats():
+    """Hit/miss counters for this process; every hit is one WOS API call saved."""
+    cache = get_search_cache()
+    if cache is None:
+        return {"backend": None, "hits": 0, "misses": 0, "hit_rate": 0.0}
+    return cache.stats()
 
 
 # --------------------------
 # Main Orchestrator Function
 # --------------------------
 
-def search_papers_wos(query, count, field):
+def search_papers_wos(query, count, field, use_cache=True, user=None):
     """Main function to search WOS and return parsed papers."""
     params = build_params(field, query, count)
-    raw_data = call_wos_api(params)
 
-    if not raw_data:
-        return []
+    cache = get_search_cache() if use_cache else None
+    if cache is not None:
+        papers = cache.get(field, query, count, params["sortField"])
+        if papers is not None:
+            stats = cache.stats()
+            logging.info(
+                f"Served {len(papers)} papers from WOS cache "
+                f"(hits={stats['hits']}, misses={stats['misses']})."
+            )
+            return papers
+
+    if STREAM_RESPONSES:
+        _, papers = _fetch_streamed(params, user=user)
+    else:
+        raw_data = call_wos_api(params, user=user)
+
+        if not raw_data:
+            return []
 
-    records = normalize_records(raw_data)
-    logging.info(f"Extracted {len(records)} records from API.")
+        records = normalize_records(raw_data)
+        logging.info(f"Extracted {len(records)} records from API.")
 
-    # This is redundant as wos_paper_list_view saves the parsed data.
-    # save_records(records)
+        # This is redundant as wos_paper_list_view saves the parsed data.
+        # save_records(records)
 
-    papers = parse_papers(records)
+        papers = parse_papers(records)
     logging.info(f"Parsed {len(papers)} papers.")
 
+    # Empty results are not cached so a transient failure is retried next time.
+    if cache is not None and papers:
+        cache.set(field, query, count, params["sortField"], papers)
+
     return papers
+
+
+def _fetch_streamed(params, user=None, track_usage=True):
+    """Streams one page and returns (records_found, papers); records_found is None on failure."""
+    stream = open_wos_stream(params, user=user, track_usage=track_usage)
+    if stream is None:
+        return None, []
+    return _read_stream(stream)
+
+
+def _read_stream(stream):
+    try:
+        papers = list(iter_papers(stream))
+    except (requests.exceptions.RequestException, ValueError) as e:
+        logging.error(f"WOS API response could not be streamed: {e}")
+        return None, []
+    return stream.records_found, papers
+
+
+def _fetch_page(field, query, first_record, count, sort_field):
+    """
+    Fetches one harvest window; returns (records_found, papers, requests made),
+    records_found None on failure.
+    """
+    params = build_params(field, query, count, sort_field=sort_field, first_record=first_record)
+    # Usage is recorded by the harvesting generator so worker threads stay off the DB.
+    response = _send_request(params, track_usage=False, stream=STREAM_RESPONSES)
+    requests_made = _answered_attempts(response) if response is not None else 0
+    if response is None:
+        found, papers = None, []
+    elif STREAM_RESPONSES:
+        found, papers = _read_stream(WOSRecordStream(response))
+    else:
+        data = _response_json(response)
+        found, papers = (records_found(data), parse_papers(normalize_records(data))) if data else (None, [])
+    if found is None:
+        logging.warning(f"WOS harvest page at firstRecord={first_record} returned no data.")
+    return found, papers, requests_made
+
+
+def harvest_papers_wos(query, field, max_records, page_size=HARVEST_PAGE_SIZE,
+                       concurrency=HARVEST_CONCURRENCY, sort_field="TC+D", user=None):
+    """
+    Generator that pages through `firstRecord` windows and yields parsed papers
+    as each page arrives, de-duplicated by UID.
+
+    The first page is fetched alone to learn RecordsFound; the remaining pages are
+    fetched by a thread pool with at most `concurrency` requests in flight, so a
+    slow consumer also bounds how many pages are buffered.
+    """
+    if max_records < 1:
+        return
+
+    page_size = max(1, min(page_size, HARVEST_PAGE_SIZE, max_records))
+    seen_uids = set()
+
+    def _unseen(papers):
+        for paper in papers:
+            uid = paper.get("uid")
+            if uid:
+                if uid in seen_uids:
+                    continue
+                seen_uids.add(uid)
+            yield paper
+
+    found, papers, requests_made = _fetch_page(field, query, 1, page_size, sort_field)
+    record_api_usage(user, requests_made)
+    if found is None:
+        return
+    yield from _unseen(papers)
+
+    total = min(max_records, found)
+    windows = [
+        (first_record, min(page_size, total - first_record + 1))
+        for first_record in range(1 + page_size, total + 1, page_size)
+    ]
+    logging.info(f"Harvesting {total} WOS records in {len(windows) + 1} pages.")
+    if not windows:
+        return
+
+    pool = ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="wos-harvest")
+    pending = set()
+    try:
+        windows = iter(windows)
+        for first_record, count in windows:
+            pending.add(pool.submit(_fetch_page, field, query, first_record, count, sort_field))
+            if len(pending) >= concurrency:
+                break
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            results = [future.result() for future in done]
+            record_api_usage(user, sum(requests_made for _, _, requests_made in results))
+            for _, papers, _ in results:
+                yield from _unseen(papers)
+            for first_record, count in windows:
+                pending.add(pool.submit(_fetch_page, field, query, first_record, count, sort_field))
+                if len(pending) >= concurrency:
+                    break
+    finally:
+        # Caller may stop early; drop pages that have not started yet.
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import CustomUser, ResearcherProfile, WOSSearchHistory, ResearchPaper, WOSLightGBMPrediction, WOSRidgePrediction
+from .models import CustomUser, ResearcherProfile, WOSSearchHistory, ResearchPaper, WOSLightGBMPrediction, WOSRidgePrediction, WOSAPIUsage, SavedResultFile, DocumentProcessingJob, DocumentProcessingRun
 
 # Inline for ResearcherProfile on the CustomUser admin page
 class ResearcherProfileInline(admin.StackedInline):
@@ -56,9 +56,40 @@ class WOSLightGBMPredictionAdmin(admin.ModelAdmin):
 
 @admin.register(WOSRidgePrediction)
 class WOSRidgePredictionAdmin(admin.ModelAdmin):
-    list_display = ('wos_uid', 'user', 'predicted_citations', 'ci_low', 'ci_high', 'predicted_at')
+    list_display = ('wos_uid', 'user', 'predicted_citations', 'ci_low', 'ci_high', 'model_version', 'predicted_at')
     search_fields = ('wos_uid', 'user__email')
-    list_filter = ('predicted_at',)
+    list_filter = ('model_version', 'predicted_at')
+
+
+@admin.register(WOSAPIUsage)
+class WOSAPIUsageAdmin(admin.ModelAdmin):
+    list_display = ('date', 'user', 'request_count')
+    search_fields = ('user__email',)
+    list_filter = ('date',)
+    ordering = ('-date', '-request_count')
+
+
+@admin.register(SavedResultFile)
+class SavedResultFileAdmin(admin.ModelAdmin):
+    list_display = ('path', 'user', 'file_format', 'record_count', 'size', 'query', 'created_at')
+    search_fields = ('path', 'query', 'user__email')
+    list_filter = ('file_format', 'created_at')
+
+
+@admin.register(DocumentProcessingJob)
+class DocumentProcessingJobAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'status', 'research_paper', 'created_at', 'finished_at')
+    search_fields = ('filename', 'user__email', 'task_id')
+    list_filter = ('status', 'created_at')
+    readonly_fields = ('created_at', 'started_at', 'finished_at')
+
+
+@admin.register(DocumentProcessingRun)
+class DocumentProcessingRunAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'user', 'file_type', 'source', 'outcome', 'page_count', 'char_count', 'total_ms', 'created_at')
+    search_fields = ('filename', 'user__email')
+    list_filter = ('file_type', 'source', 'outcome', 'created_at')
+    readonly_fields = ('created_at',)
 
 
 @admin.register(ResearchPaper)
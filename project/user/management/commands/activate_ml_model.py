@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from user import ml_utils
+
+
+class Command(BaseCommand):
+    help = ("Switch the model registry's CURRENT pointer to a published version (e.g. to roll back); "
+            "running workers swap it in on their next check. Without a version, lists the published ones.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("version", nargs="?", help="Published version to serve")
+
+    def handle(self, *args, **options):
+        if not options["version"]:
+            current = ml_utils.current_version()
+            for manifest in ml_utils.list_versions():
+                marker = "*" if manifest["version"] == current else " "
+                self.stdout.write(f"{marker} {manifest['version']:<24} {manifest.get('created_at', '')}  {manifest.get('notes', '')}")
+            if current is None:
+                self.stdout.write(f"No version active; serving the files in {ml_utils.ML_MODELS_DIR}")
+            return
+
+        try:
+            ml_utils.activate_version(options["version"])
+        except (FileNotFoundError, ml_utils.MLModelError) as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Model version {options['version']} activated"))
@@ -0,0 +1,83 @@
+import os
+import re
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from user.models import CustomUser, SavedResultFile, WOSSearchHistory
+from user.storage_utils import RESULTS_DIR, is_results_file, count_search_results, register_results_file
+
+# json_data/<YYYYMMDD>/records_<user id>_<HHMMSS>.<ext>
+_RESULTS_NAME = re.compile(r"^records_(\d+)_(\d{6})\.")
+
+
+def _saved_at(file_path):
+    """Timestamp encoded in the directory/file name, else the file's mtime."""
+    match = _RESULTS_NAME.match(os.path.basename(file_path))
+    day = os.path.basename(os.path.dirname(file_path))
+    try:
+        naive = datetime.datetime.strptime(day + match.group(2), "%Y%m%d%H%M%S")
+    except (AttributeError, ValueError):
+        naive = datetime.datetime.fromtimestamp(os.path.getmtime(file_path))
+    return timezone.make_aware(naive)
+
+
+class Command(BaseCommand):
+    help = "Add saved WOS result files under json_data/ to the SavedResultFile catalog."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--directory", default=RESULTS_DIR, help="Results directory to scan")
+        parser.add_argument("--prune", action="store_true", help="Also drop catalog rows whose file no longer exists")
+        parser.add_argument("--dry-run", action="store_true")
+
+    def handle(self, *args, **options):
+        known = set(SavedResultFile.objects.values_list("path", flat=True))
+        users = {str(pk): pk for pk in CustomUser.objects.values_list("pk", flat=True)}
+        history = {
+            os.path.abspath(path): (query, field)
+            for path, query, field in WOSSearchHistory.objects.exclude(json_file_path__isnull=True)
+            .values_list("json_file_path", "query", "search_field")
+        }
+
+        added = failed = 0
+        for root, dirs, files in os.walk(options["directory"]):
+            for file in sorted(files):
+                file_path = os.path.abspath(os.path.join(root, file))
+                if not is_results_file(file) or file_path in known:
+                    continue
+                if options["dry_run"]:
+                    self.stdout.write(file_path)
+                    added += 1
+                    continue
+
+                match = _RESULTS_NAME.match(file)
+                query, search_field = history.get(file_path, ("", ""))
+                try:
+                    record_count = count_search_results(file_path)
+                except Exception as e:
+                    self.stderr.write(f"Could not read {file_path}: {e}")
+                    record_count = None
+                    failed += 1
+                register_results_file(
+                    file_path,
+                    user_id=users.get(match.group(1)) if match else None,
+                    query=query,
+                    search_field=search_field,
+                    record_count=record_count,
+                    created_at=_saved_at(file_path),
+                )
+                added += 1
+
+        pruned = 0
+        if options["prune"]:
+            missing = [path for path in known if not os.path.exists(path)]
+            if missing and not options["dry_run"]:
+                pruned, _ = SavedResultFile.objects.filter(path__in=missing).delete()
+            else:
+                pruned = len(missing)
+
+        verb = "Would catalog" if options["dry_run"] else "Cataloged"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb} {added} result files ({failed} unreadable), pruned {pruned} missing entries."
+        ))
@@ -0,0 +1,72 @@
+import random
+import time
+from unittest import mock
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from user import ml_utils
+
+
+def synthetic_records(n, vectorizer, seed=0):
+    """Papers built from vocabulary terms (so the TF-IDF blocks are populated) plus some noise words."""
+    rng = random.Random(seed)
+    terms = {key: sorted(vec.vocabulary_) for key, vec in vectorizer.items()}
+
+    def text(key, lo, hi):
+        words = [rng.choice(terms[key]) if rng.random() < 0.7 else f"noise{rng.randint(0, 999)}"
+                 for _ in range(rng.randint(lo, hi))]
+        return " ".join(words)
+
+    return [
+        {"title": text("title", 4, 14), "abstract": text("abstract", 80, 250), "keywords": text("keywords", 2, 8)}
+        for _ in range(n)
+    ]
+
+
+class Command(BaseCommand):
+    help = "Benchmark Ridge scoring: sklearn transform/hstack/predict vs. the compiled engine."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--records", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--seed", type=int, default=0)
+
+    def _run(self, engine, records, repeat):
+        """(per-call latencies in ms, best batch time in s, predictions) with ML_INFERENCE_ENGINE=engine."""
+        with mock.patch.object(ml_utils, "ML_INFERENCE_ENGINE", engine):
+            ml_utils.unload_ridge_model()
+            ml_utils.warm_up()
+            latencies = []
+            for rec in records:
+                start = time.perf_counter()
+                ml_utils.predict_from_text(rec["title"], rec["abstract"], rec["keywords"])
+                latencies.append((time.perf_counter() - start) * 1000)
+            best = float("inf")
+            for _ in range(repeat):
+                start = time.perf_counter()
+                predictions = ml_utils.predict_many(records)
+                best = min(best, time.perf_counter() - start)
+        ml_utils.unload_ridge_model()
+        return np.array(latencies), best, predictions
+
+    def handle(self, *args, **options):
+        records = synthetic_records(options["records"], ml_utils.load_vectorizer(), options["seed"])
+        n = len(records)
+        results = {engine: self._run(engine, records, options["repeat"]) for engine in ("sklearn", "compiled")}
+
+        reference = np.array([p["raw_prediction"] for p in results["sklearn"][2]])
+        compiled = np.array([p["raw_prediction"] for p in results["compiled"][2]])
+        mismatched = sum(a["predicted"] != b["predicted"] for a, b in zip(*(r[2] for r in results.values())))
+        self.stdout.write(f"records:  {n}")
+        self.stdout.write(f"parity:   max rel. diff {np.max(np.abs(compiled - reference) / np.maximum(reference, 1e-9)):.2e}, "
+                          f"{mismatched} rounded prediction(s) differ")
+
+        for engine, (latencies, batch, _) in results.items():
+            self.stdout.write(
+                f"{engine:<9} single p50 {np.percentile(latencies, 50):6.2f} ms  p95 {np.percentile(latencies, 95):6.2f} ms  "
+                f"batch {batch * 1000:8.1f} ms ({n / batch:,.0f} records/s)"
+            )
+        single = np.median(results["sklearn"][0]) / np.median(results["compiled"][0])
+        batch = results["sklearn"][1] / results["compiled"][1]
+        self.stdout.write(self.style.SUCCESS(f"speedup:  {single:.1f}x single-record p50, {batch:.1f}x batch"))
@@ -0,0 +1,220 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from user.WOS_utils import parse_papers
+
+
+def synthetic_record(i, rng):
+    """A WOS full-record (optionView=FR) shaped dict with the fields parse_papers reads."""
+    return {
+        "UID": f"WOS:{i:015d}",
+        "static_data": {
+            "summary": {
+                "titles": {"title": [
+                    {"type": "source", "content": "Journal of Synthetic Results"},
+                    {"type": "item", "content": f"Synthetic paper number {i}"},
+                ]},
+                "pub_info": {"pubyear": rng.randint(1990, 2024), "pubtype": "Journal"},
+                "abstracts": {"abstract": [{"abstract_text": {"p": [
+                    "We study a synthetic problem.", f"Result {i} improves the baseline.",
+                ]}}]},
+            },
+            "item": {
+                "keywords": {"keyword": [f"kw{rng.randint(0, 99)}" for _ in range(rng.randint(0, 6))]},
+                "bib_id": {"other": [
+                    {"type": "issn", "value": "0000-0000"},
+                    {"type": "doi", "value": f"10.0000/synthetic.{i}"},
+                ]},
+            },
+            "fullrecord_metadata": {
+                "reprint_requests": {"source_url": [{"url": f"https://example.org/{i}"}]},
+                "references": {"reference": [{"uid": f"R{j}"} for j in range(rng.randint(0, 40))]},
+            },
+        },
+        "dynamic_data": {"citation_related": {"tc_list": {"silo_tc": [{"local_count": rng.randint(0, 500)}]}}},
+    }
+
+
+def edge_case_records():
+    """Shapes the synthetic batch never produces, on which parse_papers must still agree with the legacy parser."""
+    def record(summary=None, item=None, fullrecord=None, dynamic=None):
+        return {"UID": "WOS:edge", "static_data": {"summary": summary or {}, "item": item or {},
+                                                  "fullrecord_metadata": fullrecord or {}},
+                "dynamic_data": dynamic or {}}
+
+    return [
+        {},
+        record(),
+        record(fullrecord={"references": {"reference": {"uid": "R1"}}}),
+        record(fullrecord={"reprint_requests": {"source_url": {"url": "https://example.org"}}}),
+        record(fullrecord={"reprint_requests": {"source_url": ["https://example.org"]}}),
+        record(summary={"titles": {"title": {"type": "item", "content": "Single title"}}}),
+        record(summary={"abstracts": {"abstract": []}}),
+        record(summary={"abstracts": None}),
+        record(summary={"abstracts": {"abstract": [{"abstract_text": [{"p": "listed"}]}]}}),
+        record(summary={"abstracts": {"abstract": [{"abstract_text": {"p": ["one", 2]}}]}}),
+        record(summary={"abstracts": {"abstract": [{"abstract_text": {"p": "single paragraph"}}]}}),
+        record(summary={"abstracts": {"abstract": [{"abstract_text": {}}]}}),
+        record(item={"keywords": {"keyword": "solo"}, "bib_id": {"other": {"type": "doi", "value": "10.1/x"}}}),
+        record(dynamic={"citation_related": {"tc_list": {"silo_tc": [{"local_count": 9}]}}}),
+    ]
+
+
+# Verbatim copy of the per-field parser that parse_papers replaced, kept as the baseline.
+def _legacy_extract_title(rec):
+    """Safely extract the main title from a WOS record."""
+    if not isinstance(rec, dict):
+        return "Untitled"
+
+    titles = (
+        rec.get("static_data", {})
+        .get("summary", {})
+        .get("titles", {})
+        .get("title", [])
+    )
+
+    if isinstance(titles, list):
+        for t in titles:
+            if isinstance(t, dict) and t.get("type") == "item":
+                return t.get("content", "Untitled")
+    return "Untitled"
+
+
+def _legacy_extract_publication_year(rec):
+    """Safely extract the publication year."""
+    try:
+        return rec.get("static_data", {}).get("summary", {}).get("pub_info", {}).get("pubyear")
+    except Exception:
+        return None
+
+def _legacy_extract_pubtype(rec):
+    """Safely extract the publication type."""
+    try:
+        # The 'pubtype' attribute is nested under 'pub_info'
+        return rec.get("static_data", {}).get("summary", {}).get("pub_info", {}).get("pubtype")
+    except Exception:
+        return None
+
+
+def _legacy_extract_doi(rec):
+    """Safely extract the DOI."""
+    try:
+        other_ids = rec.get("static_data", {}).get("item", {}).get("bib_id", {}).get("other", [])
+        if isinstance(other_ids, list):
+            for item in other_ids:
+                if isinstance(item, dict) and item.get("type") == "doi":
+                    return item.get("value")
+    except Exception:
+        return None
+    return None
+
+
+def _legacy_extract_url(rec):
+    """Safely extract a source URL."""
+    try:
+        source_urls = rec.get("static_data", {}).get("fullrecord_metadata", {}).get("reprint_requests", {}).get("source_url", [])
+        if isinstance(source_urls, list) and source_urls:
+            return source_urls[0].get("url")
+    except Exception:
+        return None
+    return None
+
+
+def _legacy_count_references(rec):
+    """Safely count the number of references."""
+    try:
+        references = rec.get("static_data", {}).get("fullrecord_metadata", {}).get("references", {}).get("reference", [])
+        return len(references) if isinstance(references, list) else 0
+    except Exception:
+        return 0
+
+
+def legacy_parse_papers(records):
+    """Parses list of WOS records into structured paper dictionaries."""
+    papers = []
+    for rec in records:
+        if not isinstance(rec, dict):
+            continue
+        title = _legacy_extract_title(rec)
+        citations = (
+            rec.get("dynamic_data", {})
+               .get("citation_related", {})
+               .get("tc_list", {})
+               .get("silo_tc", [{}])[0]
+               .get("local_count", 0)
+        )
+
+        # Safely extract abstract
+        abstract_text = ""
+        try:
+            abstract_paras = rec.get("static_data", {}).get("summary", {}).get("abstracts", {}).get("abstract", [{}])[0].get("abstract_text", {}).get("p", [])
+            if isinstance(abstract_paras, list):
+                abstract_text = " ".join(abstract_paras)
+            elif isinstance(abstract_paras, str):
+                abstract_text = abstract_paras
+        except (IndexError, TypeError, AttributeError):
+            abstract_text = "No abstract available."
+
+        # Safely extract keywords
+        keywords_list = []
+        try:
+            keywords_data = rec.get("static_data", {}).get("item", {}).get("keywords", {}).get("keyword", [])
+            if isinstance(keywords_data, list):
+                keywords_list = keywords_data
+            elif isinstance(keywords_data, str):
+                keywords_list = [keywords_data]
+        except (TypeError, AttributeError):
+            keywords_list = []
+
+        papers.append({
+            "title": title,
+            "uid": rec.get("UID"),
+            "citations": citations,
+            "abstract": abstract_text,
+            "keywords": keywords_list,
+            # New fields for feature engineering
+            "publication_year": _legacy_extract_publication_year(rec),
+            "pubtype": _legacy_extract_pubtype(rec),
+            "doi": _legacy_extract_doi(rec),
+            "url": _legacy_extract_url(rec),
+            "num_references": _legacy_count_references(rec),
+        })
+    return papers
+
+
+class Command(BaseCommand):
+    help = "Micro-benchmark parse_papers against the legacy per-field parser on synthetic WOS records."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--records", type=int, default=10000)
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def _best_of(self, fn, records, repeat):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn(records)
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        records = [synthetic_record(i, rng) for i in range(options["records"])]
+
+        if legacy_parse_papers(records) != parse_papers(records):
+            self.stderr.write(self.style.ERROR("Parsers disagree on the synthetic batch."))
+            return
+        if legacy_parse_papers(edge_case_records()) != parse_papers(edge_case_records()):
+            self.stderr.write(self.style.ERROR("Parsers disagree on the edge-case records."))
+            return
+
+        legacy = self._best_of(legacy_parse_papers, records, options["repeat"])
+        current = self._best_of(parse_papers, records, options["repeat"])
+        n = len(records)
+        self.stdout.write(f"records:  {n}")
+        self.stdout.write(f"legacy:   {legacy * 1000:8.1f} ms  ({n / legacy:,.0f} records/s)")
+        self.stdout.write(f"current:  {current * 1000:8.1f} ms  ({n / current:,.0f} records/s)")
+        self.stdout.write(self.style.SUCCESS(f"speedup:  {legacy / current:.2f}x"))
@@ -0,0 +1,32 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user import ml_utils
+
+
+class Command(BaseCommand):
+    help = ("Convert the Ridge / TF-IDF / LDA pickles into memory-mapped .npy artifacts plus a manifest, "
+            "so every worker process shares the same pages (see ML_ARTIFACT_FORMAT).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default=ml_utils.ML_ARTIFACT_DIR, help="Directory for the npy artifacts")
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        try:
+            manifest = ml_utils.export_mapped_artifacts(output)
+        except (FileNotFoundError, ml_utils.MLModelError) as e:
+            raise CommandError(str(e))
+
+        files = [manifest["model"]["coef"]] + [
+            name for entry in manifest["vectorizers"].values() for name in (entry["idf"], entry["terms"], entry["term_index"])
+        ]
+        lda = manifest["lda"]
+        if lda:
+            files += [lda["components"], lda["exp_dirichlet_component"], lda["counter"]["terms"], lda["counter"]["term_index"]]
+        for name in files:
+            self.stdout.write(f"{name:<36} {os.path.getsize(os.path.join(output, name)) / 1024:8.1f} KiB")
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {ml_utils.MANIFEST_FILENAME} with {len(manifest['vectorizers'])} vectorizer(s) to {output}"
+        ))
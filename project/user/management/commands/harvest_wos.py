@@ -0,0 +1,39 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from user.WOS_utils import harvest_papers_wos, HARVEST_PAGE_SIZE, HARVEST_CONCURRENCY
+from user.forms import FIELD_CHOICES
+
+
+class Command(BaseCommand):
+    help = "Harvest a large WOS result set page by page and write parsed papers as JSON Lines."
+
+    def add_arguments(self, parser):
+        parser.add_argument("query", help="Search term")
+        parser.add_argument("--field", default="TS", choices=[code for code, _ in FIELD_CHOICES])
+        parser.add_argument("--max-records", type=int, default=1000)
+        parser.add_argument("--page-size", type=int, default=HARVEST_PAGE_SIZE)
+        parser.add_argument("--concurrency", type=int, default=HARVEST_CONCURRENCY)
+        parser.add_argument("--output", help="File to write (default: stdout)")
+
+    def handle(self, *args, **options):
+        out = open(options["output"], "w", encoding="utf-8") if options["output"] else self.stdout
+        written = 0
+        try:
+            for paper in harvest_papers_wos(
+                options["query"],
+                options["field"],
+                options["max_records"],
+                page_size=options["page_size"],
+                concurrency=options["concurrency"],
+            ):
+                out.write(json.dumps(paper, ensure_ascii=False) + "\n")
+                written += 1
+        except ValueError as e:
+            raise CommandError(str(e))
+        finally:
+            if out is not self.stdout:
+                out.close()
+
+        self.stderr.write(self.style.SUCCESS(f"Harvested {written} unique papers."))
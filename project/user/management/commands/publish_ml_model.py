@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from user import ml_utils
+
+
+class Command(BaseCommand):
+    help = ("Publish the Ridge / TF-IDF pickles as a new version in the model registry (ML_REGISTRY_DIR) "
+            "and, unless --no-activate is given, make it the version workers serve.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--source", default=ml_utils.ML_MODELS_DIR, help="Directory holding the pickles to publish")
+        parser.add_argument("--name", help="Version name (default: a UTC timestamp)")
+        parser.add_argument("--notes", default="", help="Free text stored in the version manifest")
+        parser.add_argument("--npy", action="store_true", help="Also build memory-mapped npy artifacts for the version")
+        parser.add_argument("--no-activate", action="store_true", help="Publish without switching CURRENT to it")
+
+    def handle(self, *args, **options):
+        try:
+            manifest = ml_utils.publish_version(options["source"], options["name"], options["notes"], options["npy"])
+            if not options["no_activate"]:
+                ml_utils.activate_version(manifest["version"])
+        except (FileNotFoundError, ValueError, ml_utils.MLModelError) as e:
+            raise CommandError(str(e))
+
+        rmse = f"{manifest['rmse']:.4f}" if manifest["rmse"] is not None else "n/a"
+        self.stdout.write(f"{manifest['version']}: {len(manifest['files'])} file(s), "
+                          f"{manifest['n_features']} features, rmse {rmse}")
+        status = "published" if options["no_activate"] else "published and activated"
+        self.stdout.write(self.style.SUCCESS(f"Model version {manifest['version']} {status}"))
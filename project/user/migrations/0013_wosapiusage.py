@@ -0,0 +1,31 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0012_researchpaperlightgbmprediction_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WOSAPIUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(default=django.utils.timezone.localdate)),
+                ('request_count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(blank=True, help_text='Empty for requests made outside a user session (e.g. management commands)', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='wos_api_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'WOS API Usage',
+                'verbose_name_plural': 'WOS API Usage',
+                'ordering': ['-date', '-request_count'],
+                'unique_together': {('user', 'date')},
+            },
+        ),
+    ]
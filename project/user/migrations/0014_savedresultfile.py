@@ -0,0 +1,35 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:40
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0013_wosapiusage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SavedResultFile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('path', models.CharField(max_length=500, unique=True)),
+                ('file_format', models.CharField(default='json', max_length=10)),
+                ('size', models.PositiveBigIntegerField(default=0, help_text='File size in bytes')),
+                ('record_count', models.PositiveIntegerField(blank=True, null=True)),
+                ('query', models.CharField(blank=True, max_length=255)),
+                ('search_field', models.CharField(blank=True, max_length=20)),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(blank=True, help_text='Empty when the owner could not be resolved during backfill', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='saved_result_files', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Saved Result File',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['user', '-created_at'], name='user_savedr_user_id_5cb5ac_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:44
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0014_savedresultfile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentProcessingJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file', models.FileField(blank=True, help_text='Stored upload; removed once processed', upload_to='document_jobs/%Y%m%d/')),
+                ('filename', models.CharField(help_text='Original filename of the uploaded document', max_length=255)),
+                ('file_size', models.PositiveIntegerField(help_text='Size of the original file in bytes')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='pending', max_length=20)),
+                ('task_id', models.CharField(blank=True, help_text='Celery task id, when run through Celery', max_length=255)),
+                ('error', models.TextField(blank=True)),
+                ('result', models.JSONField(blank=True, help_text='Extracted title, abstract, keywords, authors and year', null=True)),
+                ('is_updated', models.BooleanField(default=False, help_text='True if an existing paper with this filename was updated')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('research_paper', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='processing_jobs', to='user.researchpaper')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='document_jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Document Processing Job',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0015_documentprocessingjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentprocessingjob',
+            name='mode',
+            field=models.CharField(choices=[('full', 'Full processing'), ('keywords', 'Full-text keywords')], default='full', help_text="'keywords' jobs only refresh keywords of a paper saved from its front matter", max_length=20),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0016_documentprocessingjob_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='researchpaper',
+            name='content_hash',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 of the uploaded file, used to reuse earlier extraction results', max_length=64),
+        ),
+        migrations.AddIndex(
+            model_name='researchpaper',
+            index=models.Index(fields=['content_hash'], name='user_resear_content_3e5cb8_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.1 on 2026-10-16 22:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0017_researchpaper_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentProcessingRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename', models.CharField(max_length=255)),
+                ('file_type', models.CharField(db_index=True, max_length=10)),
+                ('file_size', models.PositiveIntegerField(default=0, help_text='Size of the uploaded file in bytes')),
+                ('source', models.CharField(choices=[('upload', 'Upload request'), ('job', 'Background job')], default='upload', max_length=20)),
+                ('outcome', models.CharField(choices=[('processed', 'Processed'), ('reused', 'Reused earlier extraction'), ('queued', 'Queued for background job'), ('failed', 'Failed')], default='failed', max_length=20)),
+                ('page_count', models.PositiveIntegerField(blank=True, help_text='Pages of a PDF (whole document)', null=True)),
+                ('char_count', models.PositiveIntegerField(blank=True, help_text='Characters of extracted text', null=True)),
+                ('stages', models.JSONField(default=dict, help_text="Milliseconds per stage, e.g. {'extract_pdf': 812.4}")),
+                ('total_ms', models.FloatField(help_text='Wall time of the whole pass in milliseconds')),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='processing_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Document Processing Run',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
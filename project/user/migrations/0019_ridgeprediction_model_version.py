@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-16 23:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0018_documentprocessingrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='researchpaperridgeprediction',
+            name='model_version',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='Model registry version that made the prediction', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='wosridgeprediction',
+            name='model_version',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='Model registry version that made the prediction', max_length=64),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.1 on 2026-10-16 23:16
+
+from django.db import migrations, models
+
+
+def merge_system_rows(apps, schema_editor):
+    """Folds duplicate user-less rows of a day into one, so the constraint can be added."""
+    WOSAPIUsage = apps.get_model('user', 'WOSAPIUsage')
+    rows = {}
+    for usage in WOSAPIUsage.objects.filter(user__isnull=True).order_by('date', 'pk'):
+        first = rows.setdefault(usage.date, usage)
+        if first.pk != usage.pk:
+            first.request_count += usage.request_count
+            first.save(update_fields=['request_count'])
+            usage.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0019_ridgeprediction_model_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_system_rows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='wosapiusage',
+            constraint=models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('date',), name='unique_system_wos_api_usage_per_day'),
+        ),
+    ]
@@ -1,12 +1,22 @@
 import os
+import re
+import json
+import math
+import time
+import shutil
+import hashlib
 import logging
 import pickle
-from functools import lru_cache
+import tempfile
+import threading
+from collections import Counter
 
 import joblib
 import numpy as np
 
 from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +34,41 @@ ML_MODELS_DIR = getattr(settings, "ML_MODELS_DIR", os.path.join(settings.BASE_DI
 MODEL_FILENAME = getattr(settings, "ML_MODEL_FILENAME", "ridge_model.pkl")
 VECTORIZER_FILENAME = getattr(settings, "VECTORIZER_FILENAME", "tfidf_vectorizers.pkl")
 MODEL_RESULTS_FILENAME = getattr(settings, "MODEL_RESULTS_FILENAME", "model_results.pkl")
+LDA_MODEL_FILENAME = getattr(settings, "LDA_MODEL_FILENAME", "lda_model.pkl")
+LDA_VECTORIZER_FILENAME = getattr(settings, "LDA_VECTORIZER_FILENAME", "lda_count_vectorizer.pkl")
+
+# "pickle", "npy" (memory-mapped arrays + manifest, see convert_ml_artifacts) or
+# "auto": npy when a manifest matching the current pickles exists, else pickle.
+ML_ARTIFACT_FORMAT = getattr(settings, "ML_ARTIFACT_FORMAT", "auto")
+ML_ARTIFACT_DIR = getattr(settings, "ML_ARTIFACT_DIR", os.path.join(ML_MODELS_DIR, "npy"))
+MANIFEST_FILENAME = "manifest.json"
+ARTIFACT_FORMAT_VERSION = 2
+
+# "compiled" scores with CompiledRidgeEngine (falls back to sklearn when the
+# artifacts do not fit it), "sklearn" always goes through transform + predict.
+ML_INFERENCE_ENGINE = getattr(settings, "ML_INFERENCE_ENGINE", "compiled")
+
+# Versioned artifacts: <ML_REGISTRY_DIR>/<version>/ holds the three pickles,
+# a version.json manifest and optionally npy/; the CURRENT file names the
+# version to serve. Without CURRENT the fixed-name files above are used.
+ML_REGISTRY_DIR = getattr(settings, "ML_REGISTRY_DIR", os.path.join(ML_MODELS_DIR, "registry"))
+# Seconds between checks of CURRENT by a serving process; 0 disables hot reload.
+# Polling rather than a signal: gunicorn resets the usual signals (HUP, USR1,
+# USR2, ...) in its workers and uses them in the master.
+ML_RELOAD_INTERVAL = getattr(settings, "ML_RELOAD_INTERVAL", 10)
+CURRENT_FILENAME = "CURRENT"
+VERSION_MANIFEST = "version.json"
+NPY_DIRNAME = "npy"
+UNVERSIONED = "unversioned"  # model_version of predictions made with the fixed-name files
+_VERSION_NAME = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]{0,63}")
+# Names a version directory cannot take (compared case-insensitively for case-insensitive filesystems)
+_RESERVED_NAMES = {name.casefold() for name in (CURRENT_FILENAME, NPY_DIRNAME, UNVERSIONED)}
+
+# CountVectorizer parameters of a TfidfVectorizer; the idf/norm part is applied by MappedTfidfVectorizer
+_COUNT_PARAMS = (
+    "input", "encoding", "decode_error", "strip_accents", "lowercase", "stop_words",
+    "token_pattern", "ngram_range", "analyzer", "binary",
+)
 
 
 class MLModelError(Exception):
@@ -49,40 +94,312 @@ def _safe_load(path):
         raise MLModelError(f"Failed to load {path}: {e}")
 
 
-@lru_cache(maxsize=1)
-def load_model():
-    path = os.path.join(ML_MODELS_DIR, MODEL_FILENAME)
+# ----------------- Memory-mapped artifacts -----------------
+class MappedCountVectorizer:
+    """
+    CountVectorizer.transform over a vocabulary stored as two mmap'd arrays:
+    the terms in sorted order and the feature index of each. Tokens are looked
+    up with np.searchsorted, so no per-process vocabulary dict is built.
+    """
+
+    def __init__(self, params, terms, term_index):
+        from sklearn.feature_extraction.text import CountVectorizer
+
+        count_params = {name: params[name] for name in _COUNT_PARAMS}
+        count_params["ngram_range"] = tuple(count_params["ngram_range"])  # a list after the JSON round trip
+        # Only used for its analyzer, which does not need the vocabulary
+        self._analyzer = CountVectorizer(**count_params).build_analyzer()
+        self.terms = terms
+        self.term_index = term_index
+        self.binary = params["binary"]
+        self.dtype = np.dtype(params["dtype"])
+
+    def __len__(self):
+        return self.terms.size
+
+    def items(self):
+        """(term, feature index) pairs, like vocabulary_.items()."""
+        return zip(self.terms.tolist(), self.term_index.tolist())
+
+    def build_analyzer(self):
+        return self._analyzer
+
+    def transform(self, raw_documents):
+        tokens, lengths = [], []
+        for doc in raw_documents:
+            doc_tokens = self._analyzer(doc)
+            tokens.extend(doc_tokens)
+            lengths.append(len(doc_tokens))
+        rows = np.repeat(np.arange(len(lengths)), lengths)
+
+        cols = np.empty(0, dtype=self.term_index.dtype)
+        if tokens and self.terms.size:
+            tokens = np.array(tokens)
+            slots = np.minimum(np.searchsorted(self.terms, tokens), self.terms.size - 1)
+            known = self.terms[slots] == tokens
+            rows, cols = rows[known], self.term_index[slots[known]]
+        else:
+            rows = rows[:0]
+
+        X = csr_matrix((np.ones(rows.size, dtype=self.dtype), (rows, cols)),
+                       shape=(len(lengths), self.terms.size), dtype=self.dtype)
+        X.sum_duplicates()
+        if self.binary:
+            X.data[:] = 1
+        return X
+
+
+class MappedTfidfVectorizer:
+    """
+    TfidfVectorizer.transform over a MappedCountVectorizer and an idf_ vector
+    opened with mmap_mode='r': the same counting, idf scaling and normalization
+    steps, but the arrays live in the OS page cache shared by all workers.
+    """
+
+    def __init__(self, params, terms, term_index, idf):
+        self.counter = MappedCountVectorizer(params, terms, term_index)
+        self.idf_ = idf
+        self.binary = params["binary"]
+        self.norm = params["norm"]
+        self.sublinear_tf = params["sublinear_tf"]
+
+    def build_analyzer(self):
+        return self.counter.build_analyzer()
+
+    def transform(self, raw_documents):
+        from sklearn.preprocessing import normalize
+
+        X = self.counter.transform(raw_documents)
+        if self.sublinear_tf:
+            np.log(X.data, X.data)
+            X.data += 1.0
+        X.data *= self.idf_[X.indices]
+        if self.norm is not None:
+            X = normalize(X, norm=self.norm, copy=False)
+        return X
+
+
+class MappedRidge:
+    """Ridge.predict with a memory-mapped coef_ vector."""
+
+    def __init__(self, coef, intercept):
+        self.coef_ = coef
+        self.intercept_ = intercept
+        self.n_features_in_ = coef.shape[-1]
+
+    def predict(self, X):
+        return X @ self.coef_.T + self.intercept_
+
+
+def _artifact_path(name, directory=None):
+    return os.path.join(directory or ML_ARTIFACT_DIR, name)
+
+
+def _source_stamp(filename, models_dir=None):
+    """SHA-256 of a source pickle, used to notice a manifest that is out of date."""
+    path = os.path.join(models_dir or ML_MODELS_DIR, filename)
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(models_dir=None, artifact_dir=None):
+    """The npy artifact manifest for the pickles in `models_dir`, or None when the pickles should be used."""
+    if ML_ARTIFACT_FORMAT == "pickle":
+        return None
+    artifact_dir = artifact_dir or ML_ARTIFACT_DIR
+    path = _artifact_path(MANIFEST_FILENAME, artifact_dir)
+    if not os.path.exists(path):
+        if ML_ARTIFACT_FORMAT == "npy":
+            raise FileNotFoundError(f"Model artifact manifest not found: {path} (run convert_ml_artifacts)")
+        return None
+
     try:
-        model = _safe_load(path)
-        logger.info("Loaded model from %s", path)
-        return model
-    except FileNotFoundError as e:
-        logger.error(e)
-        raise
-    except MLModelError as e:
-        logger.error(e)
-        raise
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        raise MLModelError(f"Failed to read {path}: {e}")
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        if ML_ARTIFACT_FORMAT == "auto":
+            logger.warning("%s has an old artifact format version; using the pickles (run convert_ml_artifacts)", path)
+            return None
+        raise MLModelError(f"Unsupported artifact format version in {path}")
 
+    if ML_ARTIFACT_FORMAT == "auto":
+        for filename, stamp in manifest.get("sources", {}).items():
+            current = _source_stamp(filename, models_dir)
+            if current is not None and current != stamp:
+                logger.warning("%s changed since the npy artifacts were built; using the pickles", filename)
+                return None
+    logger.info("Using memory-mapped model artifacts from %s", artifact_dir)
+    return manifest
 
-@lru_cache(maxsize=1)
-def load_vectorizer():
-    path = os.path.join(ML_MODELS_DIR, VECTORIZER_FILENAME)
+
+def _load_array(name, directory=None):
     try:
-        vec = _safe_load(path)
-        logger.info("Loaded vectorizer from %s", path)
-        return vec
-    except FileNotFoundError as e:
-        logger.error(e)
-        raise
-    except MLModelError as e:
+        return np.load(_artifact_path(name, directory), mmap_mode="r", allow_pickle=False)
+    except OSError as e:
+        raise MLModelError(f"Failed to map {name}: {e}")
+
+
+def _load_mapped_model(manifest, directory=None):
+    entry = manifest["model"]
+    return MappedRidge(_load_array(entry["coef"], directory), entry["intercept"])
+
+
+def _load_mapped_vectorizers(manifest, directory=None):
+    vectorizers = {}
+    for key, entry in manifest["vectorizers"].items():
+        vectorizers[key] = MappedTfidfVectorizer(
+            entry["params"], _load_array(entry["terms"], directory),
+            _load_array(entry["term_index"], directory), _load_array(entry["idf"], directory),
+        )
+    return vectorizers
+
+
+def _json_number(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _save_vocabulary(output_dir, prefix, vocabulary):
+    """Writes a vocabulary_ dict as sorted terms + their feature indices; returns the manifest entries."""
+    terms = np.array(sorted(vocabulary))
+    term_index = np.array([vocabulary[term] for term in terms.tolist()], dtype=np.int32)
+    np.save(os.path.join(output_dir, f"{prefix}_terms.npy"), terms)
+    np.save(os.path.join(output_dir, f"{prefix}_term_index.npy"), term_index)
+    return {"terms": f"{prefix}_terms.npy", "term_index": f"{prefix}_term_index.npy"}
+
+
+def _count_params(vec, label):
+    params = vec.get_params()
+    if params.get("tokenizer") or params.get("preprocessor") or callable(params.get("analyzer")):
+        raise MLModelError(f"{label} uses a custom callable and cannot be exported")
+    params = {name: params[name] for name in _COUNT_PARAMS + ("norm", "sublinear_tf") if name in params}
+    params["ngram_range"] = list(params["ngram_range"])
+    params["dtype"] = np.dtype(vec.dtype).name
+    return params
+
+
+def _export_lda(output_dir, models_dir):
+    """Exports the LDA topic model and its CountVectorizer, when both pickles are there."""
+    lda_path = os.path.join(models_dir, LDA_MODEL_FILENAME)
+    counter_path = os.path.join(models_dir, LDA_VECTORIZER_FILENAME)
+    if not (os.path.exists(lda_path) and os.path.exists(counter_path)):
+        return None
+    lda, counter = _safe_load(lda_path), _safe_load(counter_path)
+    if not (hasattr(lda, "components_") and hasattr(counter, "vocabulary_")):
+        raise MLModelError(f"{LDA_MODEL_FILENAME} / {LDA_VECTORIZER_FILENAME} are not a fitted LDA and CountVectorizer")
+
+    np.save(os.path.join(output_dir, "lda_components.npy"), np.ascontiguousarray(lda.components_))
+    np.save(os.path.join(output_dir, "lda_exp_dirichlet_component.npy"), np.ascontiguousarray(lda.exp_dirichlet_component_))
+    return {
+        "components": "lda_components.npy",
+        "exp_dirichlet_component": "lda_exp_dirichlet_component.npy",
+        "doc_topic_prior": float(lda.doc_topic_prior_),
+        "topic_word_prior": float(lda.topic_word_prior_),
+        "max_doc_update_iter": lda.max_doc_update_iter,
+        "mean_change_tol": lda.mean_change_tol,
+        "counter": {"params": _count_params(counter, LDA_VECTORIZER_FILENAME), **_save_vocabulary(output_dir, "lda", counter.vocabulary_)},
+    }
+
+
+def export_mapped_artifacts(output_dir=None, models_dir=None):
+    """
+    Writes the Ridge coef_, each TF-IDF idf_ and vocabulary and, when present,
+    the LDA topic model (of the pickles in `models_dir`) as .npy files plus a
+    manifest.json (written last) into `output_dir`. Returns the manifest.
+    """
+    output_dir = output_dir or ML_ARTIFACT_DIR
+    models_dir = models_dir or ML_MODELS_DIR
+    model = _safe_load(os.path.join(models_dir, MODEL_FILENAME))
+    vectorizer = _safe_load(os.path.join(models_dir, VECTORIZER_FILENAME))
+    results_path = os.path.join(models_dir, MODEL_RESULTS_FILENAME)
+    model_results = _safe_load(results_path) if os.path.exists(results_path) else None
+
+    if not (hasattr(model, "coef_") and hasattr(model, "intercept_")):
+        raise MLModelError(f"{MODEL_FILENAME} is not a linear model with coef_ and intercept_")
+    if not isinstance(vectorizer, dict) or not all(hasattr(v, "idf_") for v in vectorizer.values()):
+        raise MLModelError(f"{VECTORIZER_FILENAME} must be a dict of fitted TfidfVectorizers")
+
+    os.makedirs(output_dir, exist_ok=True)
+    np.save(os.path.join(output_dir, "ridge_coef.npy"), np.ascontiguousarray(model.coef_))
+    sources = (MODEL_FILENAME, VECTORIZER_FILENAME, MODEL_RESULTS_FILENAME, LDA_MODEL_FILENAME, LDA_VECTORIZER_FILENAME)
+    stamps = {name: _source_stamp(name, models_dir) for name in sources}
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "model": {"coef": "ridge_coef.npy", "intercept": float(np.ravel(model.intercept_)[0])},
+        "vectorizers": {},
+        "lda": _export_lda(output_dir, models_dir),
+        "model_results": json.loads(json.dumps(model_results, default=_json_number)) if model_results else None,
+        "sources": {name: stamp for name, stamp in stamps.items() if stamp is not None},
+    }
+    for key, vec in vectorizer.items():
+        params = _count_params(vec, f"Vectorizer '{key}'")
+        np.save(os.path.join(output_dir, f"tfidf_{key}_idf.npy"), np.ascontiguousarray(vec.idf_))
+        manifest["vectorizers"][key] = {
+            "idf": f"tfidf_{key}_idf.npy",
+            **_save_vocabulary(output_dir, f"tfidf_{key}", vec.vocabulary_),
+            "params": params,
+        }
+
+    manifest_path = os.path.join(output_dir, MANIFEST_FILENAME)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + ".tmp", manifest_path)
+    return manifest
+
+
+def load_lda(models_dir=None, artifact_dir=None):
+    """
+    The LDA topic model as (count vectorizer, LatentDirichletAllocation): its
+    arrays memory-mapped when the npy manifest has them, else the pickles.
+    Topic inference runs in the calling process (n_jobs=1).
+    """
+    from sklearn.decomposition import LatentDirichletAllocation
+
+    models_dir = models_dir or ML_MODELS_DIR
+    artifact_dir = artifact_dir or ML_ARTIFACT_DIR
+    manifest = load_manifest(models_dir, artifact_dir)
+    if manifest is None or not manifest.get("lda"):
+        counter = _load_pickle(models_dir, LDA_VECTORIZER_FILENAME, "LDA vectorizer")
+        lda = _load_pickle(models_dir, LDA_MODEL_FILENAME, "LDA model")
+        lda.n_jobs = 1
+        return counter, lda
+
+    entry = manifest["lda"]
+    counter = MappedCountVectorizer(entry["counter"]["params"], _load_array(entry["counter"]["terms"], artifact_dir),
+                                    _load_array(entry["counter"]["term_index"], artifact_dir))
+    components = _load_array(entry["components"], artifact_dir)
+    lda = LatentDirichletAllocation(
+        n_components=components.shape[0], max_doc_update_iter=entry["max_doc_update_iter"],
+        mean_change_tol=entry["mean_change_tol"], n_jobs=1,
+    )
+    lda.components_ = components
+    lda.exp_dirichlet_component_ = _load_array(entry["exp_dirichlet_component"], artifact_dir)
+    lda.doc_topic_prior_ = entry["doc_topic_prior"]
+    lda.topic_word_prior_ = entry["topic_word_prior"]
+    lda.n_features_in_ = components.shape[1]
+    return counter, lda
+
+
+def _load_pickle(directory, filename, label):
+    path = os.path.join(directory, filename)
+    try:
+        obj = _safe_load(path)
+    except (FileNotFoundError, MLModelError) as e:
         logger.error(e)
         raise
+    logger.info("Loaded %s from %s", label, path)
+    return obj
 
 
-@lru_cache(maxsize=1)
-def load_model_results():
-    """Optional: load model_results if you have RMSE or other metrics saved."""
-    path = os.path.join(ML_MODELS_DIR, MODEL_RESULTS_FILENAME)
+def _load_model_results(directory):
+    """Optional: model_results, if you have RMSE or other metrics saved next to the model."""
+    path = os.path.join(directory, MODEL_RESULTS_FILENAME)
     if not os.path.exists(path):
         return None
     try:
@@ -105,18 +422,32 @@ def _text_from_inputs(title: str, abstract: str, keywords: str) -> str:
     return " ".join(parts)
 
 
-def _transform_text_to_features(vectorizer, title, abstract, keywords):
+def _field_texts(key, titles, abstracts, keywords):
+    """The input column a sub-vectorizer named `key` was trained on."""
+    if key.lower().startswith("title"):
+        return [t or "" for t in titles]
+    if key.lower().startswith("abstract"):
+        return [a or "" for a in abstracts]
+    if key.lower().startswith("keyword") or key.lower().startswith("key"):
+        return [k or "" for k in keywords]
+    # fallback: combined
+    return [_text_from_inputs(t, a, k) for t, a, k in zip(titles, abstracts, keywords)]
+
+
+def _transform_text_to_features(vectorizer, titles, abstracts, keywords):
     """
+    Vectorize a batch of documents in one call per vectorizer.
+
     Support two vectorizer shapes:
-    - single sklearn vectorizer/pipeline: call .transform([text])
+    - single sklearn vectorizer/pipeline: call .transform(texts)
     - dict of vectorizers: {'title': vec_t, 'abstract': vec_a, 'keywords': vec_k}
-      -> transform separately and hstack (requires scipy)
+      -> transform each column separately and hstack (requires scipy)
     """
     # Case 1: single vectorizer/pipeline
     if not isinstance(vectorizer, dict):
-        text = _text_from_inputs(title, abstract, keywords)
+        texts = [_text_from_inputs(t, a, k) for t, a, k in zip(titles, abstracts, keywords)]
         try:
-            X = vectorizer.transform([text])
+            X = vectorizer.transform(texts)
         except Exception as e:
             logger.error("Vectorizer transform failed: %s", e)
             raise MLModelError(f"Vectorizer transform failed: {e}")
@@ -127,19 +458,10 @@ def _transform_text_to_features(vectorizer, title, abstract, keywords):
     features = []
     for key in sorted(vectorizer.keys()):  # deterministic order
         vec = vectorizer[key]
-        raw = ""
-        if key.lower().startswith("title"):
-            raw = title or ""
-        elif key.lower().startswith("abstract"):
-            raw = abstract or ""
-        elif key.lower().startswith("keyword") or key.lower().startswith("key"):
-            raw = keywords or ""
-        else:
-            # fallback: combined
-            raw = _text_from_inputs(title, abstract, keywords)
+        raw = _field_texts(key, titles, abstracts, keywords)
 
         try:
-            part = vec.transform([raw])
+            part = vec.transform(raw)
         except Exception as e:
             logger.error("Transform failed for sub-vectorizer '%s': %s", key, e)
             raise MLModelError(f"Transform failed for '{key}': {e}")
@@ -151,165 +473,688 @@ def _transform_text_to_features(vectorizer, title, abstract, keywords):
         raise MLModelError("scipy.sparse.hstack not available; install scipy to combine vectorizers")
 
     try:
-        X = hstack(features)
+        X = hstack(features, format="csr")
         return X
     except Exception as e:
         logger.error("Failed to hstack vectorized features: %s", e)
         raise MLModelError(f"Failed to combine vectorized features: {e}")
 
 
-def predict_from_text(title: str, abstract: str, keywords: str, numerical_features: np.ndarray = None):
+def _numerical_block(rows):
     """
-    Returns dict: {
-      'raw_prediction': float,
-      'predicted': int,
-      'ci_low': float|None,
-      'ci_high': float|None
-    }
-    `numerical_features`: Optional 1D numpy array of numerical features.
+    Stack the per-record numerical feature vectors into one 2D array.
+
+    Returns None when no record carries numerical features. Records without
+    them get a zero row, which is what the single-record path did by padding.
     """
-    # Basic validation
-    if not (title or abstract):
-        raise ValueError("At least one of title or abstract must be provided for prediction")
-
-    model = load_model()
-    vectorizer = load_vectorizer()
-    model_results = load_model_results()
-
-    # Transform text to feature vector
-    X_text = _transform_text_to_features(vectorizer, title, abstract, keywords)
-
-    # Combine with numerical features if they are provided
-    if numerical_features is not None:
-        if hstack is None or csr_matrix is None:
-            raise MLModelError("scipy is required to combine text and numerical features.")
-        
-        # Ensure numerical_features is a 2D array for hstack
-        if numerical_features.ndim == 1:
-            numerical_features = numerical_features.reshape(1, -1)
-        
-        X_numerical = csr_matrix(numerical_features)
-        # FIX: The hstack order must match the training order.
-        # Training order was: hstack([X_numerical_sparse, X_tfidf])
-        X = hstack([X_numerical, X_text])
-    else:
-        X = X_text
+    if all(row is None for row in rows):
+        return None
 
-    # Now, handle potential mismatches between the generated features and what the model expects.
-    # This is a fallback for when `numerical_features` are not provided, or vectorizer versions differ.
-    try:
-        expected_features = model.n_features_in_
-        current_features = X.shape[1]
-
-        if current_features != expected_features:
-            warning_message = (
-                f"Feature mismatch detected. Input has {current_features} features, but model expects {expected_features}. "
-                "This may be due to missing numerical features or a scikit-learn version mismatch. "
-                "Attempting to fix shape, but this can affect prediction accuracy."
-            )
-            logger.warning(warning_message)
-            
-            if current_features < expected_features:
-                # Pad with zeros if features are missing
-                if hstack is None or csr_matrix is None:
-                    raise MLModelError("scipy is required to fix feature mismatch but is not installed.")
-                
-                missing_features_count = expected_features - current_features
-                padding = csr_matrix((X.shape[0], missing_features_count), dtype=X.dtype)
-                
-                # If numerical features were not provided, they are the missing ones and should be at the start.
-                # The training pipeline combines features as [numerical, text].
-                if numerical_features is None and missing_features_count > 0:
-                    X = hstack([padding, X])
-                    logger.info("Prepended %d zero-features for missing numerical features.", missing_features_count)
-                else:
-                    # Otherwise, something else is missing, pad at the end as a fallback.
-                    X = hstack([X, padding])
-                    logger.info("Appended %d zero-features to match model input.", missing_features_count)
-            else:
-                # Truncate if there are too many features
-                X = X[:, :expected_features]
-                logger.info("Truncated input features to %d.", expected_features)
-
-    except AttributeError:
-        # This handles older sklearn models that might not have `n_features_in_`
-        logger.warning("Could not verify feature count; model does not have 'n_features_in_' attribute.")
-
-    # Predict (ensure we return a scalar)
+    widths = {np.asarray(row).size for row in rows if row is not None}
+    if len(widths) != 1:
+        raise MLModelError(f"Numerical feature rows have inconsistent widths: {sorted(widths)}")
+    width = widths.pop()
+
+    block = np.zeros((len(rows), width), dtype=np.float32)
+    for i, row in enumerate(rows):
+        if row is not None:
+            block[i] = np.asarray(row, dtype=np.float32).ravel()
+    return block
+
+
+# ----------------- Compiled Ridge engine -----------------
+class CompiledRidgeEngine:
+    """
+    Ridge over [numerical features, TF-IDF blocks] scored without building
+    sparse matrices. For each vocabulary term the weight idf * coef is
+    precomputed at load time; a document then only needs its token counts:
+
+        block score = sum(tf * idf * coef) / norm(tf * idf)
+
+    which is what transform -> hstack -> predict computes for that block.
+    Works with fitted TfidfVectorizers and MappedTfidfVectorizers alike.
+    """
+
+    def __init__(self, model, vectorizer):
+        if not isinstance(vectorizer, dict):
+            raise MLModelError("Compiled engine needs a dict of TF-IDF vectorizers")
+        if not (hasattr(model, "coef_") and hasattr(model, "intercept_")):
+            raise MLModelError("Compiled engine needs a linear model with coef_ and intercept_")
+        coef = np.asarray(model.coef_, dtype=np.float64).reshape(-1)
+        self.intercept = float(np.ravel(model.intercept_)[0])
+
+        vectorizers = [(key, vectorizer[key]) for key in sorted(vectorizer.keys())]  # same order as the hstack
+        text_width = sum(_vectorizer_width(vec) or 0 for _, vec in vectorizers)
+        self.numerical_width = coef.size - text_width
+        if self.numerical_width < 0:
+            raise MLModelError(f"Model has {coef.size} features, the vectorizers produce {text_width}")
+        self.numerical_coef = coef[:self.numerical_width]
+
+        self.blocks = []
+        offset = self.numerical_width
+        for key, vec in vectorizers:
+            if not hasattr(vec, "idf_") or vec.norm not in ("l1", "l2", None):
+                raise MLModelError(f"Vectorizer '{key}' is not a TF-IDF vectorizer the compiled engine supports")
+            idf = np.asarray(vec.idf_, dtype=np.float64)
+            weights = idf * coef[offset:offset + idf.size]
+            offset += idf.size
+            # A per-process dict even for mapped artifacts: the per-token lookup is the engine's hot path
+            table = {term: (float(weights[index]), float(idf[index])) for term, index in _vocabulary_items(vec)}
+            self.blocks.append((key, vec.build_analyzer(), table, vec.norm, vec.sublinear_tf, vec.binary))
+
+    def accepts(self, numerical_rows):
+        """Numerical rows must be missing (zero-padded) or exactly as wide as the model's numerical block."""
+        return all(row is None or np.asarray(row).size == self.numerical_width for row in numerical_rows)
+
+    @staticmethod
+    def _block_score(tokens, table, norm, sublinear_tf, binary):
+        dot = scale = 0.0
+        for token, count in Counter(tokens).items():
+            entry = table.get(token)
+            if entry is None:
+                continue
+            weight, idf = entry
+            tf = 1.0 if binary else (1.0 + math.log(count) if sublinear_tf else float(count))
+            dot += tf * weight
+            if norm == "l2":
+                scale += (tf * idf) ** 2
+            elif norm == "l1":
+                scale += abs(tf * idf)
+        if norm is None:
+            return dot
+        scale = math.sqrt(scale) if norm == "l2" else scale
+        return dot / scale if scale else 0.0
+
+    def predict_log(self, titles, abstracts, keywords, numerical_rows):
+        scores = np.full(len(titles), self.intercept)
+        for key, analyzer, table, norm, sublinear_tf, binary in self.blocks:
+            for i, text in enumerate(_field_texts(key, titles, abstracts, keywords)):
+                scores[i] += self._block_score(analyzer(text), table, norm, sublinear_tf, binary)
+        for i, row in enumerate(numerical_rows):
+            if row is not None and self.numerical_width:
+                scores[i] += float(np.asarray(row, dtype=np.float64).ravel() @ self.numerical_coef)
+        return scores
+
+
+def _compile_engine(model, vectorizer):
+    """The CompiledRidgeEngine for a set of artifacts, or None to use the sklearn path."""
+    if ML_INFERENCE_ENGINE != "compiled":
+        return None
     try:
-        raw_pred_log = model.predict(X)
-    except Exception as e:
-        logger.exception("Prediction failed: %s", e)
-        raise MLModelError(f"Prediction failed: {e}")
+        start = time.perf_counter()
+        engine = CompiledRidgeEngine(model, vectorizer)
+    except MLModelError as e:
+        logger.warning("Compiled Ridge engine unavailable, using sklearn: %s", e)
+        return None
+    logger.info("Compiled Ridge engine built in %.0f ms", (time.perf_counter() - start) * 1000)
+    return engine
+
+
+def _rmse_from_results(model_results):
+    """Dig the (log-scale) RMSE out of model_results, or return None."""
+    if not isinstance(model_results, dict):
+        return None
+
+    # Check for nested structure like {'ridge': {'test_mse': ...}}
+    for model_name, metrics in model_results.items():
+        if isinstance(metrics, dict) and 'test_mse' in metrics:
+            try:
+                return float(np.sqrt(float(metrics['test_mse'])))
+            except (ValueError, TypeError):
+                continue
+
+    # Fallback to top-level keys if not found in nested dict
+    for key in ("rmse", "RMSE", "test_rmse"):
+        if key in model_results:
+            try:
+                return float(model_results[key])
+            except (ValueError, TypeError):
+                continue
+    return None
+
 
-    # raw_pred might be array-like; get first element
+def _vocabulary_items(vec):
+    if isinstance(vec, MappedTfidfVectorizer):
+        return vec.counter.items()
+    return vec.vocabulary_.items()
+
+
+def _vectorizer_width(vec):
+    """Number of columns a fitted vectorizer produces, or None if it cannot be told without transforming."""
+    if isinstance(vec, MappedTfidfVectorizer):
+        return len(vec.counter)
+    if hasattr(vec, "vocabulary_"):
+        return len(vec.vocabulary_)
     try:
-        pred_val_log = float(raw_pred_log[0])
+        return len(vec.get_feature_names_out())
     except Exception:
+        return None
+
+
+class LoadedRidgeModel:
+    """
+    The loaded Ridge artifacts plus everything about them that does not change
+    between requests, worked out once:
+
+    - the column layout the model was trained on: [numerical block, text blocks
+      in sorted key order]. Without numerical features the text starts at
+      `text_offset`, leaving the numerical columns zero (the old left padding);
+      columns past `n_features` are dropped (the old truncation)
+    - the log-scale RMSE from model_results and the 95% CI margin
+    - the compiled engine, when enabled
+    - the registry version the artifacts came from
+
+    Instances are never modified; a reload builds a new one and swaps it in.
+    """
+
+    def __init__(self, model, vectorizer, model_results, engine=None, version=UNVERSIONED):
+        if csr_matrix is None:
+            raise MLModelError("scipy is required to build the Ridge feature matrix.")
+        self.model = model
+        self.vectorizer = vectorizer
+        self.model_results = model_results
+        self.engine = engine
+        self.version = version
+
+        if isinstance(vectorizer, dict):
+            self.text_blocks = [(key, _vectorizer_width(vectorizer[key])) for key in sorted(vectorizer.keys())]
+        else:
+            self.text_blocks = [(None, _vectorizer_width(vectorizer))]
+        widths = [width for _, width in self.text_blocks]
+        self.text_width = None if None in widths else sum(widths)
+
+        self.n_features = getattr(model, "n_features_in_", None)
+        if self.n_features is None:
+            logger.warning("Could not verify feature count; model does not have 'n_features_in_' attribute.")
+        if self.n_features is None or self.text_width is None:
+            self.numerical_width = None
+        else:
+            self.numerical_width = max(self.n_features - self.text_width, 0)
+            if self.text_width > self.n_features:
+                logger.warning(
+                    "Vectorizers produce %d features but the model expects %d; extra columns will be dropped.",
+                    self.text_width, self.n_features,
+                )
+
+        self.rmse = _rmse_from_results(model_results) if model_results else None
+        # RMSE is on the log-transformed scale; the CI is taken there, then transformed back.
+        self.ci_margin = 1.96 * self.rmse if self.rmse is not None else None  # 95% CI
+
+    def _text_parts(self, titles, abstracts, keywords):
+        if self.text_blocks[0][0] is None:
+            return [_transform_text_to_features(self.vectorizer, titles, abstracts, keywords)]
+        parts = []
+        for key, _ in self.text_blocks:
+            try:
+                parts.append(self.vectorizer[key].transform(_field_texts(key, titles, abstracts, keywords)))
+            except Exception as e:
+                logger.error("Transform failed for sub-vectorizer '%s': %s", key, e)
+                raise MLModelError(f"Transform failed for '{key}': {e}")
+        return parts
+
+    def feature_matrix(self, titles, abstracts, keywords, numerical_rows):
+        """
+        The CSR input for model.predict. The row pointers come from the blocks'
+        per-row entry counts, so indices/data are allocated once at their final
+        size and every block is written straight into its slots (no COO, no
+        hstack, no padding matrices, no sort).
+        """
+        parts = self._text_parts(titles, abstracts, keywords)
+        numerical = _numerical_block(numerical_rows)
+        text_width = sum(part.shape[1] for part in parts)
+
+        if numerical is not None:
+            offset = numerical.shape[1]
+            if offset != self.numerical_width:
+                logger.debug("Numerical features have %d columns, layout expects %s", offset, self.numerical_width)
+        elif self.numerical_width is not None:
+            offset = self.numerical_width
+        else:
+            offset = max((self.n_features or text_width) - text_width, 0)
+        width = self.n_features or offset + text_width
+        n_rows = len(titles)
+
+        # Columns past the model's width are dropped (the old truncation)
+        blocks = []
+        counts = np.zeros(n_rows, dtype=np.int64)
+        if numerical is not None:
+            numerical = numerical[:, :width]
+            counts += numerical.shape[1]
+        for part in parts:
+            if offset >= width:
+                break
+            part = part.tocsr()
+            if offset + part.shape[1] > width:
+                part = part[:, :width - offset]
+            blocks.append((part, offset))
+            counts += np.diff(part.indptr)
+            offset += part.shape[1]
+
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        dtypes = [part.dtype for part, _ in blocks] + ([numerical.dtype] if numerical is not None else [])
+        indices = np.empty(indptr[-1], dtype=np.int32)
+        data = np.empty(indptr[-1], dtype=np.result_type(*dtypes) if dtypes else np.float64)
+
+        cursor = indptr[:-1].copy()  # next free slot of each row
+        if numerical is not None and numerical.shape[1]:
+            columns = np.arange(numerical.shape[1])
+            slots = cursor[:, None] + columns
+            indices[slots] = columns
+            data[slots] = numerical
+            cursor += numerical.shape[1]
+        for part, column in blocks:
+            row_counts = np.diff(part.indptr)
+            slots = np.repeat(cursor - part.indptr[:-1], row_counts) + np.arange(part.nnz)
+            indices[slots] = part.indices + column
+            data[slots] = part.data
+            cursor += row_counts
+        return csr_matrix((data, indices, indptr), shape=(n_rows, width))
+
+    def predict_log(self, titles, abstracts, keywords, numerical_rows):
+        """Log-scale predictions, through the compiled engine when it accepts the rows."""
+        if self.engine is not None and self.engine.accepts(numerical_rows):
+            return self.engine.predict_log(titles, abstracts, keywords, numerical_rows)
+
+        X = self.feature_matrix(titles, abstracts, keywords, numerical_rows)
         try:
-            pred_val_log = float(raw_pred_log)
+            raw_pred_log = self.model.predict(X)
         except Exception as e:
+            logger.exception("Prediction failed: %s", e)
+            raise MLModelError(f"Prediction failed: {e}")
+
+        try:
+            pred_log = np.asarray(raw_pred_log, dtype=np.float64).reshape(-1)
+        except (TypeError, ValueError) as e:
             logger.error("Unexpected prediction output: %s", e)
             raise MLModelError("Unexpected model prediction output")
+        if pred_log.shape[0] != len(titles):
+            logger.error("Model returned %d predictions for %d records", pred_log.shape[0], len(titles))
+            raise MLModelError("Unexpected model prediction output")
+        return pred_log
 
-    # --- FIX for potential overflow ---
-    # Cap the log-scale prediction to prevent np.expm1 from overflowing.
-    # A value of 15 corresponds to ~3.2 million citations, a safe upper bound.
-    LOG_PRED_CAP = 15.0
-    if pred_val_log > LOG_PRED_CAP:
-        logger.warning(f"Log-scale prediction {pred_val_log:.2f} is very large. Capping at {LOG_PRED_CAP}.")
-        pred_val_log = LOG_PRED_CAP
 
+# ----------------- Model registry -----------------
+def version_dir(version):
+    if not _VERSION_NAME.fullmatch(version or ""):
+        raise MLModelError(f"Invalid model version name: {version!r}")
+    # CURRENT.<pid>.tmp is the pointer's staging file
+    if version.casefold() in _RESERVED_NAMES or version.casefold().startswith(CURRENT_FILENAME.casefold() + "."):
+        raise MLModelError(f"Model version name {version!r} is reserved")
+    return os.path.join(ML_REGISTRY_DIR, version)
+
+
+def _pointer_path():
+    return os.path.join(ML_REGISTRY_DIR, CURRENT_FILENAME)
+
+
+def _pointer_stamp():
+    """Identity of the CURRENT file; os.replace gives it a new inode, so every switch changes it."""
+    try:
+        st = os.stat(_pointer_path())
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def current_version():
+    """The version CURRENT points to, or None to use the fixed-name files in ML_MODELS_DIR."""
+    try:
+        with open(_pointer_path()) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def read_version_manifest(version):
+    path = os.path.join(version_dir(version), VERSION_MANIFEST)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Model version not found: {version} ({path})")
+    except (OSError, ValueError) as e:
+        raise MLModelError(f"Failed to read {path}: {e}")
+
+
+def _verify_version(version):
+    """The version's manifest, after checking its files still hash to what was published."""
+    manifest = read_version_manifest(version)
+    for filename, digest in manifest.get("files", {}).items():
+        if _source_stamp(filename, version_dir(version)) != digest:
+            raise MLModelError(f"{filename} of model version {version} does not match its manifest")
+    return manifest
+
+
+def list_versions():
+    """Manifests of all published versions, oldest first."""
+    if not os.path.isdir(ML_REGISTRY_DIR):
+        return []
+    manifests = [
+        read_version_manifest(name) for name in os.listdir(ML_REGISTRY_DIR)
+        if _VERSION_NAME.fullmatch(name) and name.casefold() not in _RESERVED_NAMES and os.path.isfile(os.path.join(ML_REGISTRY_DIR, name, VERSION_MANIFEST))
+    ]
+    return sorted(manifests, key=lambda manifest: (manifest.get("created_at", ""), manifest["version"]))
+
+
+def _build_ridge_model(directory, artifact_dir, version):
+    manifest = load_manifest(directory, artifact_dir)
+    if manifest is not None:
+        model = _load_mapped_model(manifest, artifact_dir)
+        vectorizer = _load_mapped_vectorizers(manifest, artifact_dir)
+        model_results = manifest["model_results"]
+    else:
+        model = _load_pickle(directory, MODEL_FILENAME, "model")
+        vectorizer = _load_pickle(directory, VECTORIZER_FILENAME, "vectorizer")
+        model_results = _load_model_results(directory)
+    return LoadedRidgeModel(model, vectorizer, model_results, engine=_compile_engine(model, vectorizer), version=version)
+
+
+def _load_version(version):
+    """LoadedRidgeModel for a registry version, or for the fixed-name files when version is None."""
+    if version is None:
+        return _build_ridge_model(ML_MODELS_DIR, ML_ARTIFACT_DIR, UNVERSIONED)
+    _verify_version(version)
+    directory = version_dir(version)
+    return _build_ridge_model(directory, os.path.join(directory, NPY_DIRNAME), version)
+
+
+def publish_version(source_dir=None, version=None, notes="", npy=False):
+    """
+    Copies the model, vectorizer and model_results pickles from `source_dir`
+    into a new registry version, optionally with npy artifacts, and writes
+    its version.json. The version is checked by loading it and scoring a
+    dummy paper. It is assembled under a temporary name and renamed into
+    place, so a version directory is either complete or absent.
+
+    Does not activate the version (see activate_version). Returns the manifest.
+    """
+    source_dir = source_dir or ML_MODELS_DIR
+    version = version or timezone.now().strftime("%Y%m%d-%H%M%S")
+    target = version_dir(version)
+    if os.path.exists(target):
+        raise MLModelError(f"Model version {version} already exists")
+
+    os.makedirs(ML_REGISTRY_DIR, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=f".{version}-", dir=ML_REGISTRY_DIR)
+    try:
+        os.chmod(staging, 0o755)
+        files = {}
+        for filename in (MODEL_FILENAME, VECTORIZER_FILENAME, MODEL_RESULTS_FILENAME):
+            path = os.path.join(source_dir, filename)
+            if not os.path.exists(path):
+                if filename == MODEL_RESULTS_FILENAME:
+                    continue
+                raise FileNotFoundError(f"Model file not found: {path}")
+            shutil.copy2(path, staging)
+            files[filename] = _source_stamp(filename, staging)
+        if npy:
+            export_mapped_artifacts(os.path.join(staging, NPY_DIRNAME), models_dir=staging)
+
+        loaded = _build_ridge_model(staging, os.path.join(staging, NPY_DIRNAME), version)
+        loaded.predict_log(["Registry check"], ["A dummy abstract used to check the published model."], [""], [None])
+
+        manifest = {
+            "version": version,
+            "created_at": timezone.now().isoformat(),
+            "source": os.path.abspath(source_dir),
+            "notes": notes,
+            "files": files,
+            "npy": npy,
+            "n_features": loaded.n_features,
+            "rmse": loaded.rmse,
+        }
+        with open(os.path.join(staging, VERSION_MANIFEST), "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.rename(staging, target)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    logger.info("Published model version %s to %s", version, target)
+    return manifest
+
+
+def activate_version(version):
+    """
+    Points CURRENT at `version` with an atomic os.replace. Running workers
+    notice the change on their next check and swap the model in.
+    """
+    manifest = _verify_version(version)
+    path = _pointer_path()
+    staging = f"{path}.{os.getpid()}.tmp"
+    with open(staging, "w") as f:
+        f.write(version + "\n")
+    os.replace(staging, path)
+    logger.info("Activated model version %s", version)
+    return manifest
+
+
+# ----------------- Hot reload -----------------
+# The serving model is swapped by rebinding _active_model, never mutated:
+# a request that already fetched it keeps using it to the end, and the
+# prediction path takes no lock once a model is loaded.
+_active_model = None
+_active_stamp = None  # _pointer_stamp() the active model was chosen under
+_next_check = 0.0
+_swap_lock = threading.Lock()  # one load at a time
+
+
+def reload_models():
+    """
+    Loads the version CURRENT points to, if it is not the one being served,
+    and swaps it in. Returns the serving LoadedRidgeModel. When the new
+    version cannot be loaded this raises and the old model stays in service.
+    """
+    global _active_model, _active_stamp
+    with _swap_lock:
+        stamp = _pointer_stamp()
+        if _active_model is not None and stamp == _active_stamp:
+            return _active_model
+        version = current_version()
+        if _active_model is not None and (version or UNVERSIONED) == _active_model.version:
+            _active_stamp = stamp
+            return _active_model
+
+        start = time.perf_counter()
+        try:
+            loaded = _load_version(version)
+        finally:
+            # A broken pointer is reported once, not on every check
+            _active_stamp = stamp
+        previous = _active_model
+        _active_model = loaded
+    logger.info(
+        "Serving Ridge model version %s (was %s), loaded in %.0f ms",
+        loaded.version, previous.version if previous else "none", (time.perf_counter() - start) * 1000,
+    )
+    return loaded
+
+
+def _reload_in_background():
+    try:
+        reload_models()
+    except Exception:
+        logger.exception("Model reload failed; still serving version %s", getattr(_active_model, "version", None))
+
+
+def schedule_reload():
+    """Runs reload_models() in a daemon thread, so no request waits for the new model to load."""
+    thread = threading.Thread(target=_reload_in_background, name="ml-model-reload", daemon=True)
+    thread.start()
+    return thread
+
+
+def _check_pointer():
+    global _next_check
+    if ML_RELOAD_INTERVAL <= 0:
+        return
+    now = time.monotonic()
+    if now < _next_check:
+        return
+    _next_check = now + ML_RELOAD_INTERVAL
+    if _pointer_stamp() != _active_stamp:
+        schedule_reload()
+
+
+def load_ridge_model():
+    """
+    The LoadedRidgeModel serving predictions, loaded on first use. After that,
+    a switch of CURRENT noticed here (polled at most every ML_RELOAD_INTERVAL
+    seconds) is loaded in the background while this and other requests keep
+    the model they have.
+    """
+    loaded = _active_model
+    if loaded is None:
+        return reload_models()
+    _check_pointer()
+    return loaded
+
+
+def unload_ridge_model():
+    """Drops the serving model (tests, benchmarks); the next prediction loads it again."""
+    global _active_model, _active_stamp, _next_check
+    with _swap_lock:
+        _active_model = _active_stamp = None
+        _next_check = 0.0
+
+
+def load_model():
+    return load_ridge_model().model
+
+
+def load_vectorizer():
+    return load_ridge_model().vectorizer
+
+
+def load_model_results():
+    return load_ridge_model().model_results
+
+
+def load_compiled_engine():
+    """The serving model's CompiledRidgeEngine, or None when it uses the sklearn path."""
+    return load_ridge_model().engine
+
+
+# Cap the log-scale prediction to prevent np.expm1 from overflowing.
+# A value of 15 corresponds to ~3.2 million citations, a safe upper bound.
+LOG_PRED_CAP = 15.0
+
+
+def predict_many(records):
+    """
+    Score a batch of papers with one vectorizer pass and one model.predict call.
+
+    `records`: iterable of dicts with 'title', 'abstract', 'keywords' and an
+    optional 'numerical_features' 1D array (same layout as predict_from_text).
+
+    Returns a list of dicts in input order, each shaped like predict_from_text's result.
+    """
+    records = list(records)
+    if not records:
+        return []
+
+    titles, abstracts, keywords, numerical_rows = [], [], [], []
+    for i, rec in enumerate(records):
+        title = rec.get("title")
+        abstract = rec.get("abstract")
+        # Basic validation
+        if not (title or abstract):
+            raise ValueError(f"At least one of title or abstract must be provided for prediction (record {i})")
+        titles.append(title)
+        abstracts.append(abstract)
+        keywords.append(rec.get("keywords"))
+        numerical_rows.append(rec.get("numerical_features"))
+
+    loaded = load_ridge_model()
+    pred_log = loaded.predict_log(titles, abstracts, keywords, numerical_rows)
+
+    # --- FIX for potential overflow ---
+    capped = pred_log > LOG_PRED_CAP
+    if capped.any():
+        logger.warning("%d log-scale prediction(s) above %.1f were capped.", int(capped.sum()), LOG_PRED_CAP)
+        pred_log = np.minimum(pred_log, LOG_PRED_CAP)
 
     # The model was trained on log1p(citations), so we must apply the
     # inverse transformation (expm1) to get the actual citation count.
-    pred_val = np.expm1(pred_val_log)
+    pred_vals = np.expm1(pred_log)
 
     # Post-process: ensure non-negative integer for citation count
-    predicted_int = max(0, int(round(pred_val)))
+    predicted_ints = np.maximum(0, np.rint(pred_vals)).astype(np.int64)
 
     # Compute simple CI if rmse present in model_results
-    ci_low = None
-    ci_high = None
-
-    if model_results:
-        rmse = None
-        if isinstance(model_results, dict):
-            # Check for nested structure like {'ridge': {'test_mse': ...}}
-            for model_name, metrics in model_results.items():
-                if isinstance(metrics, dict) and 'test_mse' in metrics:
-                    try:
-                        rmse = np.sqrt(float(metrics['test_mse']))
-                        break
-                    except (ValueError, TypeError):
-                        continue
-            
-            # Fallback to top-level keys if not found in nested dict
-            if rmse is None:
-                for key in ("rmse", "RMSE", "test_rmse"):
-                    if key in model_results:
-                        try:
-                            rmse = float(model_results[key])
-                            break
-                        except (ValueError, TypeError):
-                            continue
-
-        if rmse is not None:
-            # RMSE is on the log-transformed scale.
-            # Calculate CI on log scale, then transform the bounds back.
-            margin = 1.96 * rmse  # 95% CI
-            ci_low_log = pred_val_log - margin
-            ci_high_log = pred_val_log + margin
-            
-            ci_low = np.expm1(ci_low_log)
-            ci_high = np.expm1(ci_high_log)
-            
-            # FIX: Clip the lower bound at 0, as negative citations are not possible.
-            ci_low = max(0.0, ci_low)
+    margin = loaded.ci_margin
+    if margin is not None:
+        # Clip the lower bound at 0, as negative citations are not possible.
+        ci_lows = np.maximum(0.0, np.expm1(pred_log - margin))
+        ci_highs = np.expm1(pred_log + margin)
+    else:
+        ci_lows = ci_highs = None
 
-    return {
-        "raw_prediction": pred_val,
-        "predicted": predicted_int,
-        "ci_low": ci_low,
-        "ci_high": ci_high,
+    results = []
+    for i in range(len(records)):
+        results.append({
+            "raw_prediction": float(pred_vals[i]),
+            "predicted": int(predicted_ints[i]),
+            "ci_low": float(ci_lows[i]) if ci_lows is not None else None,
+            "ci_high": float(ci_highs[i]) if ci_highs is not None else None,
+            "model_version": loaded.version,
+        })
+    return results
+
+
+def predict_from_text(title: str, abstract: str, keywords: str, numerical_features: np.ndarray = None):
+    """
+    Returns dict: {
+      'raw_prediction': float,
+      'predicted': int,
+      'ci_low': float|None,
+      'ci_high': float|None,
+      'model_version': str
     }
+    `numerical_features`: Optional 1D numpy array of numerical features.
+
+    Thin wrapper around predict_many() for a single paper.
+    """
+    return predict_many([{
+        "title": title,
+        "abstract": abstract,
+        "keywords": keywords,
+        "numerical_features": numerical_features,
+    }])[0]
+
+
+def warm_up():
+    """
+    Loads the serving model (see load_ridge_model) and runs one dummy prediction,
+    so the first real request of a worker does not pay for unpickling.
+
+    Returns {step: seconds}. Raises ImproperlyConfigured when an artifact is
+    missing or unreadable, so a misdeployed worker fails at boot.
+    """
+    timings = {}
+    start = time.perf_counter()
+    try:
+        loaded = load_ridge_model()
+    except (FileNotFoundError, MLModelError) as e:
+        raise ImproperlyConfigured(f"ML warm-up could not load the model: {e}") from e
+    timings["load"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    try:
+        predict_from_text("Warm-up paper", "A dummy abstract used to prime the prediction path.", "warm up")
+    except (ValueError, MLModelError) as e:
+        raise ImproperlyConfigured(f"ML warm-up prediction failed: {e}") from e
+    timings["prediction"] = time.perf_counter() - start
+
+    logger.info(
+        "ML model version %s warmed up in %.0f ms (%s)",
+        loaded.version, sum(timings.values()) * 1000,
+        ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in timings.items()),
+    )
+    return timings
+
+
+def warm_up_if_enabled():
+    """Entry-point hook: runs warm_up() only when settings.ML_WARMUP_ON_STARTUP is true."""
+    if not getattr(settings, "ML_WARMUP_ON_STARTUP", False):
+        return None
+    return warm_up()
@@ -1,3 +1,4 @@
+import os
 import random
 from django.db import models
 from django.contrib.auth.models import AbstractUser, BaseUserManager
@@ -161,6 +162,8 @@ class WOSRidgePrediction(models.Model):
     predicted_citations = models.IntegerField(help_text="Citations predicted by the Ridge model")
     ci_low = models.FloatField(null=True, blank=True, help_text="Lower bound of the 95% confidence interval")
     ci_high = models.FloatField(null=True, blank=True, help_text="Upper bound of the 95% confidence interval")
+    model_version = models.CharField(max_length=64, blank=True, default="", db_index=True,
+                                     help_text="Model registry version that made the prediction")
     predicted_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
@@ -173,6 +176,59 @@ class WOSRidgePrediction(models.Model):
 
 
 
+class WOSAPIUsage(models.Model):
+    """Per-user, per-day count of requests sent to the Web of Science API."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='wos_api_usage',
+        null=True, blank=True, help_text="Empty for requests made outside a user session (e.g. management commands)"
+    )
+    date = models.DateField(default=timezone.localdate)
+    request_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "WOS API Usage"
+        verbose_name_plural = "WOS API Usage"
+        ordering = ['-date', '-request_count']
+        unique_together = ['user', 'date']
+        constraints = [
+            # NULLs never collide in unique_together, so system rows need their own constraint
+            models.UniqueConstraint(fields=['date'], condition=models.Q(user__isnull=True),
+                                    name='unique_system_wos_api_usage_per_day'),
+        ]
+
+    def __str__(self):
+        who = self.user.email if self.user else "system"
+        return f"{who} | {self.date} | {self.request_count} requests"
+
+
+class SavedResultFile(models.Model):
+    """Catalog entry for a saved WOS search results file under json_data/."""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, related_name='saved_result_files',
+        null=True, blank=True, help_text="Empty when the owner could not be resolved during backfill"
+    )
+    path = models.CharField(max_length=500, unique=True)  # Absolute path to the results file
+    file_format = models.CharField(max_length=10, default='json')
+    size = models.PositiveBigIntegerField(default=0, help_text="File size in bytes")
+    record_count = models.PositiveIntegerField(null=True, blank=True)
+    query = models.CharField(max_length=255, blank=True)
+    search_field = models.CharField(max_length=20, blank=True)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = "Saved Result File"
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['user', '-created_at'])]
+
+    @property
+    def name(self):
+        return os.path.basename(self.path)
+
+    def __str__(self):
+        return f"{self.name} | {self.record_count or 0} records"
+
+
+
 
 @receiver(post_save, sender=CustomUser)
 def create_user_profile(sender, instance, created, **kwargs):
@@ -231,6 +287,12 @@ class ResearchPaper(models.Model):
         max_length=10,
         help_text="File extension (pdf, docx, txt)"
     )
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        default='',
+        help_text="SHA-256 of the uploaded file, used to reuse earlier extraction results"
+    )
 
     # Prediction fields
     predicted_citations = models.IntegerField(
@@ -256,6 +318,7 @@ class ResearchPaper(models.Model):
         indexes = [
             models.Index(fields=['user', 'filename']),
             models.Index(fields=['uploaded_at']),
+            models.Index(fields=['content_hash']),
         ]
     
     def __str__(self):
@@ -278,11 +341,103 @@ class ResearchPaper(models.Model):
         return f"{size:.1f} TB"
 
 
+class DocumentProcessingJob(models.Model):
+    """An uploaded document waiting for (or done with) background text extraction and analysis."""
+    STATUS_PENDING = 'pending'
+    STATUS_PROCESSING = 'processing'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_PROCESSING, 'Processing'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    MODE_FULL = 'full'
+    MODE_KEYWORDS = 'keywords'
+    MODE_CHOICES = [
+        (MODE_FULL, 'Full processing'),
+        (MODE_KEYWORDS, 'Full-text keywords'),
+    ]
+
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='document_jobs')
+    file = models.FileField(upload_to='document_jobs/%Y%m%d/', blank=True, help_text="Stored upload; removed once processed")
+    filename = models.CharField(max_length=255, help_text="Original filename of the uploaded document")
+    file_size = models.PositiveIntegerField(help_text="Size of the original file in bytes")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING, db_index=True)
+    mode = models.CharField(
+        max_length=20, choices=MODE_CHOICES, default=MODE_FULL,
+        help_text="'keywords' jobs only refresh keywords of a paper saved from its front matter"
+    )
+    task_id = models.CharField(max_length=255, blank=True, help_text="Celery task id, when run through Celery")
+    error = models.TextField(blank=True)
+    result = models.JSONField(blank=True, null=True, help_text="Extracted title, abstract, keywords, authors and year")
+    research_paper = models.ForeignKey(
+        ResearchPaper, on_delete=models.SET_NULL, null=True, blank=True, related_name='processing_jobs'
+    )
+    is_updated = models.BooleanField(default=False, help_text="True if an existing paper with this filename was updated")
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Document Processing Job"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.STATUS_DONE, self.STATUS_FAILED)
+
+    def __str__(self):
+        return f"{self.filename} | {self.status}"
+
+
+class DocumentProcessingRun(models.Model):
+    """Stage timings of one pass of a document through the processing pipeline."""
+    SOURCE_UPLOAD = 'upload'
+    SOURCE_JOB = 'job'
+    SOURCE_CHOICES = [
+        (SOURCE_UPLOAD, 'Upload request'),
+        (SOURCE_JOB, 'Background job'),
+    ]
+    OUTCOME_PROCESSED = 'processed'
+    OUTCOME_REUSED = 'reused'
+    OUTCOME_QUEUED = 'queued'
+    OUTCOME_FAILED = 'failed'
+    OUTCOME_CHOICES = [
+        (OUTCOME_PROCESSED, 'Processed'),
+        (OUTCOME_REUSED, 'Reused earlier extraction'),
+        (OUTCOME_QUEUED, 'Queued for background job'),
+        (OUTCOME_FAILED, 'Failed'),
+    ]
+
+    user = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='processing_runs')
+    filename = models.CharField(max_length=255)
+    file_type = models.CharField(max_length=10, db_index=True)
+    file_size = models.PositiveIntegerField(default=0, help_text="Size of the uploaded file in bytes")
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES, default=SOURCE_UPLOAD)
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES, default=OUTCOME_FAILED)
+    page_count = models.PositiveIntegerField(null=True, blank=True, help_text="Pages of a PDF (whole document)")
+    char_count = models.PositiveIntegerField(null=True, blank=True, help_text="Characters of extracted text")
+    stages = models.JSONField(default=dict, help_text="Milliseconds per stage, e.g. {'extract_pdf': 812.4}")
+    total_ms = models.FloatField(help_text="Wall time of the whole pass in milliseconds")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = "Document Processing Run"
+
+    def __str__(self):
+        return f"{self.filename} | {self.outcome} | {self.total_ms:.0f} ms"
+
+
 class ResearchPaperRidgePrediction(models.Model):
     research_paper = models.ForeignKey(ResearchPaper, on_delete=models.CASCADE, related_name='ridge_predictions')
     predicted_citations = models.IntegerField(help_text="Citations predicted by the Ridge model")
     ci_low = models.FloatField(null=True, blank=True, help_text="Lower bound of the 95% confidence interval")
     ci_high = models.FloatField(null=True, blank=True, help_text="Upper bound of the 95% confidence interval")
+    model_version = models.CharField(max_length=64, blank=True, default="", db_index=True,
+                                     help_text="Model registry version that made the prediction")
     predicted_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
@@ -0,0 +1,209 @@
+# project/user/storage_utils.py
+import os
+import json
+import logging
+import datetime
+from bisect import bisect_right
+from itertools import islice
+
+from django.conf import settings
+
+from .models import SavedResultFile
+from .WOS_utils import JSONArrayStream
+
+logger = logging.getLogger(__name__)
+
+# pyarrow is optional at import time; without it results fall back to JSON files.
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# Config: saved WOS search results live under <BASE_DIR>/json_data/<date>/
+RESULTS_DIR = getattr(settings, "WOS_RESULTS_DIR", os.path.join(settings.BASE_DIR, "json_data"))
+RESULTS_FORMAT = getattr(settings, "WOS_RESULTS_FORMAT", "parquet")  # "parquet" or "json"
+PARQUET_COMPRESSION = getattr(settings, "WOS_RESULTS_COMPRESSION", "zstd")
+PARQUET_ROW_GROUP_SIZE = getattr(settings, "WOS_RESULTS_ROW_GROUP_SIZE", 256)
+READ_CHUNK_SIZE = 64 * 1024
+
+RESULT_EXTENSIONS = (".parquet", ".json")
+
+# Column layout of a parsed paper (see WOS_utils._extract_paper).
+PAPER_COLUMNS = (
+    ("title", "string"),
+    ("uid", "string"),
+    ("citations", "int"),
+    ("abstract", "string"),
+    ("keywords", "list"),
+    ("publication_year", "int"),
+    ("pubtype", "string"),
+    ("doi", "string"),
+    ("url", "string"),
+    ("num_references", "int"),
+)
+
+
+def _paper_schema():
+    types = {"string": pa.string(), "int": pa.int64(), "list": pa.list_(pa.string())}
+    return pa.schema([(name, types[kind]) for name, kind in PAPER_COLUMNS])
+
+
+def _coerce(value, kind):
+    if value is None:
+        return None
+    if kind == "int":
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+    if kind == "list":
+        items = value if isinstance(value, list) else [value]
+        return [str(item) for item in items if item is not None]
+    return str(value)
+
+
+def is_results_file(name):
+    return name.endswith(RESULT_EXTENSIONS)
+
+
+def new_results_path(user_id, fmt=None):
+    """json_data/<YYYYMMDD>/records_<user>_<HHMMSS>.<ext> for a fresh search."""
+    fmt = fmt or RESULTS_FORMAT
+    now = datetime.datetime.now()
+    raw_dir = os.path.join(RESULTS_DIR, now.strftime("%Y%m%d"))
+    os.makedirs(raw_dir, exist_ok=True)
+    extension = ".parquet" if fmt == "parquet" else ".json"
+    return os.path.join(raw_dir, f"records_{user_id}_{now.strftime('%H%M%S')}{extension}")
+
+
+def save_search_results(papers, user_id):
+    """
+    Writes parsed papers to a new results file and returns its path.
+    Parquet (zstd, small row groups) when pyarrow is available, else legacy JSON.
+    """
+    fmt = RESULTS_FORMAT if pq is not None else "json"
+    file_path = new_results_path(user_id, fmt)
+
+    if fmt == "parquet":
+        rows = [
+            {name: _coerce(paper.get(name), kind) for name, kind in PAPER_COLUMNS}
+            for paper in papers
+        ]
+        table = pa.Table.from_pylist(rows, schema=_paper_schema())
+        pq.write_table(
+            table, file_path,
+            compression=PARQUET_COMPRESSION,
+            row_group_size=PARQUET_ROW_GROUP_SIZE,
+        )
+    else:
+        with open(file_path, "w", encoding="utf-8") as f:
+            json.dump(papers, f, indent=4, ensure_ascii=False)
+
+    logger.info("Saved %d papers to %s", len(papers), file_path)
+    return file_path
+
+
+def _unwrap_records(records):
+    """Legacy files may wrap the list as {"records"|"REC"|"data": [...]}."""
+    if isinstance(records, dict):
+        for key in ["records", "REC", "data"]:
+            if key in records and isinstance(records[key], list):
+                return records[key]
+    if not isinstance(records, list):
+        raise ValueError("File does not contain a list of records.")
+    return records
+
+
+def _iter_file(file_path):
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(READ_CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _read_json_slice(file_path, offset, limit):
+    """Decodes only records [offset, offset + limit) of a top-level JSON array."""
+    stream = JSONArrayStream(_iter_file(file_path))
+    records = list(islice(stream, offset, offset + limit))
+    if not stream.found:
+        # Wrapped legacy document ({"records": [...]}): parse it whole.
+        records = _unwrap_records(json.loads(stream.header))[offset:offset + limit]
+    return records
+
+
+def _read_parquet(file_path, columns, offset, limit):
+    parquet_file = pq.ParquetFile(file_path)
+    metadata = parquet_file.metadata
+    if columns is not None:
+        available = set(parquet_file.schema_arrow.names)
+        columns = [name for name in columns if name in available]
+
+    total = metadata.num_rows
+    start = min(max(0, offset), total)
+    stop = total if limit is None else min(total, start + max(0, limit))
+    if start >= stop:
+        return []
+
+    # Only decode the row groups that overlap [start, stop).
+    group_starts = []
+    position = 0
+    for i in range(metadata.num_row_groups):
+        group_starts.append(position)
+        position += metadata.row_group(i).num_rows
+    first = bisect_right(group_starts, start) - 1
+    last = bisect_right(group_starts, stop - 1) - 1
+
+    table = parquet_file.read_row_groups(list(range(first, last + 1)), columns=columns)
+    return table.slice(start - group_starts[first], stop - start).to_pylist()
+
+
+def read_search_results(file_path, columns=None, offset=0, limit=None):
+    """
+    Returns saved papers as a list of dicts.
+
+    For Parquet files only the requested `columns` and the row groups covering
+    [offset, offset + limit) are decoded. Legacy JSON files are returned as stored
+    (raw WOS records or parsed papers) and `columns` is ignored; with a `limit`
+    the array is decoded incrementally and reading stops after the slice.
+    """
+    if file_path.endswith(".parquet"):
+        if pq is None:
+            raise ValueError("pyarrow is required to read Parquet result files.")
+        return _read_parquet(file_path, columns, offset, limit)
+
+    offset = max(0, offset)
+    if limit is not None:
+        return _read_json_slice(file_path, offset, max(0, limit))
+    with open(file_path, "r", encoding="utf-8") as f:
+        records = _unwrap_records(json.load(f))
+    return records[offset:]
+
+
+def count_search_results(file_path):
+    """Number of records in a results file (Parquet: from the footer only)."""
+    if file_path.endswith(".parquet"):
+        if pq is None:
+            raise ValueError("pyarrow is required to read Parquet result files.")
+        return pq.ParquetFile(file_path).metadata.num_rows
+    return len(read_search_results(file_path))
+
+
+def register_results_file(file_path, user_id=None, query="", search_field="", record_count=None, created_at=None):
+    """Adds (or refreshes) the SavedResultFile catalog row for a results file."""
+    defaults = {
+        "user_id": user_id,
+        "file_format": "parquet" if file_path.endswith(".parquet") else "json",
+        "size": os.path.getsize(file_path),
+        "record_count": record_count,
+        "query": query or "",
+        "search_field": search_field or "",
+    }
+    if created_at is not None:
+        defaults["created_at"] = created_at
+    entry, _ = SavedResultFile.objects.update_or_create(path=os.path.abspath(file_path), defaults=defaults)
+    return entry
@@ -1,3 +1,648 @@
-from django.test import TestCase
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import WOS_utils, ml_utils, storage_utils, views
+from .management.commands.bench_ridge_engine import synthetic_records
+from .management.commands.bench_wos_parser import edge_case_records, legacy_parse_papers
+from .management.commands.bench_wos_parser import synthetic_record as synthetic_wos_record
+from .models import CustomUser, ResearchPaper, SavedResultFile, WOSAPIUsage
+
+
+class _StubWOSHandler(BaseHTTPRequestHandler):
+    """Replies with the next (status, body, delay) from the server's script."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests.append((self.client_address, self.headers.get("X-ApiKey")))
+            status, body, delay = server.script.pop(0) if server.script else (200, {}, 0)
+        if delay:
+            time.sleep(delay)
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class WOSClientTests(SimpleTestCase):
+    """call_wos_api against a local stub of the Clarivate endpoint."""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubWOSHandler)
+        self.server.lock = threading.Lock()
+        self.server.requests = []
+        self.server.script = []
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/wos"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+        for name, value in (("API_KEY", "test-key"), ("get_rate_limiter", lambda: None),
+                            ("record_api_usage", lambda *args, **kwargs: None)):
+            patcher = mock.patch.object(WOS_utils, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        WOS_utils.reset_session(WOS_utils.build_session(max_retries=2, backoff_factor=0, backoff_jitter=0))
+
+    def tearDown(self):
+        WOS_utils.reset_session()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_retries_server_errors_then_succeeds(self):
+        self.server.script = [(503, {}, 0), (429, {}, 0), (200, {"Data": {"ok": True}}, 0)]
+
+        data = WOS_utils.call_wos_api({"usrQuery": "TS=(x)"}, base_url=self.url)
+
+        self.assertEqual(data, {"Data": {"ok": True}})
+        self.assertEqual(len(self.server.requests), 3)
+        self.assertEqual(self.server.requests[0][1], "test-key")
+
+    def test_retries_wait_for_rate_limit_and_count_as_usage(self):
+        limiter, usage = mock.Mock(), mock.Mock()
+        limiter.acquire.return_value = True
+        self.server.script = [(503, {}, 0), (200, {"Data": {"ok": True}}, 0)]
+
+        with mock.patch.object(WOS_utils, "get_rate_limiter", lambda: limiter), \
+                mock.patch.object(WOS_utils, "record_api_usage", usage):
+            data = WOS_utils.call_wos_api({}, base_url=self.url, user="someone")
+
+        self.assertEqual(data, {"Data": {"ok": True}})
+        self.assertEqual(limiter.acquire.call_count, 2)
+        usage.assert_called_once_with("someone", requests_made=2)
+
+    def test_harvest_counts_retried_pages(self):
+        def page(uid):
+            return {"QueryResult": {"RecordsFound": 2}, "Data": {"Records": {"records": {"REC": [{"UID": uid}]}}}}
+
+        self.server.script = [(503, {}, 0), (200, page("WOS:1"), 0), (200, page("WOS:2"), 0)]
+        usage = mock.Mock()
+
+        with mock.patch.object(WOS_utils, "BASE_URL", self.url), mock.patch.object(WOS_utils, "record_api_usage", usage):
+            papers = list(WOS_utils.harvest_papers_wos("x", "TS", 2, page_size=1, concurrency=1, user="someone"))
+
+        self.assertEqual([p["uid"] for p in papers], ["WOS:1", "WOS:2"])
+        self.assertEqual(usage.call_args_list, [mock.call("someone", 2), mock.call("someone", 1)])
+
+    def test_retry_is_abandoned_when_rate_limit_wait_runs_out(self):
+        limiter = mock.Mock()
+        limiter.acquire.side_effect = [True, False]
+        self.server.script = [(503, {}, 0), (200, {}, 0)]
+
+        with mock.patch.object(WOS_utils, "get_rate_limiter", lambda: limiter):
+            self.assertEqual(WOS_utils.call_wos_api({}, base_url=self.url), {})
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_gives_up_after_max_retries(self):
+        self.server.script = [(500, {}, 0)] * 5
+
+        self.assertEqual(WOS_utils.call_wos_api({}, base_url=self.url), {})
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_reuses_pooled_connection(self):
+        WOS_utils.call_wos_api({}, base_url=self.url)
+        WOS_utils.call_wos_api({}, base_url=self.url)
+
+        first, second = (client for client, _ in self.server.requests)
+        self.assertEqual(first, second)
+
+    def test_streams_records_from_response(self):
+        records = [{"UID": f"WOS:{i}"} for i in range(3)]
+        self.server.script = [(200, {"QueryResult": {"RecordsFound": 42}, "Data": {"Records": {"records": {"REC": records}}}}, 0)]
+
+        stream = WOS_utils.open_wos_stream({}, base_url=self.url, track_usage=False)
+
+        self.assertEqual(list(stream), records)
+        self.assertEqual(stream.records_found, 42)
+
+    def test_reads_records_found_after_data(self):
+        # The API's own order: Data first, QueryResult after the REC array
+        records = [{"UID": f"WOS:{i}"} for i in range(3)]
+        self.server.script = [(200, {"Data": {"Records": {"records": {"REC": records}}}, "QueryResult": {"RecordsFound": 42}}, 0)]
+
+        stream = WOS_utils.open_wos_stream({}, base_url=self.url, track_usage=False)
+
+        self.assertEqual(list(stream), records)
+        self.assertEqual(stream.records_found, 42)
+
+    def test_read_timeout_returns_empty_result(self):
+        WOS_utils.reset_session(WOS_utils.build_session(max_retries=0))
+        self.server.script = [(200, {}, 0.5)]
+
+        with mock.patch.object(WOS_utils, "record_api_usage") as usage:
+            self.assertEqual(WOS_utils.call_wos_api({}, base_url=self.url, timeout=(1, 0.1)), {})
+        usage.assert_not_called()
+
+
+class JSONArrayStreamTests(SimpleTestCase):
+
+    records = [{"UID": "ü-1", "p": ["]", "x\\\"REC\\\": ["]}, 12345, None, {"nested": [[1, 2], {"a": "日本"}]}]
+
+    def _chunked(self, text, size):
+        data = text.encode("utf-8")
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def test_yields_keyed_array_across_any_chunk_boundary(self):
+        document = json.dumps({"QueryResult": {"RecordsFound": 4}, "Data": {"Records": {"records": {"REC": self.records}}}},
+                              ensure_ascii=False)
+        for size in (1, 2, 5, 64, len(document)):
+            stream = WOS_utils.JSONArrayStream(self._chunked(document, size), key="REC")
+            self.assertEqual(list(stream), self.records, size)
+            self.assertIn("RecordsFound", stream.header)
+
+            trailing = WOS_utils.JSONArrayStream(self._chunked(json.dumps({"REC": [1, 2], "RecordsFound": 9}), size), key="REC")
+            self.assertEqual(list(trailing), [1, 2])
+            self.assertEqual(trailing.trailer, ', "RecordsFound": 9}')
+
+    def test_yields_top_level_array(self):
+        stream = WOS_utils.JSONArrayStream(self._chunked(json.dumps(self.records), 3))
+
+        self.assertEqual(list(stream), self.records)
+
+    def test_missing_array_keeps_document_for_fallback(self):
+        document = json.dumps({"Data": {"Records": {"records": json.dumps({"REC": self.records})}}})
+        stream = WOS_utils.JSONArrayStream(self._chunked(document, 7), key="REC")
+
+        self.assertEqual(list(stream), [])
+        self.assertFalse(stream.found)
+        self.assertEqual(WOS_utils.normalize_records(json.loads(stream.header)), self.records)
+
+    def test_truncated_array_raises(self):
+        with self.assertRaises(ValueError):
+            list(WOS_utils.JSONArrayStream([b'[{"a": 1}, {"b": ']))
+
+
+class WOSRecordParsingTests(SimpleTestCase):
+
+    def test_matches_legacy_parser(self):
+        rng = random.Random(7)
+        records = [synthetic_wos_record(i, rng) for i in range(50)] + edge_case_records()
+
+        self.assertEqual(WOS_utils.parse_papers(records), legacy_parse_papers(records))
+        papers = WOS_utils.parse_papers(edge_case_records())
+        self.assertEqual(papers[2]["num_references"], 0)  # a single reference object, as before
+        self.assertEqual(papers[6]["abstract"], WOS_utils.NO_ABSTRACT)
+        self.assertEqual(papers[1]["abstract"], "")
+
+    def test_parses_records_the_legacy_parser_raised_on(self):
+        record = {"UID": "WOS:1", "static_data": {"summary": {
+            "abstracts": {"abstract": {"abstract_text": {"p": ["Only", "abstract"]}}}}, "item": "unexpected"},
+            "dynamic_data": {"citation_related": {"tc_list": {"silo_tc": {"local_count": 4}}}}}
+
+        paper = WOS_utils.parse_papers([record])[0]
+
+        self.assertEqual((paper["abstract"], paper["citations"], paper["keywords"]), ("Only abstract", 4, []))
+        self.assertEqual(WOS_utils.extract_title(record), "Untitled")
+
+
+class TokenBucketTests(SimpleTestCase):
+
+    def test_acquire_queues_until_token_is_refilled(self):
+        bucket = WOS_utils.TokenBucket(rate=20, capacity=1)
+
+        start = time.monotonic()
+        for _ in range(3):
+            self.assertTrue(bucket.acquire())
+
+        # First token is banked, the next two each wait ~1/20s.
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_acquire_gives_up_after_timeout(self):
+        bucket = WOS_utils.TokenBucket(rate=0.1, capacity=1)
+
+        self.assertTrue(bucket.acquire(timeout=0))
+        self.assertFalse(bucket.acquire(timeout=0.05))
+
+    def test_file_bucket_is_shared_between_instances(self):
+        if WOS_utils.fcntl is None:
+            self.skipTest("fcntl not available")
+        path = os.path.join(tempfile.mkdtemp(), "bucket")
+        first = WOS_utils.FileTokenBucket(path, rate=0.1, capacity=1)
+        second = WOS_utils.FileTokenBucket(path, rate=0.1, capacity=1)
+
+        self.assertTrue(first.acquire(timeout=0))
+        self.assertFalse(second.acquire(timeout=0))
+
+
+class WOSAPIUsageTests(TestCase):
+
+    def test_counts_requests_per_user_and_day(self):
+        user = CustomUser.objects.create_user(email="quota@example.com", password="x")
+
+        WOS_utils.record_api_usage(user)
+        WOS_utils.record_api_usage(user, requests_made=3)
+        WOS_utils.record_api_usage(None)
+
+        self.assertEqual(WOSAPIUsage.objects.get(user=user).request_count, 4)
+        self.assertEqual(WOSAPIUsage.objects.get(user__isnull=True).request_count, 1)
+
+    def test_system_row_race_adds_to_the_existing_row(self):
+        WOS_utils.record_api_usage(None)
+        # Another worker's row appears between our UPDATE (matching nothing) and our INSERT
+        original_update = QuerySet.update
+        calls = []
+
+        def update(queryset, **kwargs):
+            calls.append(kwargs)
+            return 0 if len(calls) == 1 else original_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, "update", update):
+            WOS_utils.record_api_usage(None, requests_made=2)
+
+        self.assertEqual(list(WOSAPIUsage.objects.filter(user__isnull=True).values_list("request_count", flat=True)), [3])
+
+
+class ResultStorageTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        patcher = mock.patch.object(storage_utils, "RESULTS_DIR", self.tmp)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_parquet_reads_requested_columns_and_rows(self):
+        if storage_utils.pq is None:
+            self.skipTest("pyarrow not available")
+        papers = [{"uid": f"WOS:{i}", "title": f"T{i}", "publication_year": str(2000 + i),
+                   "keywords": ["a", "b"], "citations": i} for i in range(10)]
+        with mock.patch.object(storage_utils, "PARQUET_ROW_GROUP_SIZE", 3):
+            path = storage_utils.save_search_results(papers, user_id=1)
+
+        rows = storage_utils.read_search_results(path, columns=["uid", "publication_year"], offset=4, limit=4)
+
+        self.assertTrue(path.endswith(".parquet"))
+        self.assertEqual(rows, [{"uid": f"WOS:{i}", "publication_year": 2000 + i} for i in range(4, 8)])
+        self.assertEqual(storage_utils.count_search_results(path), 10)
+        self.assertEqual(storage_utils.read_search_results(path)[0]["keywords"], ["a", "b"])
+
+    def test_reads_legacy_json_files(self):
+        path = os.path.join(self.tmp, "records_1_000000.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"REC": [{"UID": "WOS:1"}, {"UID": "WOS:2"}]}, f, indent=4)
+
+        self.assertEqual(storage_utils.read_search_results(path, offset=1), [{"UID": "WOS:2"}])
+
+    def test_legacy_json_slice_is_decoded_incrementally(self):
+        path = os.path.join(self.tmp, "records_1_000001.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([{"uid": f"WOS:{i}"} for i in range(100)], f, indent=4)
+
+        with mock.patch.object(storage_utils, "READ_CHUNK_SIZE", 16):
+            rows = storage_utils.read_search_results(path, offset=10, limit=3)
+
+        self.assertEqual(rows, [{"uid": "WOS:10"}, {"uid": "WOS:11"}, {"uid": "WOS:12"}])
+
+
+class ResultFileAccessTests(TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        patcher = mock.patch.object(storage_utils, "RESULTS_DIR", os.path.join(self.tmp, "results"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        os.makedirs(storage_utils.RESULTS_DIR)
+        self.client.force_login(CustomUser.objects.create_user(email="files@example.com", password="x"))
+
+    def _download(self, path):
+        return self.client.get(reverse("json_file_download"), {"file": path})
+
+    def test_serves_files_under_the_configured_results_dir(self):
+        path = os.path.join(storage_utils.RESULTS_DIR, "records.json")
+        with open(path, "w") as f:
+            json.dump([], f)
+
+        response = self._download(path)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"[]")
+
+    def test_refuses_paths_and_symlinks_leading_outside(self):
+        outside = os.path.join(self.tmp, "secret.json")
+        with open(outside, "w") as f:
+            f.write("{}")
+        link = os.path.join(storage_utils.RESULTS_DIR, "link.json")
+        os.symlink(outside, link)
+
+        for path in (outside, link, os.path.join(storage_utils.RESULTS_DIR, "..", "secret.json")):
+            self.assertEqual(self._download(path).status_code, 302, path)
+
+
+class ResultCatalogBackfillTests(TestCase):
+
+    def test_backfills_owner_count_and_timestamp_from_tree(self):
+        user = CustomUser.objects.create_user(email="catalog@example.com", password="x")
+        day_dir = os.path.join(tempfile.mkdtemp(), "20250102")
+        os.makedirs(day_dir)
+        path = os.path.join(day_dir, f"records_{user.id}_134500.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([{"uid": "WOS:1"}, {"uid": "WOS:2"}], f)
+
+        for _ in range(2):  # second run must not duplicate rows
+            call_command("backfill_result_catalog", directory=os.path.dirname(day_dir), stdout=open(os.devnull, "w"))
+
+        entry = SavedResultFile.objects.get()
+        self.assertEqual((entry.user, entry.record_count, entry.file_format), (user, 2, "json"))
+        self.assertEqual(entry.created_at.strftime("%Y%m%d%H%M%S"), "20250102134500")
+
+
+class BulkPaperImportTests(TestCase):
+
+    def test_imports_in_constant_queries_and_skips_duplicates(self):
+        user = CustomUser.objects.create_user(email="import@example.com", password="x")
+        ResearchPaper.objects.create(user=user, title="Existing  Paper", filename="a.pdf", file_size=1, file_type="pdf")
+        records = [{"uid": f"WOS:{i}", "title": f"Paper {i}", "keywords": ["a", "b"], "publication_year": "2020"}
+                   for i in range(60)]
+        records += [{"title": "existing paper"}, {"title": "PAPER 1"}, {"abstract": "no title"}]
+
+        # existing titles + savepoint + 3 INSERT batches + release
+        with mock.patch.object(views, "IMPORT_BATCH_SIZE", 20), self.assertNumQueries(6):
+            imported, skipped = views._bulk_import_papers(records, user, "records.json")
+
+        self.assertEqual((imported, skipped), (60, 2))
+        paper = ResearchPaper.objects.get(filename="WOS-WOS:7")
+        self.assertEqual((paper.keywords, paper.publication_year, paper.status), (["a", "b"], 2020, "imported"))
+
+    def test_skips_filenames_the_user_already_has(self):
+        user = CustomUser.objects.create_user(email="reimport@example.com", password="x")
+        ResearchPaper.objects.create(user=user, title="Renamed since", filename="WOS-WOS:1", file_size=1, file_type="json")
+        ResearchPaper.objects.create(user=user, title="Other", filename="records.json#1", file_size=1, file_type="json")
+        records = [{"uid": "WOS:1", "title": "Original title"}, {"title": "No uid"}, {"uid": "WOS:2", "title": "New"},
+                   {"uid": "WOS:2", "title": "Same uid, other title"}]
+
+        imported, skipped = views._bulk_import_papers(records, user, "records.json")
+
+        self.assertEqual((imported, skipped), (1, 3))
+        self.assertEqual(ResearchPaper.objects.filter(user=user).count(), 3)
+
+
+def _clear_model_caches():
+    ml_utils.unload_ridge_model()
+
+
+class MLWarmUpTests(SimpleTestCase):
+
+    def setUp(self):
+        _clear_model_caches()
+        self.addCleanup(_clear_model_caches)
+
+    def test_missing_artifacts_fail_at_startup(self):
+        empty = tempfile.mkdtemp()
+        with mock.patch.object(ml_utils, "ML_MODELS_DIR", empty), mock.patch.object(ml_utils, "ML_ARTIFACT_DIR", empty), \
+                mock.patch.object(ml_utils, "ML_REGISTRY_DIR", empty), override_settings(ML_WARMUP_ON_STARTUP=True), self.assertLogs("user.ml_utils", "ERROR"):
+            with self.assertRaises(ImproperlyConfigured):
+                ml_utils.warm_up_if_enabled()
+
+    def test_warm_up_is_opt_in_and_primes_caches(self):
+        with override_settings(ML_WARMUP_ON_STARTUP=False):
+            self.assertIsNone(ml_utils.warm_up_if_enabled())
+        self.assertIsNone(ml_utils._active_model)
+
+        with override_settings(ML_WARMUP_ON_STARTUP=True), self.assertLogs("user.ml_utils", "INFO"):
+            timings = ml_utils.warm_up_if_enabled()
+
+        self.assertEqual(set(timings), {"load", "prediction"})
+        self.assertIsNotNone(ml_utils._active_model)
+
+
+class MappedArtifactTests(SimpleTestCase):
+    records = [
+        {"title": "Graph neural networks for citation prediction", "abstract": "We model citation graphs.",
+         "keywords": "citation; graphs"},
+        {"title": "Soil carbon", "abstract": "Field measurements across " * 20, "keywords": ""},
+        {"title": "Scaling laws", "abstract": "", "keywords": "language models",
+         "numerical_features": [3, 12, 1, 0, 2019, 8, 1]},
+    ]
+
+    def setUp(self):
+        _clear_model_caches()
+        self.addCleanup(_clear_model_caches)
+        self.output = tempfile.mkdtemp()
+        patcher = mock.patch.object(ml_utils, "ML_ARTIFACT_DIR", self.output)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        call_command("convert_ml_artifacts", stdout=io.StringIO())
+
+    def _predict(self, artifact_format):
+        _clear_model_caches()
+        with mock.patch.object(ml_utils, "ML_ARTIFACT_FORMAT", artifact_format), \
+                self.assertLogs("user.ml_utils", "INFO"):
+            return ml_utils.predict_many(self.records), ml_utils.load_model()
+
+    def test_npy_predictions_match_pickles(self):
+        expected, pickled = self._predict("pickle")
+        actual, mapped = self._predict("npy")
+
+        self.assertEqual(actual, expected)
+        self.assertIsInstance(mapped.coef_, np.memmap)
+        self.assertNotIsInstance(pickled, ml_utils.MappedRidge)
+
+    def test_mapped_vocabulary_matches_pickled_vectorizers(self):
+        with open(os.path.join(self.output, ml_utils.MANIFEST_FILENAME)) as f:
+            mapped = ml_utils._load_mapped_vectorizers(json.load(f), self.output)
+        pickled = ml_utils._safe_load(os.path.join(ml_utils.ML_MODELS_DIR, ml_utils.VECTORIZER_FILENAME))
+        texts = [r["abstract"] + " " + r["title"] for r in self.records] + [
+            "", "zzzz " + "x" * 80, "citation citation citation graphs neural",
+        ]
+
+        for key, vec in pickled.items():
+            self.assertIsInstance(mapped[key].counter.terms, np.memmap)
+            self.assertEqual((mapped[key].transform(texts) != vec.transform(texts)).nnz, 0, key)
+
+    def test_npy_lda_matches_pickles(self):
+        texts = [r["abstract"] + " " + r["title"] for r in self.records]
+        topics = {}
+        for artifact_format in ("pickle", "npy"):
+            with mock.patch.object(ml_utils, "ML_ARTIFACT_FORMAT", artifact_format), \
+                    self.assertLogs("user.ml_utils", "INFO"):
+                counter, lda = ml_utils.load_lda()
+            topics[artifact_format] = lda.transform(counter.transform(texts))
+
+        self.assertIsInstance(lda.components_, np.memmap)
+        np.testing.assert_array_equal(topics["npy"], topics["pickle"])
+
+    def test_auto_ignores_manifest_of_other_pickles(self):
+        path = os.path.join(self.output, ml_utils.MANIFEST_FILENAME)
+        with open(path) as f:
+            manifest = json.load(f)
+        with self.assertLogs("user.ml_utils", "INFO"):
+            self.assertIsNotNone(ml_utils.load_manifest())
+
+        manifest["sources"][ml_utils.MODEL_FILENAME] = "0" * 64
+        with open(path, "w") as f:
+            json.dump(manifest, f)
+        _clear_model_caches()
+        with self.assertLogs("user.ml_utils", "WARNING"):
+            self.assertIsNone(ml_utils.load_manifest())
+
+
+class ModelRegistryTests(SimpleTestCase):
+    records = [{"title": "Graph neural networks for citation prediction", "abstract": "We model citation graphs.",
+                "keywords": "citation; graphs"}]
+
+    def setUp(self):
+        _clear_model_caches()
+        self.addCleanup(_clear_model_caches)
+        self.registry = tempfile.mkdtemp()
+        for name, value in (("ML_REGISTRY_DIR", self.registry), ("ML_RELOAD_INTERVAL", 0)):
+            patcher = mock.patch.object(ml_utils, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _shifted_source(self, shift):
+        """A copy of the shipped pickles with the Ridge intercept moved by `shift` (log scale)."""
+        import joblib
+        import shutil
+
+        source = tempfile.mkdtemp()
+        for filename in (ml_utils.VECTORIZER_FILENAME, ml_utils.MODEL_RESULTS_FILENAME):
+            shutil.copy(os.path.join(ml_utils.ML_MODELS_DIR, filename), source)
+        model = joblib.load(os.path.join(ml_utils.ML_MODELS_DIR, ml_utils.MODEL_FILENAME))
+        model.intercept_ = model.intercept_ + shift
+        joblib.dump(model, os.path.join(source, ml_utils.MODEL_FILENAME))
+        return source
+
+    def _publish(self, *args):
+        with self.assertLogs("user.ml_utils", "INFO"):
+            call_command("publish_ml_model", *args, stdout=io.StringIO())
+
+    def test_publish_activate_and_swap_without_disturbing_holders(self):
+        with self.assertLogs("user.ml_utils", "INFO"):
+            held = ml_utils.load_ridge_model()
+            legacy = ml_utils.predict_many(self.records)[0]
+        self.assertEqual(held.version, ml_utils.UNVERSIONED)
+        self.assertEqual(legacy["model_version"], ml_utils.UNVERSIONED)
+
+        self._publish("--name", "v1")
+        self._publish("--name", "v2", "--source", self._shifted_source(1.0), "--no-activate")
+        self.assertEqual([m["version"] for m in ml_utils.list_versions()], ["v1", "v2"])
+        self.assertEqual(ml_utils.current_version(), "v1")
+
+        with mock.patch.object(ml_utils, "schedule_reload", side_effect=ml_utils.reload_models) as schedule:
+            # Polling is off: nothing changes
+            self.assertIs(ml_utils.load_ridge_model(), held)
+            schedule.assert_not_called()
+            with mock.patch.object(ml_utils, "ML_RELOAD_INTERVAL", 60):
+                with self.assertLogs("user.ml_utils", "INFO"):
+                    # The call that notices the switch still gets the model it started with
+                    self.assertIs(ml_utils.load_ridge_model(), held)
+                schedule.assert_called_once()
+                self.assertEqual(ml_utils.load_ridge_model().version, "v1")
+
+                # The next check is due only after the interval
+                with self.assertLogs("user.ml_utils", "INFO"):
+                    call_command("activate_ml_model", "v2", stdout=io.StringIO())
+                self.assertEqual(ml_utils.load_ridge_model().version, "v1")
+                schedule.assert_called_once()
+        self.assertEqual(held.version, ml_utils.UNVERSIONED)
+        self.assertEqual(ml_utils.predict_many(self.records)[0]["raw_prediction"], legacy["raw_prediction"])
+
+        with self.assertLogs("user.ml_utils", "INFO"):
+            ml_utils.reload_models()
+        shifted = ml_utils.predict_many(self.records)[0]
+        self.assertEqual(shifted["model_version"], "v2")
+        self.assertAlmostEqual(shifted["raw_prediction"] + 1, (legacy["raw_prediction"] + 1) * np.e, places=3)
+
+    def test_damaged_version_is_refused_and_old_model_kept(self):
+        self._publish("--name", "v1")
+        with self.assertLogs("user.ml_utils", "INFO"):
+            self.assertEqual(ml_utils.load_ridge_model().version, "v1")
+        self._publish("--name", "v2", "--no-activate")
+        with open(os.path.join(self.registry, "v2", ml_utils.MODEL_FILENAME), "ab") as f:
+            f.write(b"truncated upload")
+
+        with self.assertRaisesMessage(CommandError, "does not match its manifest"):
+            call_command("activate_ml_model", "v2", stdout=io.StringIO())
+        with open(os.path.join(self.registry, ml_utils.CURRENT_FILENAME), "w") as f:
+            f.write("v2\n")
+        with self.assertRaises(ml_utils.MLModelError):
+            ml_utils.reload_models()
+        self.assertEqual(ml_utils.load_ridge_model().version, "v1")
+        with self.assertRaisesMessage(CommandError, "already exists"):
+            call_command("publish_ml_model", "--name", "v1", stdout=io.StringIO())
+
+    def test_reserved_version_names_are_refused(self):
+        for name in ("CURRENT", "current", "CURRENT.42.tmp", "npy", ml_utils.UNVERSIONED):
+            with self.assertRaisesMessage(CommandError, "reserved"):
+                call_command("publish_ml_model", "--name", name, stdout=io.StringIO())
+        self.assertEqual(os.listdir(self.registry), [])
+
+
+class CompiledRidgeEngineTests(SimpleTestCase):
+
+    def setUp(self):
+        _clear_model_caches()
+        self.addCleanup(_clear_model_caches)
+
+    def _predict(self, engine, records):
+        _clear_model_caches()
+        with mock.patch.object(ml_utils, "ML_INFERENCE_ENGINE", engine), self.assertLogs("user.ml_utils", "INFO"):
+            return ml_utils.predict_many(records), ml_utils.load_compiled_engine()
+
+    def test_matches_sklearn_path(self):
+        with self.assertLogs("user.ml_utils", "INFO"):
+            vectorizer = ml_utils.load_vectorizer()
+        records = synthetic_records(40, vectorizer, seed=3) + [
+            {"title": "Unseen zzzz qqqq", "abstract": "", "keywords": ""},
+            {"title": "Scaling laws", "abstract": "language model training", "keywords": "language models",
+             "numerical_features": [3, 12, 1, 0, 19, 8, 1]},
+        ]
+        expected, _ = self._predict("sklearn", records)
+        actual, engine = self._predict("compiled", records)
+
+        self.assertIsInstance(engine, ml_utils.CompiledRidgeEngine)
+        self.assertEqual([p["predicted"] for p in actual], [p["predicted"] for p in expected])
+        for got, want in zip(actual, expected):
+            self.assertAlmostEqual(got["raw_prediction"], want["raw_prediction"], delta=1e-5 * max(1.0, want["raw_prediction"]))
+            self.assertAlmostEqual(got["ci_high"], want["ci_high"], delta=1e-5 * max(1.0, want["ci_high"]))
+
+    def test_layout_matches_hstack_pad_and_truncate(self):
+        from scipy.sparse import csr_matrix, hstack
+
+        with self.assertLogs("user.ml_utils", "INFO"):
+            loaded = ml_utils.load_ridge_model()
+        self.assertEqual((loaded.numerical_width, loaded.text_width, loaded.n_features), (7, 12500, 12507))
+        self.assertAlmostEqual(loaded.ci_margin, 1.96 * np.sqrt(2.1221726582891143))
+
+        titles, abstracts, keywords = ["Citation graphs"] * 2, ["We model citation graphs.", ""], ["graphs", ""]
+        text = hstack([loaded.vectorizer[key].transform(ml_utils._field_texts(key, titles, abstracts, keywords))
+                       for key, _ in loaded.text_blocks], format="csr")
+        for width in (None, 7, 3, 9):
+            numerical = None if width is None else [np.arange(1, width + 1), None]
+            expected = text if width is None else hstack([csr_matrix(ml_utils._numerical_block(numerical)), text])
+            columns = expected.shape[1]
+            if columns < 12507:
+                padding = csr_matrix((2, 12507 - columns), dtype=np.float32)
+                expected = hstack([padding, expected] if width is None else [expected, padding])
+            expected = expected.tocsr()[:, :12507]
+
+            actual = loaded.feature_matrix(titles, abstracts, keywords, numerical or [None, None])
+            self.assertEqual(actual.shape, (2, 12507))
+            self.assertEqual((actual != expected).nnz, 0, f"numerical width {width}")
+
+    def test_unexpected_numerical_width_uses_sklearn_path(self):
+        record = {"title": "Short", "abstract": "An abstract", "keywords": "", "numerical_features": [1, 2]}
+        _, engine = self._predict("compiled", [record])
+        self.assertFalse(engine.accepts([record["numerical_features"]]))
+        self.assertTrue(engine.accepts([None, np.zeros(engine.numerical_width)]))
@@ -12,6 +12,7 @@ from .views import (
     import_papers_from_json,
     json_file_detail_view,
     json_file_table_detail_view,
+    json_file_download_view,
     list_json_files_view,
 )
 from django.contrib.auth.views import LogoutView
@@ -35,6 +36,7 @@ urlpatterns = [
     path("papers/import-json/", import_papers_from_json, name="import_papers_from_json"),
     path("json-files/table-detail/", json_file_table_detail_view, name="json_file_table_detail"),
     path("json-files/detail/", json_file_detail_view, name="json_file_detail"),
+    path("json-files/download/", json_file_download_view, name="json_file_download"),
     path("json-files/", list_json_files_view, name="json_file_list"),
     path("wos-papers/light-gbm-predict/", light_gbm_predict_wos_paper_view, name="light_gbm_predict_wos_papers"),
 ]
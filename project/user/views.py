@@ -9,14 +9,16 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.contrib.auth import login as auth_login
 from django.urls import reverse_lazy, reverse
 from django.contrib import messages
-from django.http import JsonResponse
+from django.http import JsonResponse, FileResponse
 from django.contrib.auth.decorators import login_required
 from django.views import View
+from django.core.paginator import Paginator
 from django.utils import timezone
+from django.db import transaction
 from core import settings
 import numpy as np
 
-from .models import CustomUser, ResearcherProfile, ResearchPaper, WOSSearchHistory, WOSLightGBMPrediction, WOSRidgePrediction
+from .models import CustomUser, ResearcherProfile, ResearchPaper, WOSSearchHistory, WOSLightGBMPrediction, WOSRidgePrediction, SavedResultFile
 from .forms import CustomUserCreationForm, ResearcherProfileForm, CustomAuthenticationForm, WOSSearchForm
 from .WOS_utils import (
     search_papers_wos,
@@ -24,8 +26,14 @@ from .WOS_utils import (
     extract_publication_year,
     extract_pubtype,
 )
-from .ml_utils import predict_from_text, MLModelError
+from .ml_utils import predict_from_text, predict_many, MLModelError
+from . import storage_utils
+from .storage_utils import save_search_results, read_search_results, count_search_results, register_results_file
 
+RESULT_FILES_PER_PAGE = 25
+RESULT_RECORDS_PER_PAGE = 50
+MAX_RESULT_RECORDS_PER_PAGE = 500
+IMPORT_BATCH_SIZE = 1000
 
 # ----------------- SIGNUP -----------------
 
@@ -147,6 +155,43 @@ class EditPaperView(LoginRequiredMixin, View):
 
 
 
+def _wos_numerical_features(title, abstract, keywords, publication_year, doi, url, num_references):
+    """
+    Engineers the numerical feature row for a WOS paper, in training order:
+    [title_length, abstract_length, num_keywords, age, num_references, has_doi, has_url].
+    `keywords` may be a list or a comma-separated string.
+    """
+    # 1. Text-based feature lengths
+    title_length = len(title) if title else 0
+    abstract_length = len(abstract) if abstract else 0
+
+    # 2. Keyword count from list or comma-separated string
+    if isinstance(keywords, (list, tuple)):
+        num_keywords = len([kw for kw in keywords if kw and str(kw).strip()])
+    elif keywords:
+        num_keywords = len([kw.strip() for kw in keywords.split(',') if kw.strip()])
+    else:
+        num_keywords = 0
+
+    # 3. Paper age
+    try:
+        age = max(0, datetime.datetime.now().year - int(publication_year))
+    except (ValueError, TypeError):
+        age = 0
+
+    # 4. Other numerical/binary features
+    num_references_str = str(num_references) if num_references is not None else ""
+    num_references = int(num_references_str) if num_references_str.isdigit() else 0
+    doi = str(doi) if doi is not None else ""
+    url = str(url) if url is not None else ""
+    has_doi = 1 if doi.strip() and doi.lower() != 'none' else 0
+    has_url = 1 if url.strip() and url.lower() != 'none' else 0
+
+    return np.array([
+        title_length, abstract_length, num_keywords, age, num_references, has_doi, has_url
+    ], dtype=np.float32)
+
+
 @login_required
 def _get_prediction_for_wos_paper(request):
     """
@@ -159,38 +204,15 @@ def _get_prediction_for_wos_paper(request):
         abstract = request.POST.get("abstract")
         keywords_str = request.POST.get("keywords", "")
 
-        # --- Feature Engineering from POST data ---
-        publication_year_str = request.POST.get("publication_year")
-        doi = request.POST.get("doi")
-        url = request.POST.get("url")
-        num_references_str = request.POST.get("num_references")
-
-        # 1. Text-based feature lengths
-        title_length = len(title) if title else 0
-        abstract_length = len(abstract) if abstract else 0
-        
-        # 2. Keyword count from comma-separated string
-        if keywords_str:
-            keywords_list = [kw.strip() for kw in keywords_str.split(',') if kw.strip()]
-            num_keywords = len(keywords_list)
-        else:
-            num_keywords = 0
-        
-        # 3. Paper age
-        try:
-            publication_year = int(publication_year_str)
-            age = max(0, datetime.datetime.now().year - publication_year)
-        except (ValueError, TypeError):
-            age = 0
-
-        # 4. Other numerical/binary features
-        num_references = int(num_references_str) if num_references_str and num_references_str.isdigit() else 0
-        has_doi = 1 if doi and doi.strip() and doi.lower() != 'none' else 0
-        has_url = 1 if url and url.strip() and url.lower() != 'none' else 0
-
-        numerical_features = np.array([
-            title_length, abstract_length, num_keywords, age, num_references, has_doi, has_url
-        ], dtype=np.float32)
+        numerical_features = _wos_numerical_features(
+            title,
+            abstract,
+            keywords_str,
+            request.POST.get("publication_year"),
+            request.POST.get("doi"),
+            request.POST.get("url"),
+            request.POST.get("num_references"),
+        )
 
         return predict_from_text(title, abstract, keywords_str, numerical_features)
 
@@ -200,6 +222,60 @@ def _get_prediction_for_wos_paper(request):
         messages.error(request, f"An unexpected error occurred during prediction: {e}")
     return None
 
+
+def _predict_all_wos_papers(request, papers):
+    """
+    Scores every paper of a result set with one batched model call and
+    bulk-inserts the WOSRidgePrediction rows. Returns the number of papers scored.
+    """
+    scorable = [p for p in papers if p.get("uid") and (p.get("title") or p.get("abstract"))]
+    if not scorable:
+        messages.info(request, "No papers with a title or abstract to score.")
+        return 0
+
+    batch = []
+    for paper in scorable:
+        keywords = paper.get("keywords") or []
+        batch.append({
+            "title": paper.get("title"),
+            "abstract": paper.get("abstract"),
+            "keywords": ", ".join(keywords) if isinstance(keywords, list) else keywords,
+            "numerical_features": _wos_numerical_features(
+                paper.get("title"),
+                paper.get("abstract"),
+                keywords,
+                paper.get("publication_year"),
+                paper.get("doi"),
+                paper.get("url"),
+                paper.get("num_references"),
+            ),
+        })
+
+    try:
+        predictions = predict_many(batch)
+    except (ValueError, MLModelError) as e:
+        messages.error(request, f"Could not generate predictions: {e}")
+        return 0
+    except Exception as e:
+        messages.error(request, f"An unexpected error occurred during prediction: {e}")
+        return 0
+
+    now = timezone.now()
+    WOSRidgePrediction.objects.bulk_create([
+        WOSRidgePrediction(
+            user=request.user,
+            wos_uid=paper["uid"],
+            predicted_citations=prediction["predicted"],
+            ci_low=prediction["ci_low"],
+            ci_high=prediction["ci_high"],
+            model_version=prediction["model_version"],
+            predicted_at=now,
+        )
+        for paper, prediction in zip(scorable, predictions)
+    ])
+    messages.success(request, f"Predicted citations for {len(scorable)} papers.")
+    return len(scorable)
+
 @login_required
 def light_gbm_predict_wos_paper_view(request):
     """
@@ -281,7 +357,8 @@ def wos_paper_list_view(request):
                     wos_uid=predicted_paper_uid,
                     predicted_citations=round(prediction.get('predicted')),
                     ci_low=prediction.get('ci_low'),
-                    ci_high=prediction.get('ci_high')
+                    ci_high=prediction.get('ci_high'),
+                    model_version=prediction.get('model_version', '')
                 )
 
         # --- Search Logic (runs for both search and after prediction) ---
@@ -291,26 +368,21 @@ def wos_paper_list_view(request):
             count = form.cleaned_data["count"]
 
             # Fetch papers from WOS
-            papers = search_papers_wos(query=query, count=count, field=search_field)
+            papers = search_papers_wos(query=query, count=count, field=search_field, user=request.user)
+
+            # --- Batch Prediction Logic: score the whole result set in one pass ---
+            if action == "predict_all" and papers:
+                _predict_all_wos_papers(request, papers)
 
-            if action != "predict":  # save only for fresh searches
+            if action not in ("predict", "predict_all"):  # save only for fresh searches
                 if not papers:
                     messages.info(request, "No papers found for your query.")
                 else:
                     messages.success(request, f"Found {len(papers)} papers for your query.")
 
                 # Save search results to file + DB
-                date_dir = datetime.datetime.now().strftime("%Y%m%d")
-                base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-                raw_dir = os.path.join(base_dir, "json_data", date_dir)
-                os.makedirs(raw_dir, exist_ok=True)
-                file_path = os.path.join(
-                    raw_dir, f"records_{request.user.id}_{datetime.datetime.now().strftime('%H%M%S')}.json"
-                )
-
                 try:
-                    with open(file_path, "w", encoding="utf-8") as f:
-                        json.dump(papers, f, indent=4, ensure_ascii=False)
+                    file_path = save_search_results(papers, request.user.id)
 
                     WOSSearchHistory.objects.create(
                         user=request.user,
@@ -319,6 +391,13 @@ def wos_paper_list_view(request):
                         count=count,
                         json_file_path=file_path
                     )
+                    register_results_file(
+                        file_path,
+                        user_id=request.user.id,
+                        query=query,
+                        search_field=search_field,
+                        record_count=len(papers),
+                    )
                 except Exception as e:
                     messages.error(request, f"Could not save search history: {e}")
 
@@ -331,8 +410,7 @@ def wos_paper_list_view(request):
             try:
                 search = get_object_or_404(WOSSearchHistory, id=view_history_id, user=request.user)
                 if search.json_file_path and os.path.exists(search.json_file_path):
-                    with open(search.json_file_path, "r", encoding="utf-8") as f:
-                        papers = json.load(f)
+                    papers = read_search_results(search.json_file_path)
                     messages.success(request, f"Loaded results for query: '{search.query}'")
                     # Pre-fill form with historical data
                     form = WOSSearchForm(initial=search.__dict__)
@@ -346,7 +424,7 @@ def wos_paper_list_view(request):
             search_field = form.cleaned_data["search_field"]
             query = form.cleaned_data["query"]
             count = form.cleaned_data["count"]
-            papers = search_papers_wos(query=query, count=count, field=search_field)
+            papers = search_papers_wos(query=query, count=count, field=search_field, user=request.user)
             if not papers:
                 messages.info(request, "No papers found for your query.")
         else:
@@ -379,103 +457,115 @@ def wos_paper_list_view(request):
 
 @login_required
 def list_json_files_view(request):
-    base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    json_data_dir = os.path.join(base_dir, "json_data")
-    json_files_data = []
-    
-    if not os.path.exists(json_data_dir):
-        messages.warning(request, "The 'json_data' directory does not exist.")
-        return render(request, 'user/json_file_list.html', {'files': []})
-
-    for root, dirs, files in os.walk(json_data_dir):
-        for file in files:
-            if file.endswith(".json"):
-                file_path = os.path.join(root, file)
-                try:
-                    file_stat = os.stat(file_path)
-                    # Make path relative to BASE_DIR for display
-                    relative_path = os.path.relpath(file_path, base_dir)
-                    file_info = {
-                        'name': file,
-                        'path': relative_path,
-                        'full_path': file_path,
-                        'size': file_stat.st_size,
-                        'modified_time': datetime.datetime.fromtimestamp(file_stat.st_mtime)
-                    }
-                    json_files_data.append(file_info)
-                except OSError as e:
-                    messages.error(request, f"Could not access file {file_path}: {e}")
-
-    # Sort files by modification time, newest first
-    json_files_data.sort(key=lambda x: x['modified_time'], reverse=True)
-
-    return render(request, 'user/json_file_list.html', {'files': json_files_data})
+    # Saved result files come from the SavedResultFile catalog (filled on save and by
+    # `manage.py backfill_result_catalog`) instead of walking json_data on every request.
+    files = SavedResultFile.objects.select_related("user").order_by("-created_at", "-id")
+    page_obj = Paginator(files, RESULT_FILES_PER_PAGE).get_page(request.GET.get("page"))
+
+    return render(request, 'user/json_file_list.html', {
+        'files': page_obj.object_list,
+        'page_obj': page_obj,
+    })
 
-@login_required
-def json_file_detail_view(request):
+def _resolve_results_file(request):
+    """Absolute path of the ?file= results file, or None (with an error message) if it can't be served."""
     file_path = request.GET.get("file")
 
     if not file_path:
         messages.error(request, "No file specified.")
-        return redirect("json_file_list")
-        
-    # Security check: ensure the file is within the json_data directory
+        return None
+
+    # Security check: ensure the file is within the results directory (WOS_RESULTS_DIR),
+    # after resolving symlinks so a link inside it cannot point elsewhere
     abs_file_path = os.path.abspath(file_path)
-    json_data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "json_data")
-    if not abs_file_path.startswith(os.path.abspath(json_data_dir)):
+    if not os.path.realpath(file_path).startswith(os.path.realpath(storage_utils.RESULTS_DIR) + os.sep):
         messages.error(request, "Access to this file is not permitted.")
-        return redirect("json_file_list")
+        return None
 
     if not os.path.exists(abs_file_path):
         messages.error(request, f"File not found: {os.path.basename(file_path)}")
+        return None
+
+    return abs_file_path
+
+
+def _positive_int(value, default):
+    try:
+        return max(1, int(value))
+    except (TypeError, ValueError):
+        return default
+
+
+def _read_results_page(request, abs_file_path, columns=None):
+    """
+    Decodes only the records for ?page=&page_size= and returns them with the
+    pagination state for the template. One extra record is read to know whether
+    a next page exists; the total comes from the catalog or the Parquet footer.
+    """
+    page_size = min(_positive_int(request.GET.get("page_size"), RESULT_RECORDS_PER_PAGE), MAX_RESULT_RECORDS_PER_PAGE)
+    page = _positive_int(request.GET.get("page"), 1)
+    offset = (page - 1) * page_size
+
+    records = read_search_results(abs_file_path, columns=columns, offset=offset, limit=page_size + 1)
+    has_next = len(records) > page_size
+    records = records[:page_size]
+
+    total = SavedResultFile.objects.filter(path=abs_file_path).values_list("record_count", flat=True).first()
+    if total is None and abs_file_path.endswith(".parquet"):
+        total = count_search_results(abs_file_path)
+
+    pagination = {
+        "number": page,
+        "page_size": page_size,
+        "start_index": offset + 1 if records else 0,
+        "end_index": offset + len(records),
+        "total": total,
+        "num_pages": -(-total // page_size) if total else None,
+        "has_previous": page > 1,
+        "previous_page_number": page - 1,
+        "has_next": has_next,
+        "next_page_number": page + 1,
+    }
+    return records, pagination
+
+
+@login_required
+def json_file_detail_view(request):
+    abs_file_path = _resolve_results_file(request)
+    if abs_file_path is None:
         return redirect("json_file_list")
 
     try:
-        with open(abs_file_path, "r", encoding="utf-8") as f:
-            records = json.load(f)
+        records, pagination = _read_results_page(request, abs_file_path)
     except Exception as e:
-        messages.error(request, f"Failed to load or parse JSON file: {e}")
+        messages.error(request, f"Failed to load or parse results file: {e}")
         return redirect("json_file_list")
 
-    # For pretty printing in the template
-    records_pretty = json.dumps(records, indent=4)
+    # Pretty print only the current page; the whole file is available via download
+    records_pretty = json.dumps(records, indent=4, ensure_ascii=False)
 
     context = {
-        "file_name": os.path.basename(file_path),
+        "file_name": os.path.basename(abs_file_path),
+        "file_path": abs_file_path,
         "records": records,
-        "records_pretty": records_pretty
+        "records_pretty": records_pretty,
+        "pagination": pagination,
     }
     return render(request, "user/json_file_detail.html", context)
 
 @login_required
 def json_file_table_detail_view(request):
-    file_path = request.GET.get("file")
-
-    if not file_path:
-        messages.error(request, "No file specified.")
-        return redirect("json_file_list")
-        
-    # Security check: ensure the file is within the json_data directory
-    abs_file_path = os.path.abspath(file_path)
-    json_data_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "json_data")
-    if not abs_file_path.startswith(os.path.abspath(json_data_dir)):
-        messages.error(request, "Access to this file is not permitted.")
-        return redirect("json_file_list")
-
-    if not os.path.exists(abs_file_path):
-        messages.error(request, f"File not found: {os.path.basename(file_path)}")
+    abs_file_path = _resolve_results_file(request)
+    if abs_file_path is None:
         return redirect("json_file_list")
 
     try:
-        with open(abs_file_path, "r", encoding="utf-8") as f:
-            records = json.load(f)
+        # Parquet files only decode the four columns shown in the table
+        records, pagination = _read_results_page(
+            request, abs_file_path, columns=["uid", "title", "publication_year", "pubtype"]
+        )
     except Exception as e:
-        messages.error(request, f"Failed to load or parse JSON file: {e}")
-        return redirect("json_file_list")
-
-    # The JSON files are already a list of parsed paper dicts
-    if not isinstance(records, list):
-        messages.error(request, "JSON file does not contain a list of records.")
+        messages.error(request, f"Failed to load or parse results file: {e}")
         return redirect("json_file_list")
 
     # Extract tabular data
@@ -503,76 +593,127 @@ def json_file_table_detail_view(request):
             })
 
     context = {
-        "file_name": os.path.basename(file_path),
+        "file_name": os.path.basename(abs_file_path),
+        "file_path": abs_file_path,
         "papers": papers_data,
+        "pagination": pagination,
     }
     return render(request, "user/json_file_table_detail.html", context)
 
-def _perform_paper_import(request, file_path):
-    """Helper to import papers from a given JSON file path."""
-    if not file_path or not os.path.exists(file_path):
-        messages.error(request, "Invalid or non-existent file selected for import.")
-        return 0, 0
+@login_required
+def json_file_download_view(request):
+    abs_file_path = _resolve_results_file(request)
+    if abs_file_path is None:
+        return redirect("json_file_list")
+
+    # FileResponse is a StreamingHttpResponse that sends the file in fixed-size blocks
+    content_type = "application/vnd.apache.parquet" if abs_file_path.endswith(".parquet") else "application/json"
+    return FileResponse(
+        open(abs_file_path, "rb"),
+        as_attachment=True,
+        filename=os.path.basename(abs_file_path),
+        content_type=content_type,
+    )
+
+def _normalize_title(title):
+    """Case- and whitespace-insensitive key used for duplicate detection on import."""
+    return " ".join(str(title).split()).casefold()
 
+
+def _as_list(value):
+    """Keywords/authors may be stored as a list or as a "; " or ", " separated string."""
+    if not value:
+        return []
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if item]
+    separator = ";" if ";" in value else ","
+    return [item.strip() for item in str(value).split(separator) if item.strip()]
+
+
+def _as_year(value):
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            records = json.load(f)
-    except Exception as e:
-        messages.error(request, f"Failed to load or parse JSON file: {e}")
-        return 0, 0
+        return int(value)
+    except (TypeError, ValueError):
+        return None
 
-    if isinstance(records, dict):
-        for key in ["records", "REC", "data"]:
-            if key in records and isinstance(records[key], list):
-                records = records[key]
-                break
-    
-    if not isinstance(records, list):
-        messages.error(request, "JSON file does not contain a list of records.")
-        return 0, 0
 
-    imported_count = 0
-    skipped_count = 0
-    user = request.user if request.user.is_authenticated else CustomUser.objects.first()
+def _bulk_import_papers(records, user, source_name, file_type="json"):
+    """
+    Inserts result records as ResearchPaper rows for `user`, skipping titles the
+    user already has (and duplicates within the file), as well as filenames the
+    user already has, which (user, filename) would reject. Existing titles and
+    filenames are loaded once into sets and new rows are written with
+    bulk_create in one transaction. Returns (imported_count, skipped_count).
+    """
+    existing = set()
+    existing_filenames = set()
+    for title, filename in ResearchPaper.objects.filter(user=user).values_list("title", "filename").iterator():
+        existing.add(_normalize_title(title))
+        existing_filenames.add(filename)
 
-    for rec in records:
+    papers = []
+    skipped_count = 0
+    for index, rec in enumerate(records):
         if not isinstance(rec, dict):
             continue
-            
+
         title = rec.get("title") or rec.get("TI") or rec.get("Title") or ""
         if not title:
             continue
 
-        if Paper.objects.filter(title=title, user=user).exists():
+        uid = rec.get("uid") or rec.get("UID")
+        filename = (f"WOS-{uid}" if uid else f"{source_name}#{index}")[:255]
+        key = _normalize_title(title)
+        if key in existing or filename in existing_filenames:
             skipped_count += 1
             continue
+        existing.add(key)
+        existing_filenames.add(filename)
 
-        keywords_data = rec.get("keywords") or rec.get("DE") or ""
-        keywords_str = ", ".join(keywords_data) if isinstance(keywords_data, list) else keywords_data
-
-        Paper.objects.create(
+        papers.append(ResearchPaper(
             user=user,
+            filename=filename,
+            file_size=0,
+            file_type=file_type,
             title=title,
             abstract=rec.get("abstract") or rec.get("AB") or "",
-            keywords=keywords_str,
-            publication_year=rec.get("publication_year") or rec.get("PY") or None,
-            category=rec.get("category") or rec.get("SO") or "",
-            authors=", ".join(rec.get("authors", [])) if isinstance(rec.get("authors"), list) else rec.get("authors", ""),
+            keywords=_as_list(rec.get("keywords") or rec.get("DE")),
+            authors=_as_list(rec.get("authors")),
+            publication_year=_as_year(rec.get("publication_year") or rec.get("PY")),
+            category=(rec.get("category") or rec.get("SO") or "")[:100],
             status="imported",
-        )
-        imported_count += 1
-    
-    return imported_count, skipped_count
+        ))
+
+    with transaction.atomic():
+        ResearchPaper.objects.bulk_create(papers, batch_size=IMPORT_BATCH_SIZE)
+
+    return len(papers), skipped_count
+
+
+def _perform_paper_import(request, file_path):
+    """Helper to import papers from a given results file path (Parquet or legacy JSON)."""
+    if not file_path or not os.path.exists(file_path):
+        messages.error(request, "Invalid or non-existent file selected for import.")
+        return 0, 0
+
+    try:
+        records = read_search_results(file_path, columns=["uid", "title", "abstract", "keywords", "publication_year"])
+    except Exception as e:
+        messages.error(request, f"Failed to load or parse results file: {e}")
+        return 0, 0
+
+    user = request.user if request.user.is_authenticated else CustomUser.objects.first()
+    if user is None:
+        messages.error(request, "No user available to import papers for.")
+        return 0, 0
+
+    file_type = "parquet" if file_path.endswith(".parquet") else "json"
+    return _bulk_import_papers(records, user, os.path.basename(file_path), file_type=file_type)
 
 def import_papers_from_json(request):
-    # Path to your json_data folder
-    json_data_dir = os.path.join(settings.BASE_DIR, "json_data")
-    # List all JSON files (recursively, if needed)
-    json_files = []
-    for root, dirs, files in os.walk(json_data_dir):
-        for file in files:
-            if file.endswith(".json"):
-                json_files.append(os.path.join(root, file))
+    # Saved result files, newest first, one page at a time from the catalog
+    files = SavedResultFile.objects.order_by("-created_at", "-id").values_list("path", flat=True)
+    page_obj = Paginator(files, RESULT_FILES_PER_PAGE).get_page(request.GET.get("page"))
 
     file_to_import = request.GET.get("file")
     if file_to_import:
@@ -591,6 +732,7 @@ def import_papers_from_json(request):
         return redirect("import_papers_from_json")
 
     return render(request, "user/import_papers_from_json.html", {
-        "json_files": json_files,
+        "json_files": page_obj.object_list,
+        "page_obj": page_obj,
         "selected_file": request.GET.get("file")
     })
\ No newline at end of file